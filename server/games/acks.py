@@ -0,0 +1,85 @@
+"""
+Acknowledgment of sequenced client actions.
+
+A client may tag each action with a sequence number, increasing per player
+token. The server answers every tagged action with an ack or nack frame
+echoing the number, and remembers the answers to a player's recent actions
+so a retransmitted action (after a reconnect, say) gets its original answer
+again instead of being applied twice.
+"""
+
+import json
+from collections import OrderedDict
+
+# Answers remembered per player, covering the actions a client may retransmit
+ACK_WINDOW = 64
+# Players tracked before the least recently active are forgotten
+MAX_TRACKED_PLAYERS = 100000
+
+
+class AckTracker:
+    """Per-player record of the highest sequence number seen and recent answers."""
+
+    def __init__(self, window=ACK_WINDOW, max_keys=MAX_TRACKED_PLAYERS):
+        """
+        Initialize the tracker.
+
+        Args:
+            window (int): Answers kept per player
+            max_keys (int): Players tracked before the least recently active are dropped
+        """
+        self.window = window
+        self.max_keys = max_keys
+        self.players = OrderedDict()  # key -> [highest seq, OrderedDict of seq -> answer]
+
+    def replay(self, key, seq):
+        """
+        Look up the answer to an action the player already sent.
+
+        Args:
+            key: Player key, e.g. (room ID, player token)
+            seq (int): Sequence number of the received action
+
+        Returns:
+            str: The answer to resend if the action was seen before, else None
+        """
+        entry = self.players.get(key)
+        if entry is None or seq > entry[0]:
+            return None
+        self.players.move_to_end(key)
+        answer = entry[1].get(seq)
+        # Too old to still be remembered; it was answered, so only acknowledge it
+        return answer if answer is not None else ack_frame(seq)
+
+    def record(self, key, seq, answer):
+        """
+        Remember the answer to a newly processed action.
+
+        Args:
+            key: Player key
+            seq (int): Sequence number of the action
+            answer (str): Serialized ack or nack frame sent for it
+        """
+        entry = self.players.get(key)
+        if entry is None:
+            if len(self.players) >= self.max_keys:
+                self.players.popitem(last=False)
+            entry = self.players[key] = [seq, OrderedDict()]
+        else:
+            self.players.move_to_end(key)
+        entry[0] = max(entry[0], seq)
+        answers = entry[1]
+        answers[seq] = answer
+        if len(answers) > self.window:
+            answers.popitem(last=False)
+
+
+def ack_frame(seq, version=None):
+    """Serialized frame acknowledging an applied action."""
+    return json.dumps({"success": True, "ack": seq, "version": version})
+
+
+def nack_frame(seq, error):
+    """Serialized frame rejecting an action."""
+    return json.dumps({"success": False, "nack": seq, "error": error})
+
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import PlayerStats
 
-# Register your models here.
+
+@admin.register(PlayerStats)
+class PlayerStatsAdmin(admin.ModelAdmin):
+    list_display = ('player_key', 'games_played', 'games_won', 'asks', 'claims_correct', 'updated_at')
+    search_fields = ('player_key',)
@@ -0,0 +1,103 @@
+"""
+Admission control for the Literature server.
+
+New rooms, new players and spectators are refused with a retry-after hint
+once the worker is overloaded: its event loop lags, or it serves too many
+rooms or sockets. Players already seated in a room are always let back in,
+so running games keep priority over new work.
+"""
+
+from .metrics import metrics
+
+# Weight of the newest sample in the smoothed event-loop lag
+LAG_SMOOTHING = 0.2
+
+metrics.describe('admission_admitted_total', 'counter', "New rooms and connections admitted")
+metrics.describe('admission_rejected_total', 'counter', "New rooms and connections refused, by reason")
+metrics.describe('event_loop_lag_seconds', 'gauge', "Smoothed event-loop lag")
+metrics.describe('open_sockets', 'gauge', "Open websocket connections")
+
+
+class AdmissionRefused(ValueError):
+    """Raised when a node refuses to create a room."""
+
+    def __init__(self, reason):
+        super().__init__(f"Room refused: {reason}")
+        self.reason = reason
+
+
+class AdmissionController:
+    """Decides whether the worker takes on new rooms and connections."""
+
+    def __init__(self, max_loop_lag=0.25, max_rooms=100000, max_sockets=20000, retry_after=5):
+        """
+        Initialize the controller.
+
+        Args:
+            max_loop_lag (float): Smoothed event-loop lag in seconds above which new work is refused
+            max_rooms (int): Rooms served before new rooms are refused
+            max_sockets (int): Open websockets before new connections are refused
+            retry_after (int): Seconds clients are told to wait before retrying
+        """
+        self.max_loop_lag = max_loop_lag
+        self.max_rooms = max_rooms
+        self.max_sockets = max_sockets
+        self.retry_after = retry_after
+        self.loop_lag = 0.0
+        self.sockets = 0
+        metrics.gauge_function('open_sockets', lambda: self.sockets)
+
+    def record_lag(self, lag):
+        """Add a sample of how late a scheduled wake-up ran, in seconds."""
+        self.loop_lag += LAG_SMOOTHING * (max(lag, 0.0) - self.loop_lag)
+        metrics.set('event_loop_lag_seconds', round(self.loop_lag, 4))
+
+    def socket_opened(self):
+        self.sockets += 1
+
+    def socket_closed(self):
+        self.sockets = max(self.sockets - 1, 0)
+
+    def admit(self, kind, rooms):
+        """
+        Decide on a new room ('room'), player connection ('connection') or spectator ('spectator').
+
+        Args:
+            kind (str): What is being admitted
+            rooms (int): Rooms currently served by this worker
+
+        Returns:
+            str: Reason the request is refused, or None if it is admitted
+        """
+        if self.loop_lag > self.max_loop_lag:
+            reason = 'loop_lag'
+        elif kind == 'room' and rooms >= self.max_rooms:
+            reason = 'rooms'
+        elif kind != 'room' and self.sockets >= self.max_sockets:
+            reason = 'sockets'
+        else:
+            metrics.inc('admission_admitted_total', kind=kind)
+            return None
+        metrics.inc('admission_rejected_total', kind=kind, reason=reason)
+        return reason
+
+    def busy_message(self, reason):
+        """Error text for a refused request."""
+        return f"Server is busy ({reason.replace('_', ' ')}), please retry in {self.retry_after} seconds"
+
+
+admission_controller = None
+
+
+def get_admission_controller():
+    """Return the process-wide admission controller, configured from settings on first use."""
+    global admission_controller
+    if admission_controller is None:
+        from django.conf import settings
+        admission_controller = AdmissionController(
+            getattr(settings, 'ADMISSION_MAX_LOOP_LAG_MS', 250) / 1000,
+            getattr(settings, 'ADMISSION_MAX_ROOMS', 100000),
+            getattr(settings, 'ADMISSION_MAX_SOCKETS', 20000),
+            getattr(settings, 'ADMISSION_RETRY_AFTER_SECONDS', 5),
+        )
+    return admission_controller
@@ -0,0 +1,332 @@
+"""
+Columnar archive of finished Literature games for bulk analytics.
+
+Every column is a flat file of fixed-width little-endian values that is only
+ever appended to, so the archive can be memory-mapped and scanned as NumPy
+arrays without copying. Game columns hold one value per game (player keys
+hold six), move columns hold one value per move.
+"""
+
+import hashlib
+import queue
+import sys
+import threading
+from array import array
+from pathlib import Path
+from .bots import is_bot_token
+from .engine.history import decode_move
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Column name -> array typecode
+GAME_COLUMNS = {
+    'move_start': 'Q',    # Index of the game's first move in the move columns
+    'move_count': 'I',    # Number of moves in the game
+    'first_seat': 'B',    # Seat of the player who took the first turn
+    'team2_seats': 'B',   # Bit mask of seats playing for team 2
+    'winner': 'B',        # Winning team, 0 for a tie
+    'score1': 'B',
+    'score2': 'B',
+    'player_keys': 'Q',   # Six hashed player tokens per game, in seat order; 0 for bots and empty seats
+}
+MOVE_COLUMNS = {
+    'move_type': 'B',     # ASK, CLAIM or PASS from engine.history
+    'actor': 'B',         # Seat of the acting player
+    'target': 'B',        # Seat asked or passed to
+    'card': 'B',          # Card index for asks, set number for claims
+    'outcome': 'B',       # 1 if the ask or claim succeeded
+}
+SEATS_PER_GAME = 6
+
+_CLOSE = object()
+
+
+def player_key(token):
+    """Hash a player token to the 64-bit key stored in the archive."""
+    return int.from_bytes(hashlib.blake2b(str(token).encode(), digest_size=8).digest(), 'little')
+
+
+class GameArchive:
+    """Appends finished games to the columnar archive from a background thread."""
+
+    def __init__(self, directory):
+        """
+        Initialize the archive.
+
+        Args:
+            directory: Directory holding one file per column
+        """
+        self.directory = Path(directory)
+        self.queue = queue.Queue()
+        self.writer = None
+
+    def start(self):
+        """Start the background writer thread."""
+        if self.writer is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.repair()
+            self.writer = threading.Thread(target=self._run, name="game-archive", daemon=True)
+            self.writer.start()
+
+    def close(self):
+        """Write pending games and stop the writer thread."""
+        if self.writer is not None:
+            self.queue.put(_CLOSE)
+            self.writer.join()
+            self.writer = None
+
+    def append_game(self, game):
+        """
+        Queue a finished game for archiving.
+
+        Args:
+            game (Game): An ended game that still holds its history
+        """
+        history = game.history
+        tokens = [game.players[player_id].token for player_id in history.seats]
+        self.queue.put((history, tokens, game.winning_team or 0, game.scores[1], game.scores[2]))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _CLOSE:
+                return
+            try:
+                self._write(*item)
+            except OSError as e:
+                log.error("game_archive_write_failed", error=str(e))
+
+    def _write(self, history, tokens, winner, score1, score2):
+        moves = {name: array(code) for name, code in MOVE_COLUMNS.items()}
+        for move in history.moves:
+            move_type, actor, target, value, outcome = decode_move(move)
+            moves['move_type'].append(move_type)
+            moves['actor'].append(actor)
+            moves['target'].append(target)
+            moves['card'].append(value)
+            moves['outcome'].append(outcome)
+        keys = [0 if is_bot_token(token) else player_key(token) for token in tokens]
+        games = {
+            'move_start': array('Q', [self._row_count('move_type', 'B')]),
+            'move_count': array('I', [len(history.moves)]),
+            'first_seat': array('B', [history.starting_seat]),
+            'team2_seats': array('B', [sum(1 << seat for seat, team in enumerate(history.teams) if team == 2)]),
+            'winner': array('B', [winner]),
+            'score1': array('B', [score1]),
+            'score2': array('B', [score2]),
+            'player_keys': array('Q', keys + [0] * (SEATS_PER_GAME - len(keys))),
+        }
+        # Moves go first: a game row only counts once every game column has it
+        for columns in (moves, games):
+            for name, values in columns.items():
+                if sys.byteorder != 'little':
+                    values.byteswap()
+                with open(self.directory / f"{name}.col", 'ab') as column:
+                    column.write(values.tobytes())
+
+    def _row_count(self, name, code):
+        path = self.directory / f"{name}.col"
+        return path.stat().st_size // array(code).itemsize if path.exists() else 0
+
+    def _read_value(self, name, code, index):
+        values = array(code)
+        with open(self.directory / f"{name}.col", 'rb') as column:
+            column.seek(index * values.itemsize)
+            values.frombytes(column.read(values.itemsize))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values[0]
+
+    def repair(self):
+        """
+        Cut every column back to the last completely written game.
+
+        A crash in the middle of _write leaves some columns a row longer than
+        others and moves without a game. New rows are placed by the column
+        lengths, so they must all agree before anything is appended.
+
+        Returns:
+            int: Number of games kept
+        """
+        game_count = min(self._row_count('player_keys', 'Q') // SEATS_PER_GAME,
+                         *(self._row_count(name, code) for name, code in GAME_COLUMNS.items() if name != 'player_keys'))
+        move_rows = min(self._row_count(name, code) for name, code in MOVE_COLUMNS.items())
+        move_end = 0
+        while game_count:
+            move_end = (self._read_value('move_start', 'Q', game_count - 1)
+                        + self._read_value('move_count', 'I', game_count - 1))
+            if move_end <= move_rows:
+                break
+            game_count -= 1
+            move_end = 0
+        truncated = []
+        for columns, rows in ((GAME_COLUMNS, game_count), (MOVE_COLUMNS, move_end)):
+            for name, code in columns.items():
+                path = self.directory / f"{name}.col"
+                size = rows * array(code).itemsize * (SEATS_PER_GAME if name == 'player_keys' else 1)
+                if path.exists() and path.stat().st_size != size:
+                    truncated.append(name)
+                    with open(path, 'r+b') as column:
+                        column.truncate(size)
+        if truncated:
+            log.warning("game_archive_repaired", games=game_count, moves=move_end, columns=truncated)
+        return game_count
+
+
+def shard_directories(base):
+    """
+    Find the archives written by every shard for a base archive directory.
+
+    Sharded workers archive to "<base>.shard<N>"; an unsharded server to the
+    base directory itself.
+
+    Args:
+        base: Archive directory without a shard suffix
+
+    Returns:
+        dict: Shard index (None for the unsharded archive) -> existing directory
+    """
+    base = Path(base)
+    found = {None: base} if base.is_dir() else {}
+    prefix = f"{base.name}.shard"
+    if base.parent.is_dir():
+        for path in base.parent.iterdir():
+            if path.is_dir() and path.name.startswith(prefix) and path.name[len(prefix):].isdigit():
+                found[int(path.name[len(prefix):])] = path
+    return found
+
+
+def open_columns(directory):
+    """
+    Memory-map every archive column as a read-only NumPy array.
+
+    Rows of a game that was only partly written, and games whose moves are
+    not all there, are left out.
+
+    Args:
+        directory: Archive directory
+
+    Returns:
+        tuple: (dict of game columns, dict of move columns)
+    """
+    import numpy as np
+
+    directory = Path(directory)
+
+    def load(name, code):
+        path = directory / f"{name}.col"
+        dtype = np.dtype(code).newbyteorder('<')
+        if not path.exists() or path.stat().st_size < dtype.itemsize:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    games = {name: load(name, code) for name, code in GAME_COLUMNS.items()}
+    moves = {name: load(name, code) for name, code in MOVE_COLUMNS.items()}
+    game_count = min(len(games['player_keys']) // SEATS_PER_GAME,
+                     *(len(column) for name, column in games.items() if name != 'player_keys'))
+    # Games are written after their moves, but a crash can still leave a move column short
+    move_rows = min(len(column) for column in moves.values())
+    ends = games['move_start'][:game_count].astype(np.int64) + games['move_count'][:game_count]
+    while game_count and ends[game_count - 1] > move_rows:
+        game_count -= 1
+    games = {name: column[:game_count * SEATS_PER_GAME] if name == 'player_keys' else column[:game_count]
+             for name, column in games.items()}
+    games['player_keys'] = games['player_keys'].reshape(game_count, SEATS_PER_GAME)
+    move_count = int(ends[game_count - 1]) if game_count else 0
+    moves = {name: column[:move_count] for name, column in moves.items()}
+    return games, moves
+
+
+def moves_by_game(games, moves):
+    """
+    Line the move columns up with the games they belong to.
+
+    Each game's moves are read from its move_start, so moves left behind by
+    an interrupted write are skipped rather than shifting later games.
+
+    Args:
+        games (dict): Game columns from open_columns
+        moves (dict): Move columns from open_columns
+
+    Returns:
+        tuple: (game index of every move, dict of move columns holding only
+            the games' moves, in game order)
+    """
+    import numpy as np
+
+    counts = games['move_count'].astype(np.int64)
+    game_of_move = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    starts = games['move_start'].astype(np.int64)
+    if np.array_equal(starts, offsets):
+        # Moves are contiguous from the start, as the writer leaves them
+        return game_of_move, {name: column[:len(game_of_move)] for name, column in moves.items()}
+    index = np.arange(len(game_of_move)) + np.repeat(starts - offsets, counts)
+    return game_of_move, {name: column[index] for name, column in moves.items()}
+
+
+def summarize(games, moves, top_players=10):
+    """
+    Compute aggregate statistics over memory-mapped archive columns.
+
+    Args:
+        games (dict): Game columns from open_columns
+        moves (dict): Move columns from open_columns
+        top_players (int): Number of most active players to report
+
+    Returns:
+        dict: Ask success rate, first-mover advantage, set-claim order and
+              per-player statistics
+    """
+    import numpy as np
+    from .engine.history import ASK, CLAIM
+
+    game_count = len(games['winner'])
+    if game_count == 0:
+        return {'games': 0, 'moves': 0}
+    # Game index of every move, so per-game columns can be joined to moves
+    game_of_move, moves = moves_by_game(games, moves)
+    is_ask = moves['move_type'] == ASK
+    is_claim = moves['move_type'] == CLAIM
+
+    # First mover: did the team of the starting seat win?
+    first_team = np.where((games['team2_seats'] >> games['first_seat']) & 1, 2, 1)
+    decided = games['winner'] != 0
+
+    # Claim order: position of each claim within its game
+    claim_game = game_of_move[is_claim]
+    claim_set = moves['card'][is_claim].astype(np.int64)
+    claim_rank = np.arange(len(claim_game)) - np.searchsorted(claim_game, claim_game)
+    set_claims = np.bincount(claim_set, minlength=10)[1:]
+    average_claim_position = np.bincount(claim_set, weights=claim_rank, minlength=10)[1:] / np.maximum(set_claims, 1)
+
+    # Per-player statistics keyed by hashed token
+    keys, player_index = np.unique(games['player_keys'], return_inverse=True)
+    player_index = player_index.reshape(games['player_keys'].shape)
+    seat_teams = np.where((games['team2_seats'][:, None] >> np.arange(SEATS_PER_GAME)) & 1, 2, 1)
+    won = seat_teams == games['winner'][:, None]
+    games_played = np.bincount(player_index.ravel(), minlength=len(keys))
+    wins = np.bincount(player_index.ravel(), weights=won.ravel(), minlength=len(keys))
+    ask_player = player_index[game_of_move[is_ask], moves['actor'][is_ask]]
+    asks = np.bincount(ask_player, minlength=len(keys))
+    asks_won = np.bincount(ask_player, weights=moves['outcome'][is_ask], minlength=len(keys))
+    ranked = np.argsort(-games_played, kind='stable')
+    top = ranked[keys[ranked] != 0][:top_players]
+
+    return {
+        'games': game_count,
+        'moves': len(game_of_move),
+        'askSuccessRate': float(moves['outcome'][is_ask].mean()) if is_ask.any() else None,
+        'firstMoverWinRate': float((first_team[decided] == games['winner'][decided]).mean()) if decided.any() else None,
+        'tieRate': float(1 - decided.mean()),
+        'averageClaimPosition': {set_number + 1: float(position)
+                                 for set_number, position in enumerate(average_claim_position)},
+        'players': [{
+            'key': f"{int(keys[i]):016x}",
+            'games': int(games_played[i]),
+            'winRate': float(wins[i] / games_played[i]),
+            'asks': int(asks[i]),
+            'askSuccessRate': float(asks_won[i] / asks[i]) if asks[i] else None,
+        } for i in top],
+    }
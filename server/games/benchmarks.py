@@ -0,0 +1,148 @@
+"""
+Benchmarks for Literature rooms, run through management commands.
+"""
+
+import gc
+import time
+import tracemalloc
+from .engine.card import CARD_LIST
+from .engine.game import IN_PROGRESS, Game
+from .engine.history import ASK, CLAIM, GameHistory, decode_move
+from .room import Room
+
+# Room states measured by measure_room_memory
+ROOM_KINDS = ('empty', 'lobby', 'in_progress')
+# Players seated in a measured lobby room
+LOBBY_PLAYERS = 3
+
+
+def build_room(kind, index):
+    """Build a room in the given state, driven through the normal action path."""
+    room = Room('literature', f'bench{index}')
+    if kind == 'empty':
+        return room
+    seats = LOBBY_PLAYERS if kind == 'lobby' else 6
+    for seat in range(seats):
+        room.register_action({'type': 'add_player', 'action_token': f'{index}-{seat}', 'player_name': f'p{seat}'})
+    if kind == 'in_progress':
+        room.register_action({'type': 'start_game', 'action_token': f'{index}-0'})
+    return room
+
+
+def measure_room_memory(kind, count):
+    """
+    Measure the memory held by rooms in one state.
+
+    Args:
+        kind (str): One of ROOM_KINDS
+        count (int): Number of rooms to build
+
+    Returns:
+        float: Bytes allocated per room and still alive once all are built
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        rooms = [build_room(kind, index) for index in range(count)]
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del rooms
+    return (after - before) / count
+
+
+def _game_state(game):
+    """The parts of a live game a GameHistory state describes, in the same shape."""
+    return {
+        'hands': {player_id: sorted(player.hand, key=CARD_LIST.index) for player_id, player in game.players.items()},
+        'currentPlayerId': game.current_turn_player_id,
+        'claimedSets': game.claimed_sets,
+        'scores': game.scores,
+    }
+
+
+def replay_game(history):
+    """
+    Re-run a recorded game through the current engine.
+
+    Games recorded with a seed are dealt again from it, which checks that the
+    deal and starting player still come out of the seed. Older games start
+    from the recorded deal. Every move must be accepted with the recorded
+    outcome, and the final state must match the record.
+
+    Args:
+        history (GameHistory): The recorded game
+
+    Returns:
+        list: Descriptions of every mismatch; empty if the replay matches
+    """
+    game = Game('replay', history.seed)
+    for seat, player_id in enumerate(history.seats):
+        game.add_player(player_id, f'seat{seat}', f'replay-{seat}').team = history.teams[seat]
+    expected = history.state_at(0)
+    if history.seed is not None:
+        game.start_game()
+        if _game_state(game) != {key: expected[key] for key in ('hands', 'currentPlayerId', 'claimedSets', 'scores')}:
+            return ["deal or starting player differs from the recorded seed"]
+    else:
+        for card_index, seat in enumerate(history.deal):
+            game.players[history.seats[seat]].add_card(CARD_LIST[card_index])
+        game.current_turn_player_id = expected['currentPlayerId']
+        game.state = IN_PROGRESS
+        game.history = GameHistory(history.seats, history.teams, history.deal, history.starting_seat)
+        game.rehash()
+    seats = history.seats
+    for index, move in enumerate(history.moves):
+        move_type, actor, target, value, _ = decode_move(move)
+        if move_type == ASK:
+            action = {'type': 'ask_card', 'asked_player_id': seats[target], 'card': CARD_LIST[value]}
+        elif move_type == CLAIM:
+            action = {'type': 'claim_set', 'set_number': value}
+        else:
+            action = {'type': 'pass_turn', 'teammate_id': seats[target]}
+        try:
+            # Accepts passes forced by a turn timeout as well as regular moves
+            game.register_timeout_action(seats[actor], action)
+        except ValueError as e:
+            return [f"move {index} rejected: {e}"]
+        if game.history.moves[index] != move:
+            return [f"move {index} has a different outcome"]
+    mismatches = []
+    expected = history.state_at(len(history))
+    for key, value in _game_state(game).items():
+        if value != expected[key]:
+            mismatches.append(f"final {key} differs")
+    return mismatches
+
+
+def run_replay_benchmark(histories, repeat=1):
+    """
+    Replay recorded games as fast as possible and check every one.
+
+    Args:
+        histories (dict): Game ID -> GameHistory
+        repeat (int): Times each game is replayed, for steadier timings
+
+    Returns:
+        dict: Counts, throughput and the mismatches of every failing game
+    """
+    failures = {}
+    moves = sum(len(history) for history in histories.values()) * repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for game_id, history in histories.items():
+            mismatches = replay_game(history)
+            if mismatches:
+                failures[game_id] = mismatches
+    seconds = time.perf_counter() - started
+    return {
+        'games': len(histories),
+        'repeat': repeat,
+        'moves': moves,
+        'seconds': round(seconds, 3),
+        'gamesPerSecond': round(len(histories) * repeat / seconds, 1) if seconds else None,
+        'movesPerSecond': round(moves / seconds) if seconds else None,
+        'failures': failures,
+    }
@@ -0,0 +1,131 @@
+"""
+Offline self-play training of the bot policy tables.
+
+Each round, worker processes play games in which every seat is a bot using
+the current tables, with some random exploration. At every decision the true
+outcome of every legal ask and claim is read from the hidden hands and
+counted against the move's features, so a game yields hundreds of labelled
+samples. The next tables are the smoothed success rates of those counts, and
+each round plays with the tables learned by the one before.
+"""
+
+import random
+from array import array
+from multiprocessing import Pool
+from .bots import ASK_SIZE, CLAIM_SIZE, BotPolicy, Knowledge, PolicyTables
+from .engine.card import get_set_cards
+from .engine.game import IN_PROGRESS, Game
+
+# Moves after which a self-play game is abandoned
+MAX_SELF_PLAY_MOVES = 400
+# Weight of the previous table in each smoothed success rate, in samples
+PRIOR_WEIGHT = 4.0
+
+
+def self_play(tables, games, seed, epsilon=0.1):
+    """
+    Play games between bots and count the outcomes of every legal move.
+
+    Args:
+        tables (PolicyTables): Tables the bots play with
+        games (int): Number of games to play
+        seed (int): Seed of the deals and the bots' choices
+        epsilon (float): Probability of a random legal move instead of the policy's
+
+    Returns:
+        tuple: Arrays of (ask attempts, ask successes, claim attempts, claim successes)
+            indexed like the tables
+    """
+    policy = BotPolicy(tables)
+    rng = random.Random(seed)
+    ask_tries, ask_hits = array('q', bytes(8 * ASK_SIZE)), array('q', bytes(8 * ASK_SIZE))
+    claim_tries, claim_hits = array('q', bytes(8 * CLAIM_SIZE)), array('q', bytes(8 * CLAIM_SIZE))
+    for _ in range(games):
+        game = Game('self-play', rng.getrandbits(64))
+        for seat in range(6):
+            game.add_player(f'bot{seat}', f'Bot {seat + 1}', f'bot-{seat}')
+        game.start_game()
+        knowledge = Knowledge(game.history)
+        while game.state == IN_PROGRESS and len(game.history) < MAX_SELF_PLAY_MOVES:
+            player_id = game.current_turn_player_id
+            player = game.players[player_id]
+            moves = game.legal_moves()
+            knowledge.update()
+            asks, claims = policy.features(game, player, knowledge)
+            for index, target, card in asks:
+                ask_tries[index] += 1
+                if card in game.players[target].hand:
+                    ask_hits[index] += 1
+            if claims:
+                team_cards = game.get_cards_held_by_team(player.team)
+                for index, set_number in claims:
+                    claim_tries[index] += 1
+                    if get_set_cards(set_number) <= team_cards:
+                        claim_hits[index] += 1
+            if rng.random() < epsilon and len(moves):
+                action = rng.choice(list(moves.actions()))
+            else:
+                action = policy.decide(game, player_id, knowledge, rng)
+            if action is None:
+                break
+            try:
+                game.register_in_game_action(player_id, action)
+            except ValueError:
+                # A random pass to a teammate without cards, say; let the policy move instead
+                game.register_in_game_action(player_id, policy.decide(game, player_id, knowledge, rng))
+    return ask_tries, ask_hits, claim_tries, claim_hits
+
+
+def _self_play_worker(job):
+    ask, claim, games, seed, epsilon = job
+    return self_play(PolicyTables(array('f', ask), array('f', claim)), games, seed, epsilon)
+
+
+def fit_tables(previous, ask_tries, ask_hits, claim_tries, claim_hits, prior_weight=PRIOR_WEIGHT):
+    """
+    Turn outcome counts into new tables, shrinking sparse cells toward the previous tables.
+
+    Returns:
+        PolicyTables: Smoothed success rates
+    """
+    def fit(prior, tries, hits):
+        return array('f', ((hits[i] + prior_weight * prior[i]) / (tries[i] + prior_weight) for i in range(len(prior))))
+    return PolicyTables(fit(previous.ask, ask_tries, ask_hits), fit(previous.claim, claim_tries, claim_hits))
+
+
+def train(rounds, games_per_round, processes=1, epsilon=0.1, seed=None, tables=None, report=print):
+    """
+    Learn policy tables by rounds of self-play spread over worker processes.
+
+    Args:
+        rounds (int): Rounds of self-play, each starting from the previous round's tables
+        games_per_round (int): Games played per round, split between the processes
+        processes (int): Worker processes
+        epsilon (float): Exploration rate of the bots
+        seed (int, optional): Seed making the run reproducible
+        tables (PolicyTables, optional): Starting tables, the defaults if omitted
+        report (callable): Called with a progress line after each round
+
+    Returns:
+        PolicyTables: The trained tables
+    """
+    if rounds < 1 or games_per_round < 1 or processes < 1:
+        raise ValueError("Rounds, games per round and processes must be positive")
+    rng = random.Random(seed)
+    tables = tables or PolicyTables.default()
+    # Many small jobs keep the processes evenly loaded
+    jobs_per_round = min(games_per_round, processes * 8)
+    with Pool(processes) as pool:
+        for round_number in range(1, rounds + 1):
+            ask, claim = list(tables.ask), list(tables.claim)
+            share, extra = divmod(games_per_round, jobs_per_round)
+            jobs = [(ask, claim, share + (i < extra), rng.getrandbits(64), epsilon) for i in range(jobs_per_round)]
+            ask_tries, ask_hits = array('q', bytes(8 * ASK_SIZE)), array('q', bytes(8 * ASK_SIZE))
+            claim_tries, claim_hits = array('q', bytes(8 * CLAIM_SIZE)), array('q', bytes(8 * CLAIM_SIZE))
+            for counts in pool.imap_unordered(_self_play_worker, jobs):
+                for total, part in zip((ask_tries, ask_hits, claim_tries, claim_hits), counts):
+                    for i, value in enumerate(part):
+                        total[i] += value
+            tables = fit_tables(tables, ask_tries, ask_hits, claim_tries, claim_hits)
+            report(f"Round {round_number}/{rounds}: {sum(ask_tries)} ask and {sum(claim_tries)} claim samples")
+    return tables
@@ -0,0 +1,554 @@
+"""
+Table-driven bots for Literature.
+
+A bot scores each legal move by looking up a few small features of it in
+precomputed tables and plays the best one, so a decision costs a handful of
+index computations however many rooms have bots. The tables hold estimated
+success probabilities of asks and claims, learned by offline self-play (see
+games.bot_training) and stored in a flat file that is memory-mapped at
+startup, so every worker process shares one copy.
+
+Bots only use what any player at the table could know: their own hand, hand
+sizes, claimed sets and the public outcome of every ask in the history.
+"""
+
+import mmap
+import os
+import struct
+import time
+import uuid
+from array import array
+from .engine.card import CARD_INDEX, CARD_LIST, get_set_cards, get_set_number
+from .engine.history import ASK, decode_move
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Player tokens of bot seats start with this; human tokens never may
+BOT_TOKEN_PREFIX = "bot-"
+# Seconds a bot waits before moving, so people can follow the game
+BOT_MOVE_DELAY = 1.0
+# Play a claim as soon as its estimated success probability reaches this
+CLAIM_CONFIDENCE = 0.95
+# Bot turns decided together at most, and seconds the first turn of a batch
+# waits for turns from other rooms to join it
+BOT_BATCH_SIZE = 256
+BOT_BATCH_WAIT = 0.1
+
+# Ask features: cards the bot holds in the set (0-6), what is known about the
+# target holding the card (unknown, holds it, lacks it), the target's hand size
+# bucket and how many opponents may still hold the card (0-3)
+ASK_SHAPE = (7, 3, 4, 4)
+UNKNOWN, HOLDS, LACKS = range(3)
+# Claim features: cards of the set the bot holds, cards known to be held by
+# teammates and cards known to be held by opponents (each 0-6)
+CLAIM_SHAPE = (7, 7, 7)
+ASK_SIZE = ASK_SHAPE[0] * ASK_SHAPE[1] * ASK_SHAPE[2] * ASK_SHAPE[3]
+CLAIM_SIZE = CLAIM_SHAPE[0] * CLAIM_SHAPE[1] * CLAIM_SHAPE[2]
+
+# Policy file: magic, format version, table sizes, then little-endian float32
+# ask probabilities followed by claim probabilities
+POLICY_MAGIC = b"LTBP"
+POLICY_VERSION = 1
+POLICY_HEADER = struct.Struct("<4sHxxII")
+
+
+def new_bot_token():
+    """Token for a new bot seat."""
+    return BOT_TOKEN_PREFIX + uuid.uuid4().hex
+
+
+def is_bot_token(token):
+    """Whether a player token belongs to a bot."""
+    return isinstance(token, str) and token.startswith(BOT_TOKEN_PREFIX)
+
+
+def hand_size_bucket(size):
+    """Bucket a hand size for the ask table: 1, 2-3, 4-6 or 7+ cards."""
+    return 0 if size <= 1 else 1 if size <= 3 else 2 if size <= 6 else 3
+
+
+def ask_index(mine, known, size_bucket, candidates):
+    """Flat index of an ask's features in the ask table."""
+    return ((mine * 3 + known) * 4 + size_bucket) * 4 + candidates
+
+
+def claim_index(mine, team_known, opponents_known):
+    """Flat index of a claim's features in the claim table."""
+    return (mine * 7 + team_known) * 7 + opponents_known
+
+
+class Knowledge:
+    """
+    Public knowledge of where cards are, read incrementally from a game's history.
+
+    A successful ask shows who holds the card; a failed ask shows that neither
+    the asker nor the asked player holds it. Cards are tracked by index into
+    CARD_LIST and players by seat.
+    """
+
+    __slots__ = ('history', 'processed', 'holder', 'lacks')
+
+    def __init__(self, history):
+        self.history = history
+        self.processed = 0  # Moves of the history already read
+        self.holder = [-1] * len(CARD_LIST)  # Seat known to hold each card, or -1
+        self.lacks = [0] * len(CARD_LIST)  # Bit mask of seats known not to hold each card
+
+    def update(self):
+        """Read the moves made since the last update."""
+        moves = self.history.moves
+        for index in range(self.processed, len(moves)):
+            move_type, actor, target, value, outcome = decode_move(moves[index])
+            if move_type != ASK:
+                continue
+            if outcome:
+                self.holder[value] = actor
+                self.lacks[value] = 0
+            else:
+                self.lacks[value] |= (1 << actor) | (1 << target)
+        self.processed = len(moves)
+
+
+class PolicyTables:
+    """Ask and claim success probabilities, indexed by ask_index and claim_index."""
+
+    def __init__(self, ask, claim, source=None):
+        """
+        Initialize the tables.
+
+        Args:
+            ask: Sequence of ASK_SIZE floats
+            claim: Sequence of CLAIM_SIZE floats
+            source: Object keeping the tables' memory alive, e.g. an mmap
+        """
+        if len(ask) != ASK_SIZE or len(claim) != CLAIM_SIZE:
+            raise ValueError("Policy tables have the wrong size")
+        self.ask = ask
+        self.claim = claim
+        self.source = source
+
+    @classmethod
+    def default(cls):
+        """
+        Hand-written starting tables: known holders are certain, otherwise
+        the card is equally likely to be with any opponent who may have it.
+        """
+        ask = array('f', bytes(4 * ASK_SIZE))
+        for mine in range(ASK_SHAPE[0]):
+            for size in range(ASK_SHAPE[2]):
+                for candidates in range(ASK_SHAPE[3]):
+                    ask[ask_index(mine, HOLDS, size, candidates)] = 1.0
+                    ask[ask_index(mine, UNKNOWN, size, candidates)] = 1.0 / max(candidates, 1)
+        claim = array('f', bytes(4 * CLAIM_SIZE))
+        for mine in range(7):
+            for team in range(7 - mine):
+                unknown = 6 - mine - team
+                claim[claim_index(mine, team, 0)] = 0.5 ** unknown
+        return cls(ask, claim)
+
+    def save(self, path):
+        """
+        Write the tables to a policy file.
+
+        The file is written under a temporary name and renamed over the old
+        one, since running servers have the old file memory-mapped and would
+        crash reading it if it were truncated in place.
+        """
+        ask, claim = array('f', self.ask), array('f', self.claim)
+        for table in (ask, claim):
+            if struct.pack('=H', 1) != struct.pack('<H', 1):
+                table.byteswap()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(POLICY_HEADER.pack(POLICY_MAGIC, POLICY_VERSION, ASK_SIZE, CLAIM_SIZE))
+                f.write(ask.tobytes())
+                f.write(claim.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a policy file.
+
+        Raises:
+            ValueError: If the file is not a policy file of this version
+        """
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, ask_size, claim_size = POLICY_HEADER.unpack_from(mapped)
+        if magic != POLICY_MAGIC or version != POLICY_VERSION:
+            raise ValueError(f"{path} is not a version {POLICY_VERSION} bot policy file")
+        if (ask_size, claim_size) != (ASK_SIZE, CLAIM_SIZE) or len(mapped) != POLICY_HEADER.size + 4 * (ask_size + claim_size):
+            raise ValueError(f"{path} has tables of the wrong size")
+        if struct.pack('=H', 1) != struct.pack('<H', 1):
+            # Big-endian hosts cannot use the little-endian file in place
+            floats = array('f', mapped[POLICY_HEADER.size:])
+            floats.byteswap()
+            mapped.close()
+            return cls(floats[:ask_size], floats[ask_size:])
+        floats = memoryview(mapped)[POLICY_HEADER.size:].cast('f')
+        return cls(floats[:ask_size], floats[ask_size:], mapped)
+
+
+class BotPolicy:
+    """Chooses moves by looking up features of every legal move in PolicyTables."""
+
+    def __init__(self, tables, claim_confidence=CLAIM_CONFIDENCE):
+        self.tables = tables
+        self.claim_confidence = claim_confidence
+        self.arrays = None  # NumPy views of the tables, see table_arrays
+
+    def features(self, game, player, knowledge):
+        """
+        Compute the table indexes of every ask and claim open to a player.
+
+        Args:
+            game (Game): Game in progress whose current player is `player`
+            player (LiteraturePlayer): The bot
+            knowledge (Knowledge): Public knowledge of the game, up to date
+
+        Returns:
+            tuple: (list of (ask index, target ID, card), list of (claim index, set number))
+        """
+        moves = game.legal_moves()
+        seats = knowledge.history.seat_index
+        holder, lacks = knowledge.holder, knowledge.lacks
+        team = {seats[p.id] for p in game.players.values() if p.team == player.team}
+        # Opponents who may hold cards; a card none of them can hold is with the team
+        opponents = 0
+        for p in game.players.values():
+            if p.team != player.team and p.hand:
+                opponents |= 1 << seats[p.id]
+        hand = player.hand
+        asks = []
+        if moves.ask_targets:
+            targets = [(seats[target], target, hand_size_bucket(len(game.players[target].hand)))
+                       for target in moves.ask_targets]
+            mine_by_set = {}
+            for card in moves.ask_cards:
+                set_number = get_set_number(card)
+                mine = mine_by_set.get(set_number)
+                if mine is None:
+                    mine = mine_by_set[set_number] = len(hand & get_set_cards(set_number))
+                index = CARD_INDEX[card]
+                known_seat, lacking = holder[index], lacks[index]
+                if known_seat >= 0:
+                    candidates = 0 if known_seat in team else 1
+                else:
+                    candidates = sum(1 for seat, _, _ in targets if not (lacking >> seat) & 1)
+                for seat, target, size in targets:
+                    if known_seat == seat:
+                        known = HOLDS
+                    elif known_seat >= 0 or (lacking >> seat) & 1:
+                        known = LACKS
+                    else:
+                        known = UNKNOWN
+                    asks.append((ask_index(mine, known, size, candidates), target, card))
+        claims = []
+        for set_number in moves.claims:
+            mine = team_known = opponents_known = 0
+            for card in get_set_cards(set_number):
+                if card in hand:
+                    mine += 1
+                    continue
+                index = CARD_INDEX[card]
+                known_seat = holder[index]
+                if known_seat >= 0:
+                    if known_seat in team:
+                        team_known += 1
+                    else:
+                        opponents_known += 1
+                elif lacks[index] & opponents == opponents:
+                    team_known += 1
+            claims.append((claim_index(mine, team_known, opponents_known), set_number))
+        return asks, claims
+
+    def decide(self, game, player_id, knowledge, rng):
+        """
+        Choose the move of a bot whose turn it is.
+
+        Args:
+            game (Game): Game in progress
+            player_id: ID of the bot, the current player
+            knowledge (Knowledge): Public knowledge of the game
+            rng (random.Random): Breaks ties between equally good moves
+
+        Returns:
+            dict: In-game action, or None if the bot has no move
+        """
+        move, features = self._prepare(game, player_id, knowledge, rng)
+        if features is None:
+            return move
+        return self.choose(*features, rng)
+
+    def _prepare(self, game, player_id, knowledge, rng):
+        """
+        Settle the moves that need no tables, or compute the features of the rest.
+
+        Returns:
+            tuple: (move, None) if the move is settled, else (None, (asks, claims))
+        """
+        knowledge.update()
+        moves = game.legal_moves()
+        if moves is None:
+            return None, None
+        if moves.passes:
+            # Out of cards: hand the turn to the teammate with the most
+            best = max(len(game.players[p].hand) for p in moves.passes)
+            if best:
+                choice = rng.choice([p for p in moves.passes if len(game.players[p].hand) == best])
+                return {'type': 'pass_turn', 'teammate_id': choice}, None
+        return None, self.features(game, game.players[player_id], knowledge)
+
+    def decide_batch(self, requests, rng):
+        """
+        Choose the moves of many bots at once.
+
+        Each bot's observable state is encoded as one row of a batch of
+        arrays, the features of every (card, seat) ask and every claim of
+        every row are computed with array operations, scored by one lookup
+        into each table and reduced per row. Moves are the same as decide's,
+        with ties broken at random.
+
+        Args:
+            requests (list): (game, bot ID, Knowledge) of each bot whose turn it is
+            rng (random.Random): Breaks ties between equally good moves
+
+        Returns:
+            list: In-game action, or None, for each request in order
+        """
+        import numpy as np
+        results = [None] * len(requests)
+        rows = []  # (request index, game, seats) of the bots whose move needs the tables
+        for i, (game, player_id, knowledge) in enumerate(requests):
+            knowledge.update()
+            moves = game.legal_moves()
+            if moves is None:
+                continue
+            if moves.passes and not game.players[player_id].hand:
+                move, _ = self._prepare(game, player_id, knowledge, rng)
+                if move is not None:
+                    results[i] = move
+                    continue
+            rows.append((i, game, knowledge))
+        if not rows:
+            return results
+        batch = encode_states(np, [(game, requests[i][1], knowledge) for i, game, knowledge in rows])
+        ask_table, claim_table = self.table_arrays()
+        set_of_card, set_cards, size_buckets = _card_layout(np)
+        hand, holder, lacks = batch['hand'], batch['holder'], batch['lacks']
+        opponents, teammates, sizes = batch['opponents'], batch['teammates'], batch['sizes']
+        count = len(rows)
+
+        mine = hand.astype(np.int64) @ set_cards  # (rows, sets) cards held per set
+        mine_by_card = mine[:, set_of_card]  # (rows, cards)
+        seat_bits = 1 << np.arange(sizes.shape[1])
+        lacking = (lacks[:, :, None] & seat_bits) != 0  # (rows, cards, seats)
+        known = holder >= 0
+        holder_seat = np.where(known, holder, 0)
+        holder_on_team = known & np.take_along_axis(teammates, holder_seat, axis=1)
+        askable = opponents & (sizes > 0)  # (rows, seats)
+        # Ask features of every (card, seat) pair; pairs that are not legal asks are masked out
+        holds = known[:, :, None] & (holder[:, :, None] == np.arange(sizes.shape[1]))
+        state = np.where(holds, HOLDS, np.where(known[:, :, None] | lacking, LACKS, UNKNOWN))
+        candidates = np.where(known, np.where(holder_on_team, 0, 1),
+                              (askable[:, None, :] & ~lacking).sum(axis=2))
+        index = ((mine_by_card[:, :, None] * 3 + state) * 4 + size_buckets[sizes][:, None, :]) * 4 + candidates[:, :, None]
+        legal = (askable[:, None, :] & (~hand & (mine_by_card > 0))[:, :, None])
+        values = np.where(legal, ask_table[index], -1.0)
+        # Jitter far below any difference between table entries picks uniformly among ties
+        jitter = np.random.default_rng(rng.getrandbits(64)).random(values.shape) * 1e-10
+        flat = (values + jitter).reshape(count, -1)
+        best_ask = flat.argmax(axis=1)
+        best_ask_value = values.reshape(count, -1)[np.arange(count), best_ask]
+
+        # Claim features of every set: cards a teammate is known or deduced to hold, and
+        # cards an opponent is known to hold
+        opponent_mask = (askable * seat_bits).sum(axis=1)[:, None]
+        with_team = ~hand & ((holder_on_team) | (~known & ((lacks & opponent_mask) == opponent_mask)))
+        with_opponents = ~hand & known & ~holder_on_team
+        claim_index = (mine * 7 + with_team.astype(np.int64) @ set_cards) * 7 + with_opponents.astype(np.int64) @ set_cards
+        claim_values = np.where(batch['claimed'], -1.0, claim_table[claim_index])
+        best_claim = claim_values.argmax(axis=1)
+        best_claim_value = claim_values[np.arange(count), best_claim]
+
+        players = sizes.shape[1]
+        for row, (i, game, knowledge) in enumerate(rows):
+            # Claim when confident, or when every ask is sure to fail
+            if best_claim_value[row] >= 0 and (best_claim_value[row] >= self.claim_confidence or best_ask_value[row] <= 0):
+                results[i] = {'type': 'claim_set', 'set_number': int(best_claim[row]) + 1}
+            elif best_ask_value[row] > 0:
+                card, seat = divmod(int(best_ask[row]), players)
+                results[i] = {'type': 'ask_card', 'asked_player_id': knowledge.history.seats[seat],
+                              'card': CARD_LIST[card]}
+        return results
+
+    def table_arrays(self):
+        """The tables as NumPy float32 arrays sharing their memory, created on first use."""
+        if self.arrays is None:
+            import numpy as np
+            self.arrays = (np.frombuffer(self.tables.ask, dtype=np.float32),
+                           np.frombuffer(self.tables.claim, dtype=np.float32))
+        return self.arrays
+
+    def choose(self, asks, claims, rng):
+        """Pick the best move given the features computed by features()."""
+        ask_table, claim_table = self.tables.ask, self.tables.claim
+        best, choices = 0.0, []
+        for index, target, card in asks:
+            value = ask_table[index]
+            if value > best:
+                best, choices = value, [(target, card)]
+            elif value == best and best > 0:
+                choices.append((target, card))
+        if claims:
+            value, set_number = max((claim_table[index], set_number) for index, set_number in claims)
+            # Claim when confident, or when every ask is sure to fail
+            if value >= self.claim_confidence or not choices:
+                return {'type': 'claim_set', 'set_number': set_number}
+        if not choices:
+            return None
+        target, card = rng.choice(choices)
+        return {'type': 'ask_card', 'asked_player_id': target, 'card': card}
+
+
+def encode_states(np, requests):
+    """
+    Encode what bots can observe of their games as a batch of arrays, one row per bot.
+
+    Cards are indexed like CARD_LIST and players by seat.
+
+    Args:
+        requests (list): (game, bot ID, up-to-date Knowledge) of each bot
+
+    Returns:
+        dict: hand (rows, cards) bool, the bot's cards; holder (rows, cards)
+            seat known to hold each card or -1; lacks (rows, cards) bit mask of
+            seats known not to; sizes (rows, seats) hand sizes; opponents and
+            teammates (rows, seats) bool; claimed (rows, sets) bool
+    """
+    seats = max(len(knowledge.history.seats) for _, _, knowledge in requests)
+    cards_held, holders, lacks, sizes, teams, own_teams, claimed = [], [], [], [], [], [], []
+    for row, (game, player_id, knowledge) in enumerate(requests):
+        players = game.players
+        base = row * len(CARD_LIST)
+        cards_held += [base + CARD_INDEX[card] for card in players[player_id].hand]
+        holders.append(knowledge.holder)
+        lacks.append(knowledge.lacks)
+        # Seats of players who left are padded with team 0 and no cards
+        seated = [players.get(seat_player_id) for seat_player_id in knowledge.history.seats]
+        seated += [None] * (seats - len(seated))
+        sizes.append([len(p.hand) if p else 0 for p in seated])
+        teams.append([p.team if p else 0 for p in seated])
+        own_teams.append(players[player_id].team)
+        claimed += [row * 9 + set_number - 1 for set_number in game.claimed_sets]
+    hand = np.zeros((len(requests), len(CARD_LIST)), dtype=bool)
+    hand.flat[cards_held] = True
+    claimed_sets = np.zeros((len(requests), 9), dtype=bool)
+    claimed_sets.flat[claimed] = True
+    teams, own_teams = np.array(teams), np.array(own_teams)[:, None]
+    return {
+        'hand': hand,
+        'holder': np.array(holders, dtype=np.int64),
+        'lacks': np.array(lacks, dtype=np.int64),
+        'sizes': np.array(sizes, dtype=np.int64),
+        'opponents': (teams != own_teams) & (teams != 0),
+        'teammates': teams == own_teams,
+        'claimed': claimed_sets,
+    }
+
+
+card_layout = None
+
+
+def _card_layout(np):
+    """Set of each card, a cards x sets membership matrix and the hand size buckets, built once."""
+    global card_layout
+    if card_layout is None:
+        set_of_card = np.array([get_set_number(card) - 1 for card in CARD_LIST])
+        set_cards = np.zeros((len(CARD_LIST), 9), dtype=np.int64)
+        set_cards[np.arange(len(CARD_LIST)), set_of_card] = 1
+        size_buckets = np.array([hand_size_bucket(size) for size in range(len(CARD_LIST) + 1)])
+        card_layout = (set_of_card, set_cards, size_buckets)
+    return card_layout
+
+
+class DecisionBatcher:
+    """
+    Collects the bot turns that come due across every room and decides them together.
+
+    A batch is handed to the decide callback once batch_size turns are
+    waiting, or batch_wait seconds after the first of them arrived, whichever
+    comes first.
+    """
+
+    def __init__(self, timers, decide, batch_size=BOT_BATCH_SIZE, batch_wait=BOT_BATCH_WAIT):
+        """
+        Initialize the batcher.
+
+        Args:
+            timers (TimerWheel): Wheel running the batch deadline
+            decide: Callable taking {key: monotonic time the turn came due}
+            batch_size (int): Turns that trigger a batch at once
+            batch_wait (float): Seconds the oldest turn waits for others
+        """
+        if batch_size < 1 or batch_wait < 0:
+            raise ValueError("Bot batch size must be positive and the wait not negative")
+        self.timers = timers
+        self.decide = decide
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.pending = {}  # key -> monotonic time the turn came due
+        self.deadline = None  # Timer flushing the current batch
+
+    def submit(self, key):
+        """Queue a bot turn, identified by key, for the next batch."""
+        if key in self.pending:
+            return
+        self.pending[key] = time.monotonic()
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.deadline is None:
+            self.deadline = self.timers.schedule(self.batch_wait, self.flush)
+
+    def discard(self, key):
+        """Drop a queued turn that no longer needs deciding."""
+        self.pending.pop(key, None)
+
+    def flush(self):
+        """Decide every queued turn now."""
+        if self.deadline is not None:
+            self.timers.cancel(self.deadline)
+            self.deadline = None
+        batch, self.pending = self.pending, {}
+        if batch:
+            self.decide(batch)
+
+
+bot_policy = None
+
+
+def get_bot_policy():
+    """Return the process-wide bot policy, mapping BOT_POLICY_FILE on first use."""
+    global bot_policy
+    if bot_policy is None:
+        from django.conf import settings
+        path = getattr(settings, 'BOT_POLICY_FILE', '')
+        tables = None
+        if path and os.path.exists(path):
+            try:
+                tables = PolicyTables.load(path)
+            except (OSError, ValueError) as e:
+                log.error("bot_policy_load_failed", path=path, error=str(e))
+        bot_policy = BotPolicy(tables or PolicyTables.default())
+    return bot_policy
@@ -0,0 +1,162 @@
+"""
+In-room chat for Literature rooms.
+
+Chat shares the players' websocket but not the path of game updates. Messages
+never enter the room's event log or its channel group: each room with chat
+has a ChatChannel that keeps the latest messages in a ring buffer for late
+joiners and writes new ones straight to its members' sockets. Messages
+arriving close together are coalesced into one frame, serialized once and
+sent by a single task, so a flood of chat costs one frame per member per
+flush and never queues in front of a room.message state broadcast.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from .metrics import metrics
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Longest chat message accepted, in characters
+CHAT_MAX_LENGTH = 200
+# Chat messages per second (and burst) allowed from one player token
+CHAT_MESSAGE_RATE, CHAT_MESSAGE_BURST = 1, 5
+# Messages kept for players who join later
+CHAT_HISTORY_SIZE = 50
+# Seconds new messages wait for others to share their frame
+CHAT_FLUSH_DELAY = 0.1
+# Most messages sent in one frame
+CHAT_BATCH_SIZE = 20
+# Sends between yields to the event loop during a fan-out
+CHAT_SEND_BATCH = 100
+
+metrics.describe("chat_messages_total", "counter", "Chat messages accepted")
+metrics.describe("chat_frames_total", "counter", "Batched chat frames fanned out to a room")
+
+
+def chat_frame(messages):
+    """Encode chat messages as one frame for a client."""
+    return json.dumps({"success": True, "chat": list(messages)})
+
+
+class ChatChannel:
+    """Chat of one room: its recent messages and the sockets they are sent to."""
+
+    def __init__(self, room_id, get_room):
+        self.room_id = room_id
+        self.get_room = get_room
+        self.members = set()  # consumers with async send() and the user_token of their seat
+        self.history = deque(maxlen=CHAT_HISTORY_SIZE)
+        # Messages not yet fanned out; under a flood the oldest are only in the history
+        self.pending = deque(maxlen=CHAT_HISTORY_SIZE)
+        self.next_id = 1
+        self.task = None
+
+    def post(self, player_id, name, text, now=None):
+        """
+        Add a message and schedule its fan-out.
+
+        Returns:
+            dict: The message as sent to clients
+        """
+        message = {
+            "id": self.next_id,
+            "playerId": player_id,
+            "name": name,
+            "text": text,
+            "time": round(time.time() if now is None else now, 3),
+        }
+        self.next_id += 1
+        self.history.append(message)
+        self.pending.append(message)
+        metrics.inc("chat_messages_total")
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._flush())
+        return message
+
+    async def _flush(self):
+        await asyncio.sleep(CHAT_FLUSH_DELAY)
+        while self.pending:
+            batch = [self.pending.popleft() for _ in range(min(len(self.pending), CHAT_BATCH_SIZE))]
+            frame = chat_frame(batch)
+            metrics.inc("chat_frames_total")
+            room = self.get_room(self.room_id)
+            seated = room.connected_players if room else {}
+            for count, consumer in enumerate(list(self.members), 1):
+                if consumer.user_token not in seated:
+                    # Removed from the room while its socket stays open
+                    continue
+                try:
+                    await consumer.send(text_data=frame)
+                except Exception as e:
+                    # One broken socket must not cost the others the batch
+                    self.members.discard(consumer)
+                    log.warning("chat_send_failed", room_id=self.room_id, error=str(e))
+                if count % CHAT_SEND_BATCH == 0:
+                    await asyncio.sleep(0)
+            if self.pending:
+                await asyncio.sleep(CHAT_FLUSH_DELAY)
+
+
+class ChatHub:
+    """Chat channels of every room served by this process."""
+
+    def __init__(self, get_room):
+        """
+        Initialize the hub.
+
+        Args:
+            get_room: Callable returning the room for an ID, or None
+        """
+        self.get_room = get_room
+        self.channels = {}  # room_id -> ChatChannel
+
+    def join(self, room_id, consumer):
+        """
+        Start sending a room's chat to a consumer.
+
+        Returns:
+            str: Frame with the room's recent messages, or None if there are none.
+                Messages still waiting for their fan-out are in it too; clients
+                drop the repeats by ID.
+        """
+        channel = self.channels.get(room_id)
+        if channel is None:
+            channel = self.channels[room_id] = ChatChannel(room_id, self.get_room)
+        channel.members.add(consumer)
+        return chat_frame(channel.history) if channel.history else None
+
+    def leave(self, room_id, consumer):
+        """Stop sending a room's chat to a consumer, forgetting the chat of rooms gone from here."""
+        channel = self.channels.get(room_id)
+        if channel is None:
+            return
+        channel.members.discard(consumer)
+        if not channel.members and self.get_room(room_id) is None:
+            del self.channels[room_id]
+
+    def post(self, room_id, player_id, name, text):
+        """
+        Send a chat message to a room.
+
+        Args:
+            room_id: ID of the room
+            player_id: ID of the sender's seat
+            name (str): Sender's name
+            text (str): Message, already validated
+
+        Returns:
+            dict: The message as sent to clients
+
+        Raises:
+            ValueError: If the message is blank
+        """
+        text = text.strip()
+        if not text:
+            raise ValueError("Chat message is empty")
+        channel = self.channels.get(room_id)
+        if channel is None:
+            channel = self.channels[room_id] = ChatChannel(room_id, self.get_room)
+        return channel.post(player_id, name, text)
@@ -0,0 +1,257 @@
+"""
+Multi-node room placement and live room migration.
+
+Migration protocol, for a room moving from node S to node T:
+1. S freezes the room so no action can change it, and snapshots it together
+   with its recent event buffer.
+2. S sends the snapshot to T on T's node channel and waits for an answer.
+3. T rebuilds the room and holds it, not yet serving it, then replies.
+4. S sends T a commit, drops its copy, points the directory at T and tells
+   its connected clients to reconnect to T.
+5. On the commit T starts serving the room, with every seat in the
+   disconnect grace period so its players can resume.
+If T rejects the room or does not answer in time, S sends it an abort,
+unfreezes the room and the game carries on where it was. T drops a held
+room on the abort, or when no commit arrives within the migration timeout,
+so a late answer never leaves two nodes serving the same room.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import deque
+from .admission import AdmissionRefused
+from .directory import RoomDirectory
+from .room import EVENT_BUFFER_SIZE, Room
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Seconds the source waits for the target to accept a migrating room
+MIGRATION_TIMEOUT_SECONDS = 5
+# Seconds between load reports
+LOAD_REPORT_INTERVAL = 5
+
+
+def node_channel(node_id):
+    """Name of the pub/sub channel addressed to one node."""
+    return f'node.{node_id}'
+
+
+class ClusterNode:
+    """Membership of the local RoomManager in a multi-node deployment."""
+
+    def __init__(self, node_id, address, manager, pubsub, admission=None):
+        """
+        Initialize the node.
+
+        Args:
+            node_id (str): Unique ID of this node
+            address (str): host:port clients use to reach this node
+            manager (RoomManager): Rooms served by this node
+            pubsub (PubSub): Transport shared by all nodes
+            admission (AdmissionController, optional): Decides whether this node takes new rooms
+        """
+        self.node_id = node_id
+        self.address = address
+        self.manager = manager
+        self.pubsub = pubsub
+        self.admission = admission
+        self.directory = RoomDirectory(node_id, pubsub)
+        self.pending = {}  # request ID -> future resolved by the reply
+        self.incoming = {}  # room_id -> (Room held until its source commits, TimerHandle dropping it)
+        self.on_room_moved = None  # Coroutine function called with (room_id, address) after a room leaves
+        self.started = False
+        self.reporter = None
+
+    async def start(self):
+        """Join the cluster and announce the rooms served here."""
+        if self.started:
+            return
+        self.started = True
+        await self.pubsub.subscribe(node_channel(self.node_id), self._on_message)
+        await self.directory.start()
+        await self.directory.register_node(self.address)
+        for room_id in list(self.manager.rooms):
+            await self.directory.assign(room_id, self.node_id)
+        self.reporter = asyncio.ensure_future(self._report_load())
+
+    async def _report_load(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        while True:
+            await asyncio.sleep(LOAD_REPORT_INTERVAL)
+            now_wall, now_cpu = time.monotonic(), time.process_time()
+            utilization = min((now_cpu - cpu) / max(now_wall - wall, 1e-6), 1.0)
+            wall, cpu = now_wall, now_cpu
+            await self.directory.report_load(len(self.manager.rooms), utilization)
+
+    async def _request(self, node_id, message):
+        request_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        message.update({'request_id': request_id, 'reply_to': self.node_id})
+        try:
+            await self.pubsub.publish(node_channel(node_id), message)
+            return await asyncio.wait_for(future, MIGRATION_TIMEOUT_SECONDS)
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def _reply(self, request, message):
+        message['request_id'] = request['request_id']
+        await self.pubsub.publish(node_channel(request['reply_to']), message)
+
+    async def _on_message(self, message):
+        kind = message['type']
+        if kind == 'reply':
+            future = self.pending.get(message['request_id'])
+            if future and not future.done():
+                future.set_result(message)
+        elif kind == 'migrate_room':
+            await self._accept_room(message)
+        elif kind == 'commit_room':
+            await self._commit_room(message['room_id'])
+        elif kind == 'abort_room':
+            self._drop_incoming(message['room_id'])
+        elif kind == 'create_room':
+            try:
+                room_id = await self._create_local(message['game_type'])
+            except AdmissionRefused as e:
+                await self._reply(message, {'type': 'reply', 'ok': False, 'reason': e.reason})
+            else:
+                await self._reply(message, {'type': 'reply', 'ok': True, 'room_id': room_id})
+        elif kind == 'drain':
+            await self.drain()
+
+    async def _create_local(self, game_type):
+        if self.admission:
+            reason = self.admission.admit('room', len(self.manager.rooms))
+            if reason:
+                raise AdmissionRefused(reason)
+        room = self.manager.create_room(game_type)
+        await self.directory.assign(room.room_id, self.node_id)
+        return room.room_id
+
+    async def create_room(self, game_type):
+        """
+        Create a room on the least loaded node.
+
+        The node creating the room applies its own admission control.
+
+        Returns:
+            tuple: (room ID, address of the node serving it)
+
+        Raises:
+            AdmissionRefused: If the chosen node is too busy to take the room
+        """
+        target = self.directory.place() or self.node_id
+        if target == self.node_id:
+            return await self._create_local(game_type), self.address
+        reply = await self._request(target, {'type': 'create_room', 'game_type': game_type})
+        if not reply.get('ok'):
+            raise AdmissionRefused(reply['reason'])
+        return reply['room_id'], self.directory.address_of(target)
+
+    async def migrate_room(self, room_id, target):
+        """
+        Move a room to another node without ending its game.
+
+        Args:
+            room_id: ID of a room served by this node
+            target (str): ID of the receiving node
+
+        Returns:
+            bool: True if the room now lives on the target
+        """
+        room = self.manager.get_room(room_id)
+        if room is None or room.frozen:
+            return False
+        room.frozen = True
+        moved = False
+        try:
+            try:
+                reply = await self._request(target, {
+                    'type': 'migrate_room',
+                    'snapshot': room.snapshot(),
+                    'events': list(room.events),
+                })
+            except asyncio.TimeoutError:
+                reply = {'ok': False, 'error': 'timed out'}
+            if not reply.get('ok'):
+                log.error("room_migration_failed", room_id=room_id, target=target, error=reply.get('error'))
+                # A target that accepts the room after all must not start serving it
+                await self.pubsub.publish(node_channel(target), {'type': 'abort_room', 'room_id': room_id})
+                return False
+            await self.pubsub.publish(node_channel(target), {'type': 'commit_room', 'room_id': room_id})
+            moved = True
+        finally:
+            if not moved:
+                room.frozen = False
+        self.manager.release_room(room_id)
+        await self.directory.assign(room_id, target)
+        if self.on_room_moved:
+            await self.on_room_moved(room_id, self.directory.address_of(target))
+        return True
+
+    async def _accept_room(self, message):
+        try:
+            room = Room.from_snapshot(message['snapshot'])
+            room.events = deque(message['events'], maxlen=EVENT_BUFFER_SIZE)
+            if room.room_id in self.manager.rooms or room.room_id in self.incoming:
+                raise ValueError("Room already exists on this node")
+        except (KeyError, ValueError) as e:
+            await self._reply(message, {'type': 'reply', 'ok': False, 'error': str(e)})
+            return
+        expiry = asyncio.get_running_loop().call_later(MIGRATION_TIMEOUT_SECONDS, self._drop_incoming, room.room_id)
+        self.incoming[room.room_id] = (room, expiry)
+        await self._reply(message, {'type': 'reply', 'ok': True})
+
+    def _drop_incoming(self, room_id):
+        held = self.incoming.pop(room_id, None)
+        if held is not None:
+            held[1].cancel()
+            log.warning("room_migration_abandoned", room_id=room_id)
+
+    async def _commit_room(self, room_id):
+        held = self.incoming.pop(room_id, None)
+        if held is None:
+            log.error("room_migration_commit_unknown", room_id=room_id)
+            return
+        room, expiry = held
+        expiry.cancel()
+        self.manager.adopt_room(room)
+        await self.directory.assign(room_id, self.node_id)
+
+    async def drain(self):
+        """Stop taking rooms and move every room served here to other nodes."""
+        await self.directory.set_draining(True)
+        for room_id, room in list(self.manager.rooms.items()):
+            if not room.connected_players:
+                # Nobody to carry over; public rooms exist on every node anyway
+                self.manager.release_room(room_id)
+                if self.directory.lookup(room_id) == self.node_id:
+                    await self.directory.unassign(room_id)
+                continue
+            target = self.directory.place(exclude=(self.node_id,))
+            if target is None:
+                log.warning("room_migration_no_target", room_id=room_id)
+                continue
+            await self.migrate_room(room_id, target)
+
+
+cluster_node = None
+
+
+def get_cluster_node():
+    """Return this process's ClusterNode, or None when clustering is not configured."""
+    global cluster_node
+    if cluster_node is None:
+        from django.conf import settings
+        from .admission import get_admission_controller
+        from .pubsub import create_pubsub
+        from .room_manager import RoomManager
+        node_id = getattr(settings, 'CLUSTER_NODE_ID', '')
+        if not node_id:
+            return None
+        cluster_node = ClusterNode(node_id, settings.CLUSTER_NODE_ADDRESS, RoomManager.get_instance(),
+                                   create_pubsub(settings.CLUSTER_PUBSUB), get_admission_controller())
+    return cluster_node
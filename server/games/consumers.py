@@ -1,17 +1,198 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
+import asyncio
 import json
+import math
+import time
+from urllib.parse import parse_qs
 from .room_manager import RoomManager
-from asgiref.sync import sync_to_async
+from .cluster import get_cluster_node
+from .spectators import SPECTATOR_MIN_INTERVAL, SpectatorHub
+from .chat import CHAT_MESSAGE_BURST, CHAT_MESSAGE_RATE, ChatHub
+from .timer_wheel import TIMER_TICK_SECONDS
+from .rate_limit import RateLimiter
+from .validation import decode_client_frame, validate_client_action
+from .acks import AckTracker, ack_frame, nack_frame
+from .admission import get_admission_controller
+from .metrics import metrics
+from .bots import is_bot_token
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.utils.functional import SimpleLazyObject
+from literature.push_notifications import get_notification_service
+from literature.logs import elapsed_ms, get_logger
+
+log = get_logger(__name__)
+
+# Presence changes arriving within this window share one room broadcast
+PRESENCE_BROADCAST_DELAY = 0.25
+# Messages per second (and burst) allowed from one player token and from one client IP
+TOKEN_MESSAGE_RATE, TOKEN_MESSAGE_BURST = 5, 20
+IP_MESSAGE_RATE, IP_MESSAGE_BURST = 50, 200
+# Close codes of a client closing on purpose (normal closure, going away); its seat is freed at once
+LEAVING_CLOSE_CODES = frozenset((1000, 1001))
+# Prefix of the seat tokens of authenticated users; anonymous URLs may not use it
+ACCOUNT_TOKEN_PREFIX = "user-"
+
+# Built on first use so importing the routing does not restore rooms
+room_manager = SimpleLazyObject(RoomManager.get_instance)
+admission = SimpleLazyObject(get_admission_controller)
+pending_broadcasts = set()  # room IDs with a batched broadcast scheduled
+timer_driver = None
+metrics.describe("messages_dropped_total", "counter", "Client messages dropped before reaching a room")
+token_limiter = RateLimiter(TOKEN_MESSAGE_RATE, TOKEN_MESSAGE_BURST)
+ip_limiter = RateLimiter(IP_MESSAGE_RATE, IP_MESSAGE_BURST)
+action_acks = AckTracker()
+spectator_hub = SpectatorHub(lambda room_id: room_manager.get_room(room_id))
+chat_hub = ChatHub(lambda room_id: room_manager.get_room(room_id))
+chat_limiter = RateLimiter(CHAT_MESSAGE_RATE, CHAT_MESSAGE_BURST)
+
+
+async def flush_room_broadcast(channel_layer, room_id):
+    """Send one batched broadcast for all presence changes in a room."""
+    await asyncio.sleep(PRESENCE_BROADCAST_DELAY)
+    pending_broadcasts.discard(room_id)
+    await channel_layer.group_send(f"room_{room_id}", {"type": "room.message"})
+    spectator_hub.notify(room_id)
+
+
+def schedule_room_broadcast(channel_layer, room_id):
+    """Schedule a batched broadcast for a room unless one is already pending."""
+    if room_id in pending_broadcasts:
+        return
+    pending_broadcasts.add(room_id)
+    asyncio.ensure_future(flush_room_broadcast(channel_layer, room_id))
+
+
+async def drive_timers(channel_layer):
+    """Tick the room manager's timer wheel and broadcast the rooms its timers changed."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(TIMER_TICK_SECONDS)
+        # Oversleeping the tick measures how backed up the event loop is
+        admission.record_lag(loop.time() - started - TIMER_TICK_SECONDS)
+        for room_id in room_manager.run_timers():
+            schedule_room_broadcast(channel_layer, room_id)
+
+
+def ensure_timer_driver(channel_layer):
+    """Start the timer driver on the running event loop if needed."""
+    global timer_driver
+    if timer_driver is None or timer_driver.done():
+        timer_driver = asyncio.ensure_future(drive_timers(channel_layer))
+
+
+async def ensure_cluster(channel_layer):
+    """Join the cluster on first use and return the local node, if clustering is enabled."""
+    cluster = get_cluster_node()
+    if cluster and not cluster.started:
+        async def on_room_moved(room_id, address):
+            await channel_layer.group_send(f"room_{room_id}", {"type": "room.migrated", "address": address})
+            spectator_hub.notify(room_id)
+        cluster.on_room_moved = on_room_moved
+        await cluster.start()
+    return cluster
+
+
+async def start_worker():
+    """
+    Restore this worker's rooms, start ticking their timers and join the cluster.
+
+    Runs at ASGI lifespan startup where the server sends it, and otherwise
+    before the first request or connection this worker handles; later calls
+    only restart a driver that stopped.
+
+    Returns:
+        ClusterNode: The local node, or None when clustering is not configured
+    """
+    RoomManager.get_instance()
+    channel_layer = get_channel_layer()
+    ensure_timer_driver(channel_layer)
+    return await ensure_cluster(channel_layer)
+
+
+def ensure_worker_started():
+    """Run start_worker from a sync view unless the worker is already running."""
+    cluster = get_cluster_node()
+    if timer_driver is None or timer_driver.done() or (cluster and not cluster.started):
+        async_to_sync(start_worker)()
+
+
+async def worker_lifespan(scope, receive, send):
+    """ASGI lifespan handler starting the worker before any request arrives."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await start_worker()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def refuse_connection(consumer, reason):
+    """Turn a websocket away while the worker is overloaded."""
+    await consumer.send(text_data=json.dumps(
+        {
+            "success": False,
+            "error": admission.busy_message(reason),
+            "retryAfter": admission.retry_after,
+        }
+    ))
+    await consumer.close(code=1013)
+
 
-room_manager = RoomManager.get_instance()
 class RoomConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
         self.user_token = self.scope["url_route"]["kwargs"]["user_token"]
         username = self.scope["url_route"]["kwargs"]["username"]
+        user = self.scope.get("auth_user")
+        if user is not None:
+            # An authenticated user always gets the same seat, whatever the URL claims
+            self.user_token = f"{ACCOUNT_TOKEN_PREFIX}{user.id}"
+            username = user.username
         self.room_group_name = f"room_{self.room_id}"
-        print(f"Connecting user {username} to room {self.room_id}")
+        self.joined = False
+        self.admitted = False  # Counted as an open socket by the admission controller
+        self.sent_version = None  # Room version of the last state sent to this client
+        self.client_ip = (self.scope.get("client") or ("",))[0]
+        self.rate_limited = False  # Set once the client was told it is sending too fast
+        self.player_id = None  # ID of the client's seat once joined, for logs
+        if is_bot_token(self.user_token):
+            # Bot seats are driven by the server; nobody may connect as one
+            log.warning("bot_seat_connect_refused", room_id=self.room_id)
+            await self.close()
+            return
+        if user is None and self.user_token.startswith(ACCOUNT_TOKEN_PREFIX):
+            # Account seats are only reachable with the account's own auth token
+            log.warning("account_seat_connect_refused", room_id=self.room_id)
+            await self.close()
+            return
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        ensure_timer_driver(self.channel_layer)
+        notification_service = get_notification_service()
+        notification_service.start()
+        if query.get("fcm_token"):
+            notification_service.register_device(self.user_token, query["fcm_token"][0])
+        started = time.perf_counter()
         await self.accept()
+        room = room_manager.get_room(self.room_id)
+        cluster = await ensure_cluster(self.channel_layer)
+        if room is None and cluster:
+            owner = cluster.directory.lookup(self.room_id)
+            if owner and owner != cluster.node_id:
+                await self.send_moved(cluster.directory.address_of(owner))
+                return
+        # Seated players always get back in; only new arrivals are shed
+        if room is None or self.user_token not in room.connected_players:
+            reason = admission.admit("connection", len(room_manager.rooms))
+            if reason:
+                await refuse_connection(self, reason)
+                return
+        admission.socket_opened()
+        self.admitted = True
+        resuming = room is not None and room.presence.is_disconnected(self.user_token)
         action = {
             "type": "add_player",
             "action_token": self.user_token,
@@ -20,47 +201,167 @@ class RoomConsumer(AsyncWebsocketConsumer):
         }
         try:
             await sync_to_async(room_manager.register_action)(action)
+            self.joined = True
+            joined_room = room_manager.get_room(self.room_id)
+            player = joined_room.connected_players.get(self.user_token) if joined_room else None
+            self.player_id = player.id if player else None
+            log.info("player_joined", room_id=self.room_id, player_id=self.player_id, player_name=username,
+                     authenticated=user is not None, resuming=resuming, latency_ms=elapsed_ms(started))
             await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-            await self.update_room()
+            if resuming:
+                await self.resume(room, query.get("last_version", [None])[0])
+                schedule_room_broadcast(self.channel_layer, self.room_id)
+            else:
+                await self.update_room()
+            # Recent chat for a late joiner; new messages follow from the room's chat channel
+            chat_history = chat_hub.join(self.room_id, self)
+            if chat_history:
+                await self.send(text_data=chat_history)
         except ValueError as e:
-            print(f"Error joining room: {e}")
+            log.warning("join_failed", room_id=self.room_id, player_name=username, error=str(e))
             await self.update_self(str(e), True)
             await self.close()
 
+    async def resume(self, room, last_version):
+        """Send a returning client only the events it missed, if still buffered."""
+        try:
+            resumed = room.resume_state(self.user_token, int(last_version))
+        except (TypeError, ValueError):
+            resumed = None
+        if resumed is None:
+            await self.send_state(room)
+            return
+        self.sent_version = room.version
+        await self.send(text_data=json.dumps({"success": True, "resumed": True, **resumed}))
+
     async def disconnect(self, close_code):
+        if self.admitted:
+            admission.socket_closed()
+        if not self.joined:
+            return
+        chat_hub.leave(self.room_id, self)
+        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        # A clean close is the client leaving; only a dropped connection holds the seat for a resume
+        leaving = close_code in LEAVING_CLOSE_CODES
         try:
             action = {
-                    "type": "exit_room",
+                    "type": "exit_room" if leaving else "disconnect",
                     "action_token": self.user_token,
                     "room_id": self.room_id
                 }
             await sync_to_async(room_manager.register_action)(action)
-            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-            await self.update_room()
+            schedule_room_broadcast(self.channel_layer, self.room_id)
+            log.info("player_left" if leaving else "player_disconnected", room_id=self.room_id,
+                     player_id=self.player_id, close_code=close_code)
         except ValueError as e:
-            print(f"Error during disconnect: {e}")
+            log.warning("disconnect_failed", room_id=self.room_id, player_id=self.player_id, error=str(e))
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
+        if not (token_limiter.allow(self.user_token) and ip_limiter.allow(self.client_ip)):
+            # Drop floods without touching the room; warn once per burst
+            metrics.inc("messages_dropped_total", reason="rate_limit")
+            if not self.rate_limited:
+                log.warning("player_rate_limited", room_id=self.room_id, player_id=self.player_id)
+                self.rate_limited = True
+                await self.update_self("Too many messages, slow down")
+            return
+        self.rate_limited = False
+        started = time.perf_counter()
         try:
-            action = json.loads(text_data)
-            action["action_token"] = self.user_token
-            action["room_id"] = self.room_id
-            room_manager.register_action(action)
-            await self.update_room()
+            action, seq = decode_client_frame(text_data)
         except ValueError as e:
-            print(f"Error processing message: {e}")
+            log.warning("invalid_message", room_id=self.room_id, player_id=self.player_id, error=str(e))
             await self.update_self(str(e))
+            return
+        ack_key = (self.room_id, self.user_token)
+        if seq is not None:
+            answer = action_acks.replay(ack_key, seq)
+            if answer is not None:
+                # A retransmission: answer it again without applying it twice
+                metrics.inc("messages_dropped_total", reason="duplicate")
+                await self.send(text_data=answer)
+                return
+        changed = False
+        try:
+            validate_client_action(action)
+            if action["type"] == "sync":
+                room = room_manager.get_room(self.room_id)
+                if room:
+                    await self.send_state(room)
+            elif action["type"] == "chat":
+                self.post_chat(action["text"])
+            else:
+                action["action_token"] = self.user_token
+                action["room_id"] = self.room_id
+                room_manager.register_action(action)
+                changed = True
+                log.debug("action_applied", room_id=self.room_id, player_id=self.player_id,
+                          action_type=action["type"], latency_ms=elapsed_ms(started))
+            if seq is not None:
+                room = room_manager.get_room(self.room_id)
+                answer = ack_frame(seq, room.version if room else None)
+        except ValueError as e:
+            log.warning("action_rejected", room_id=self.room_id, player_id=self.player_id,
+                        action_type=action.get("type") if type(action.get("type")) is str else None, error=str(e))
+            if seq is None:
+                await self.update_self(str(e))
+                return
+            answer = nack_frame(seq, str(e))
+        if seq is not None:
+            action_acks.record(ack_key, seq, answer)
+            await self.send(text_data=answer)
+        if changed:
+            await self.update_room()
+
+    def post_chat(self, text):
+        """
+        Send a chat message from this client's seat to the room's chat channel.
+
+        Raises:
+            ValueError: If the client is chatting too fast, is not seated or sent a blank message
+        """
+        if not chat_limiter.allow(self.user_token):
+            metrics.inc("messages_dropped_total", reason="chat_rate_limit")
+            raise ValueError("Too many chat messages, slow down")
+        room = room_manager.get_room(self.room_id)
+        player = room.connected_players.get(self.user_token) if room else None
+        if player is None:
+            raise ValueError("Only players in the room can chat")
+        message = chat_hub.post(self.room_id, player.id, player.name, text)
+        log.debug("chat_posted", room_id=self.room_id, player_id=player.id, message_id=message["id"])
 
     async def room_message(self, event):
         """Handle messages sent to the room group."""
         room = room_manager.get_room(self.room_id)
-        if room and self.user_token in room.connected_players:
-            await self.send(text_data=json.dumps(
-                {
-                    "success": True,
-                    "currentState": room.to_dict(self.user_token),
-                }
-            ))
+        if room and self.user_token in room.connected_players and room.version != self.sent_version:
+            await self.send_state(room)
+
+    async def room_migrated(self, event):
+        """Handle the room moving to another node: send the client there."""
+        self.joined = False
+        chat_hub.leave(self.room_id, self)
+        await self.send_moved(event["address"])
+
+    async def send_moved(self, address):
+        """Tell the client which server now hosts the room and close the connection."""
+        await self.send(text_data=json.dumps(
+            {
+                "success": False,
+                "error": "Room moved to another server",
+                "moved": address,
+            }
+        ))
+        await self.close(code=4001)
+
+    async def send_state(self, room):
+        """Send the full room state to this client."""
+        self.sent_version = room.version
+        await self.send(text_data=json.dumps(
+            {
+                "success": True,
+                "currentState": room.to_dict(self.user_token),
+            }
+        ))
 
     async def update_room(self):
         """Send the current state of the room to all connected users."""
@@ -70,6 +371,7 @@ class RoomConsumer(AsyncWebsocketConsumer):
                     "type": "room.message",
                 }
             )
+        spectator_hub.notify(self.room_id)
 
     async def update_self(self, error, disconnect=False):
         """Send an update to the user about their action."""
@@ -79,4 +381,51 @@ class RoomConsumer(AsyncWebsocketConsumer):
                 "error": error,
                 "disconnect": disconnect
             }
-        ))
\ No newline at end of file
+        ))
+
+
+class SpectatorConsumer(AsyncWebsocketConsumer):
+    """Read-only connection receiving a room's public state."""
+
+    async def connect(self):
+        self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            interval = float(query.get("interval", [SPECTATOR_MIN_INTERVAL])[0])
+        except ValueError:
+            interval = SPECTATOR_MIN_INTERVAL
+        if not math.isfinite(interval):
+            # nan would slip through the hub's clamping and the spectator would never be sent anything
+            interval = SPECTATOR_MIN_INTERVAL
+        self.admitted = False
+        await self.accept()
+        if room_manager.get_room(self.room_id) is None:
+            await self.room_gone()
+            return
+        reason = admission.admit("spectator", len(room_manager.rooms))
+        if reason:
+            await refuse_connection(self, reason)
+            return
+        admission.socket_opened()
+        self.admitted = True
+        spectator_hub.add(self.room_id, self, interval)
+
+    async def disconnect(self, close_code):
+        if self.admitted:
+            admission.socket_closed()
+        spectator_hub.remove(self.room_id, self)
+
+    async def receive(self, text_data):
+        """Spectators cannot act; anything they send is ignored."""
+
+    async def room_gone(self):
+        """Send the spectator to the room's new server, or tell them it no longer exists."""
+        cluster = await ensure_cluster(self.channel_layer)
+        owner = cluster.directory.lookup(self.room_id) if cluster else None
+        if owner and owner != cluster.node_id:
+            await self.send_moved(cluster.directory.address_of(owner))
+            return
+        await self.send(text_data=json.dumps({"success": False, "error": "Room not found", "disconnect": True}))
+        await self.close()
+
+    send_moved = RoomConsumer.send_moved
@@ -0,0 +1,124 @@
+"""
+Room directory for a multi-node Literature deployment.
+Tracks which node serves each room and how loaded every node is.
+"""
+
+import time
+
+DIRECTORY_CHANNEL = 'directory'
+# Nodes that have not reported their load for this long are not given new rooms
+NODE_TIMEOUT_SECONDS = 30
+# Weight of CPU utilization (0-1) against the node's share of live rooms when placing rooms
+CPU_WEIGHT = 1.0
+
+
+class RoomDirectory:
+    """
+    Replicated map of room -> node plus per-node load.
+
+    Every node keeps a full copy. Changes are applied locally and published
+    on the directory channel so the other nodes apply them too.
+    """
+
+    def __init__(self, node_id, pubsub):
+        """
+        Initialize the directory.
+
+        Args:
+            node_id (str): ID of the local node
+            pubsub (PubSub): Transport shared by all nodes
+        """
+        self.node_id = node_id
+        self.pubsub = pubsub
+        self.rooms = {}  # room_id -> node_id
+        self.nodes = {}  # node_id -> {'address', 'rooms', 'cpu', 'draining', 'updated'}
+
+    async def start(self):
+        """Subscribe to updates and ask the other nodes to announce themselves."""
+        await self.pubsub.subscribe(DIRECTORY_CHANNEL, self._on_update)
+        await self.pubsub.publish(DIRECTORY_CHANNEL, {'op': 'hello', 'from': self.node_id})
+
+    async def _publish(self, update):
+        self._apply(update)
+        update['from'] = self.node_id
+        await self.pubsub.publish(DIRECTORY_CHANNEL, update)
+
+    async def _on_update(self, update):
+        if update.get('from') == self.node_id:
+            return
+        if update['op'] == 'hello':
+            await self.announce()
+        else:
+            self._apply(update)
+
+    def _apply(self, update):
+        op = update['op']
+        if op == 'node':
+            node = self.nodes.setdefault(update['node_id'], {'rooms': 0, 'cpu': 0.0, 'draining': False})
+            node.update({key: update[key] for key in ('address', 'rooms', 'cpu', 'draining') if key in update})
+            node['updated'] = time.monotonic()
+        elif op == 'assign':
+            self.rooms[update['room_id']] = update['node_id']
+        elif op == 'unassign':
+            self.rooms.pop(update['room_id'], None)
+
+    async def announce(self):
+        """Publish the local node's entry and every room it serves."""
+        node = self.nodes.get(self.node_id)
+        if node:
+            await self._publish({'op': 'node', 'node_id': self.node_id, **{
+                key: node[key] for key in ('address', 'rooms', 'cpu', 'draining')}})
+        for room_id, node_id in list(self.rooms.items()):
+            if node_id == self.node_id:
+                await self._publish({'op': 'assign', 'room_id': room_id, 'node_id': node_id})
+
+    async def register_node(self, address):
+        """Register the local node and the address clients use to reach it."""
+        await self._publish({'op': 'node', 'node_id': self.node_id, 'address': address})
+
+    async def report_load(self, rooms, cpu):
+        """Publish the local node's live room count and CPU utilization."""
+        await self._publish({'op': 'node', 'node_id': self.node_id, 'rooms': rooms, 'cpu': cpu})
+
+    async def set_draining(self, draining):
+        """Stop or resume placing rooms on the local node."""
+        await self._publish({'op': 'node', 'node_id': self.node_id, 'draining': draining})
+
+    async def assign(self, room_id, node_id):
+        """Record that a node serves a room."""
+        await self._publish({'op': 'assign', 'room_id': room_id, 'node_id': node_id})
+
+    async def unassign(self, room_id):
+        """Forget a room."""
+        await self._publish({'op': 'unassign', 'room_id': room_id})
+
+    def lookup(self, room_id):
+        """Get the ID of the node serving a room, or None if unknown."""
+        return self.rooms.get(room_id)
+
+    def address_of(self, node_id):
+        """Get the client-facing address of a node."""
+        node = self.nodes.get(node_id)
+        return node.get('address') if node else None
+
+    def place(self, exclude=()):
+        """
+        Pick the least loaded live node for a room.
+
+        Load is the node's share of all live rooms plus CPU_WEIGHT times its CPU
+        utilization. Draining and silent nodes are skipped.
+
+        Args:
+            exclude: Node IDs that must not be picked
+
+        Returns:
+            str: Node ID, or None if no node can take the room
+        """
+        now = time.monotonic()
+        candidates = [(node_id, node) for node_id, node in self.nodes.items()
+                      if node_id not in exclude and not node['draining']
+                      and now - node['updated'] < NODE_TIMEOUT_SECONDS]
+        if not candidates:
+            return None
+        total_rooms = max(sum(node['rooms'] for _, node in candidates), 1)
+        return min(candidates, key=lambda item: item[1]['rooms'] / total_rooms + CPU_WEIGHT * item[1]['cpu'])[0]
@@ -136,6 +136,37 @@ set_names = [
         "SEVENS_AND_JOKERS"
     ]
 
+# Fixed card order used for compact encodings, grouped by set like the client's ALL_CARDS
+CARD_LIST = [
+    ACE_CLUBS, TWO_CLUBS, THREE_CLUBS, FOUR_CLUBS, FIVE_CLUBS, SIX_CLUBS,
+    EIGHT_CLUBS, NINE_CLUBS, TEN_CLUBS, JACK_CLUBS, QUEEN_CLUBS, KING_CLUBS,
+    ACE_DIAMONDS, TWO_DIAMONDS, THREE_DIAMONDS, FOUR_DIAMONDS, FIVE_DIAMONDS, SIX_DIAMONDS,
+    EIGHT_DIAMONDS, NINE_DIAMONDS, TEN_DIAMONDS, JACK_DIAMONDS, QUEEN_DIAMONDS, KING_DIAMONDS,
+    ACE_HEARTS, TWO_HEARTS, THREE_HEARTS, FOUR_HEARTS, FIVE_HEARTS, SIX_HEARTS,
+    EIGHT_HEARTS, NINE_HEARTS, TEN_HEARTS, JACK_HEARTS, QUEEN_HEARTS, KING_HEARTS,
+    ACE_SPADES, TWO_SPADES, THREE_SPADES, FOUR_SPADES, FIVE_SPADES, SIX_SPADES,
+    EIGHT_SPADES, NINE_SPADES, TEN_SPADES, JACK_SPADES, QUEEN_SPADES, KING_SPADES,
+    SEVEN_CLUBS, SEVEN_DIAMONDS, SEVEN_HEARTS, SEVEN_SPADES, RED_JOKER, BLACK_JOKER,
+]
+
+# Map each card to its position in CARD_LIST
+CARD_INDEX = {card: index for index, card in enumerate(CARD_LIST)}
+
+# Canonical object for each card, so hands never hold copies decoded from JSON
+CANONICAL_CARDS = {card: card for card in CARD_LIST}
+
+def intern_card(card):
+    """
+    Return the canonical string for a card.
+
+    Raises:
+        ValueError: If the string is not a card
+    """
+    try:
+        return CANONICAL_CARDS[card]
+    except (KeyError, TypeError):
+        raise ValueError("Invalid card requested.")
+
 # Helper function to get set number from card
 def get_set_number(card):
     """Return the set number (1-9) from a card string"""
@@ -3,8 +3,14 @@ Game implementation for Literature card game.
 Manages a complete game session including players, turns, and game logic.
 """
 
+import base64
 import random
-from .card import ALL_CARDS, get_set_cards, get_set_name, get_set_number
+import secrets
+from array import array
+from .card import ALL_CARDS, get_set_cards, get_set_name, get_set_number, intern_card
+from .history import GameHistory
+from .legal_moves import generate_legal_moves
+from .zobrist import CARD_KEYS, CLAIM_KEYS, COUNT_KEYS, SCORE_KEYS, STATE_KEYS, TURN_KEYS
 from .player import LiteraturePlayer, Player
 # Game state constants
 NOT_STARTED = "not_started"
@@ -13,13 +19,19 @@ ENDED = "ended"
 
 class Game:
     """Represents a Literature card game."""
+
+    __slots__ = ('game_id', 'players', 'current_turn_player_id', 'claimed_sets', 'scores', 'state',
+                 'winning_team', 'last_ask', 'seed', 'rng', 'history', 'listeners', 'legal_moves_cache',
+                 'seats', 'public_hash', 'hand_hashes', 'state_hash')
     
-    def __init__(self, game_id):
+    def __init__(self, game_id, seed=None):
         """
         Initialize a new game.
         
         Args:
             game_id: Unique identifier for the game
+            seed (int, optional): Seed of the game's random stream. A random
+                seed is drawn and kept when the game starts if none is given.
         """
         self.game_id = game_id
         self.players = {} # Map player IDs to Player objects
@@ -29,7 +41,94 @@ class Game:
         self.state = NOT_STARTED
         self.winning_team = None
         self.last_ask = None  # Details about the most recent ask
+        self.seed = seed
+        self.rng = None  # Per-game stream for the starting player and deal, created on start
+        self.history = None  # GameHistory, created when the cards are dealt
+        self.listeners = []  # Callables notified of game events
+        self.legal_moves_cache = None  # (state hash, LegalMoves) of the last generated state
+        # Zobrist hashes, kept up to date by every move once the game starts
+        self.seats = {}  # Map player IDs to their seat index in the hashes
+        self.public_hash = STATE_KEYS[NOT_STARTED] ^ SCORE_KEYS[1][0] ^ SCORE_KEYS[2][0]
+        self.hand_hashes = []  # Hash of each seat's hand, visible only to that seat
+        self.state_hash = self.public_hash  # Hash of the whole state, every hand included
     
+    def add_listener(self, listener):
+        """
+        Subscribe to game events.
+
+        Args:
+            listener: Callable taking (game, event type, details dict). It runs
+                inside the action that caused the event, so it must not block.
+        """
+        self.listeners.append(listener)
+
+    def _emit(self, event, **details):
+        """Notify every listener of a game event."""
+        for listener in self.listeners:
+            listener(self, event, details)
+
+    def rehash(self):
+        """
+        Recompute the Zobrist hashes from scratch and assign the seats.
+
+        Moves update the hashes incrementally; this is only needed when the
+        state is set up wholesale, as on dealing or restoring a snapshot.
+        """
+        self.seats = {player_id: seat for seat, player_id in enumerate(self.players)}
+        public = STATE_KEYS[self.state] ^ SCORE_KEYS[1][self.scores[1]] ^ SCORE_KEYS[2][self.scores[2]]
+        for set_number, team in self.claimed_sets.items():
+            public ^= CLAIM_KEYS[set_number][team]
+        if self.current_turn_player_id in self.seats:
+            public ^= TURN_KEYS[self.seats[self.current_turn_player_id]]
+        self.hand_hashes = []
+        for seat, player in enumerate(self.players.values()):
+            public ^= COUNT_KEYS[seat][len(player.hand)]
+            hand = 0
+            for card in player.hand:
+                hand ^= CARD_KEYS[card][seat]
+            self.hand_hashes.append(hand)
+        self.public_hash = public
+        self.state_hash = public
+        for hand in self.hand_hashes:
+            self.state_hash ^= hand
+
+    def view_hash(self, player_id):
+        """
+        Get the hash of the state as one player sees it: public facts and their own hand.
+
+        Args:
+            player_id: ID of the viewer, or None for an outsider
+
+        Returns:
+            int: 64-bit hash
+        """
+        seat = self.seats.get(player_id)
+        return self.public_hash if seat is None else self.public_hash ^ self.hand_hashes[seat]
+
+    def _toggle_public(self, key):
+        self.public_hash ^= key
+        self.state_hash ^= key
+
+    def _move_card(self, card, from_player, to_player):
+        """Hash a card leaving one hand and, unless to_player is None, entering another."""
+        for player, delta in ((from_player, 1), (to_player, -1)):
+            if player is None:
+                continue
+            seat = self.seats[player.id]
+            key = CARD_KEYS[card][seat]
+            self.hand_hashes[seat] ^= key
+            self.state_hash ^= key
+            # Hands are updated after hashing, so the count is still the old one
+            count = len(player.hand)
+            self._toggle_public(COUNT_KEYS[seat][count] ^ COUNT_KEYS[seat][count - delta])
+
+    def _set_turn(self, player_id):
+        """Give the turn to a player, keeping the hash in step."""
+        for turn_id in (self.current_turn_player_id, player_id):
+            if turn_id in self.seats:
+                self._toggle_public(TURN_KEYS[self.seats[turn_id]])
+        self.current_turn_player_id = player_id
+
     def add_player(self, player_id, player_name, player_token):
         """
         Create a new player instance and add them to the game.
@@ -66,6 +165,8 @@ class Game:
             del self.players[player_id]
             if self.current_turn_player_id == player_id:
                 self.current_turn_player_id = None
+            if self.seats:
+                self.rehash()
     
     def get_player(self, player_id):
         """
@@ -130,12 +231,20 @@ class Game:
             raise ValueError(f"Each team must have exactly 3 players (Team 1: {team1_count}, Team 2: {team2_count})")
             
         if len(self.players) != 6: raise ValueError("Exactly 6 players required")
-        starting_player = random.choice(list(self.players.values()))
+        if self.rng is None:
+            if self.seed is None:
+                self.seed = secrets.randbits(64)
+            self.rng = random.Random(self.seed)
+        starting_player = self.rng.choice(list(self.players.values()))
         self.current_turn_player_id = starting_player.id
         
         self.deal_cards()
+        self.history = GameHistory.from_deal(list(self.players.values()), starting_player.id, self.seed)
 
         self.state = IN_PROGRESS
+        self.rehash()
+        self._emit('game_started')
+        self._emit('turn_changed', player_id=self.current_turn_player_id)
     
     def deal_cards(self):
         """
@@ -143,8 +252,8 @@ class Game:
         
         Each player receives 9 cards from a shuffled deck of 54 cards.
         """
-        deck = list(ALL_CARDS)
-        random.shuffle(deck)
+        deck = sorted(ALL_CARDS)
+        self.rng.shuffle(deck)
         
         for player in self.players.values():
             player.hand = set(deck[:9])
@@ -156,6 +265,7 @@ class Game:
         
         The team with more claimed sets wins. If tied, winning_team is set to None.
         """
+        self._toggle_public(STATE_KEYS[self.state] ^ STATE_KEYS[ENDED])
         self.state = ENDED
         
         # Determine winner by score
@@ -165,6 +275,7 @@ class Game:
             self.winning_team = 2
         else:
             self.winning_team = None  # It's a tie
+        self._emit('game_ended', winning_team=self.winning_team)
     
     def get_current_player(self):
         """
@@ -210,8 +321,7 @@ class Game:
             If the ask is successful, the card is transferred and turn remains with asker.
             If unsuccessful, turn passes to the asked player.
         """
-        if card not in ALL_CARDS:
-            raise ValueError("Invalid card requested.")
+        card = intern_card(card)
         # Get player objects
         asking_player = self.get_player(asking_player_id)
         asked_player = self.get_player(asked_player_id)
@@ -237,16 +347,21 @@ class Game:
         success = asked_player.has_card(card)
         
         if success:
+            self._move_card(card, asked_player, asking_player)
             asked_player.remove_card(card)
             asking_player.add_card(card)
         else:
-            self.current_turn_player_id = asked_player_id
+            self._set_turn(asked_player_id)
+            self._emit('turn_changed', player_id=asked_player_id)
         self.last_ask = {
             'askingPlayerId': asking_player_id,
             'askedPlayerId': asked_player_id,
             'card': card,
             'success': success
         }
+        self.history.record_ask(asking_player_id, asked_player_id, card, success)
+        self._emit('card_asked', asking_player_id=asking_player_id, asked_player_id=asked_player_id,
+                   card=card, success=success)
         
     
     def claim_set(self, set_number, declaring_player_id):
@@ -280,7 +395,9 @@ class Game:
         cards_held = self.get_cards_held_by_team(declaring_player.team)
 
         for player in self.players.values():
-            player.hand = set([card for card in player.hand if card not in cards_needed])
+            for card in player.hand & cards_needed:
+                self._move_card(card, player, None)
+                player.hand.discard(card)
     
         if cards_needed.issubset(cards_held):
             winning_team = declaring_player.team
@@ -288,18 +405,26 @@ class Game:
             winning_team = 2 if declaring_player.team == 1 else 1
 
         self.claimed_sets[set_number] = winning_team
-        self.scores[winning_team] += 1   
+        score = self.scores[winning_team]
+        self._toggle_public(CLAIM_KEYS[set_number][winning_team] ^ SCORE_KEYS[winning_team][score]
+                            ^ SCORE_KEYS[winning_team][score + 1])
+        self.scores[winning_team] = score + 1
+        self.history.record_claim(declaring_player_id, set_number, winning_team == declaring_player.team)
+        self._emit('set_claimed', player_id=declaring_player_id, set_number=set_number,
+                   success=winning_team == declaring_player.team)
         # Check if the game has ended
         if len(self.claimed_sets) == 9:  # All sets have been claimed
             self.end_game()
     
-    def pass_turn_to_teammate(self, passer_id, teammate_id):
+    def pass_turn_to_teammate(self, passer_id, teammate_id, forced=False):
         """        
         Pass the turn to a teammate when current player has no cards.
         
         Args:
             passer_id: ID of the player passing the turn
             teammate_id: ID of the teammate to pass the turn to
+            forced (bool): Allow passing while holding cards, used when the
+                passer's turn clock ran out
             
         Raises:
             ValueError: If the players are not teammates, passer still has cards,
@@ -311,13 +436,76 @@ class Game:
         if passer_player.team != teammate_player.team:
             raise ValueError("Cannot pass turn to a player on a different team")
 
-        if len(passer_player.hand) > 0:
+        if len(passer_player.hand) > 0 and not forced:
             raise ValueError("Cannot pass turn while holding cards")
         
         if passer_player.id == teammate_player.id:
             raise ValueError("Cannot pass turn to yourself")
         
-        self.current_turn_player_id = teammate_id
+        self._set_turn(teammate_id)
+        self.history.record_pass(passer_id, teammate_id)
+        self._emit('turn_changed', player_id=teammate_id)
+
+    def legal_moves(self):
+        """
+        Get every move the current player may make.
+
+        The result is cached until the next move changes the game, so it can
+        be asked for on every broadcast.
+
+        Returns:
+            LegalMoves: The current player's moves, or None if no game is in progress
+        """
+        if self.state != IN_PROGRESS or self.current_turn_player_id not in self.players:
+            return None
+        key = self.state_hash
+        if self.legal_moves_cache is None or self.legal_moves_cache[0] != key:
+            self.legal_moves_cache = (key, generate_legal_moves(self, self.players[self.current_turn_player_id]))
+        return self.legal_moves_cache[1]
+
+    def choose_timeout_move(self, policy, rng):
+        """
+        Pick the move made for the current player when their turn clock runs out.
+
+        Args:
+            policy (str): 'pass' hands the turn to a teammate holding cards,
+                'random_ask' asks a random opponent for a random card the player
+                may legally ask for. A player without cards always passes.
+            rng (random.Random): Source of the random choices
+
+        Returns:
+            dict: In-game action, or None if the player has no possible move
+        """
+        moves = self.legal_moves()
+        if moves is None:
+            return None
+        player = self.players[moves.player_id]
+        if policy == 'pass' or not player.hand:
+            # A timed out pass may go to a teammate even while holding cards
+            teammates = [p.id for p in self.get_team_players(player.team) if p.id != player.id and p.hand]
+            if teammates:
+                return {'type': 'pass_turn', 'teammate_id': rng.choice(teammates)}
+            if not player.hand:
+                return None
+        if moves.ask_targets:
+            return {'type': 'ask_card', 'asked_player_id': rng.choice(moves.ask_targets), 'card': rng.choice(moves.ask_cards)}
+        # Nobody left to ask, so the player can only claim
+        return {'type': 'claim_set', 'set_number': min(get_set_number(card) for card in player.hand)}
+
+    def register_timeout_action(self, actor_id, action):
+        """
+        Apply the move chosen by choose_timeout_move for the current player.
+
+        Unlike a regular pass, a timeout pass is allowed while holding cards.
+        """
+        if action.get('type') == 'pass_turn':
+            if self.state != IN_PROGRESS:
+                raise ValueError("Game is not active")
+            if actor_id != self.current_turn_player_id:
+                raise ValueError(f"Not {self.get_player(actor_id).name}'s turn")
+            self.pass_turn_to_teammate(actor_id, action.get('teammate_id'), forced=True)
+        else:
+            self.register_in_game_action(actor_id, action)
     
     def register_pre_game_action(self, actor_id, is_actor_host, action):
         """
@@ -390,7 +578,8 @@ class Game:
         
         Returns:
             dict: Game data with player information, current state, and scores
-                 Only includes the requesting player's cards for security
+                 Only includes the requesting player's cards for security, and
+                 their legal moves when it is their turn
         """
         players_data = []
         for player in self.players.values():
@@ -400,6 +589,10 @@ class Game:
                 # Remove the actual cards, but keep the count
                 player_data['hand'] = []
             players_data.append(player_data)
+        legal_moves = None
+        if asker_id and asker_id == self.current_turn_player_id:
+            moves = self.legal_moves()
+            legal_moves = moves.to_dict() if moves else None
           
         return {
             'gameId': self.game_id,
@@ -409,5 +602,86 @@ class Game:
             'scores': self.scores,
             'state': self.state,
             'winningTeam': self.winning_team,
-            'lastAsk': self.last_ask
-        }
\ No newline at end of file
+            'lastAsk': self.last_ask,
+            'legalMoves': legal_moves,
+        }
+
+    def snapshot(self):
+        """
+        Return a compact, JSON-serializable snapshot of the full game state.
+
+        Unlike to_dict this includes every hand, player tokens and the RNG
+        state, so it must never be sent to clients.
+
+        Returns:
+            dict: Snapshot accepted by Game.from_snapshot
+        """
+        rng = None
+        if self.rng is not None:
+            version, internal, gauss = self.rng.getstate()
+            rng = [version, base64.b64encode(array('I', internal).tobytes()).decode(), gauss]
+        return {
+            'gameId': self.game_id,
+            'players': [[p.id, p.name, p.token, p.team, sorted(p.hand)] for p in self.players.values()],
+            'currentPlayerId': self.current_turn_player_id,
+            'claimedSets': self.claimed_sets,
+            'scores': self.scores,
+            'state': self.state,
+            'winningTeam': self.winning_team,
+            'lastAsk': self.last_ask,
+            'seed': self.seed,
+            'rng': rng,
+            'history': self.history.to_dict() if self.history is not None else None,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """
+        Rebuild a game from a snapshot produced by Game.snapshot.
+
+        Args:
+            data (dict): Snapshot data
+
+        Returns:
+            Game: The restored game
+        """
+        game = cls(data['gameId'], data.get('seed'))
+        for player_id, name, token, team, hand in data['players']:
+            player = LiteraturePlayer(player_id, name, token, team)
+            player.hand = {intern_card(card) for card in hand}
+            game.players[player_id] = player
+        game.current_turn_player_id = data['currentPlayerId']
+        # JSON turns integer keys into strings
+        game.claimed_sets = {int(k): v for k, v in data['claimedSets'].items()}
+        game.scores = {int(k): v for k, v in data['scores'].items()}
+        game.state = data['state']
+        game.winning_team = data['winningTeam']
+        game.last_ask = data['lastAsk']
+        if data['rng']:
+            version, internal, gauss = data['rng']
+            game.rng = random.Random()
+            game.rng.setstate((version, tuple(array('I', base64.b64decode(internal))), gauss))
+        if data.get('history'):
+            game.history = GameHistory.from_dict(data['history'])
+        game.rehash()
+        return game
+
+
+class EmptyGame(Game):
+    """
+    Read-only game of a room nobody has joined yet.
+
+    A single instance is shared by every empty room; the room swaps in a real
+    Game when its first player arrives.
+    """
+
+    __slots__ = ()
+
+    def add_listener(self, listener):
+        raise RuntimeError("The shared empty game cannot take listeners")
+
+    def add_player(self, player_id, player_name, player_token):
+        raise RuntimeError("The shared empty game cannot take players")
+
+
+EMPTY_GAME = EmptyGame(None)
@@ -0,0 +1,209 @@
+"""
+Move history for Literature card games.
+
+Each move is packed into a single 32-bit integer:
+- Bits 0-1: Move type (ASK, CLAIM or PASS)
+- Bits 2-4: Seat of the acting player
+- Bits 5-7: Seat of the asked player or teammate (unused for claims)
+- Bits 8-13: Card index for asks, set number for claims
+- Bit 14: Outcome (ask got the card / claiming team won the set)
+
+Seats are player positions at the start of the game and cards are indices
+into CARD_LIST. A checkpoint of the full state is kept every
+CHECKPOINT_INTERVAL moves so any position can be rebuilt without replaying
+from the deal.
+"""
+
+import base64
+from array import array
+from .card import CARD_INDEX, CARD_LIST
+
+# Move type codes
+ASK = 0
+CLAIM = 1
+PASS = 2
+
+MOVE_TYPE_NAMES = {ASK: 'ask_card', CLAIM: 'claim_set', PASS: 'pass_turn'}
+
+# A checkpoint is stored after every this many moves
+CHECKPOINT_INTERVAL = 16
+
+# Bit mask of every card in each set, indexed by set number
+SET_MASKS = [0] + [((1 << 6) - 1) << (6 * (set_number - 1)) for set_number in range(1, 10)]
+
+
+def encode_move(move_type, actor, target=0, value=0, outcome=False):
+    """Pack a move into a 32-bit integer."""
+    return move_type | (actor << 2) | (target << 5) | (value << 8) | (int(outcome) << 14)
+
+
+def decode_move(move):
+    """
+    Unpack a move encoded by encode_move.
+
+    Returns:
+        tuple: (move type, actor seat, target seat, card index or set number, outcome)
+    """
+    return move & 3, (move >> 2) & 7, (move >> 5) & 7, (move >> 8) & 63, bool((move >> 14) & 1)
+
+
+class GameHistory:
+    """Compact record of the deal and every move of a single game."""
+
+    def __init__(self, seats, teams, deal, starting_seat, seed=None):
+        """
+        Initialize a history at the moment the cards are dealt.
+
+        Args:
+            seats (list): Player IDs in seat order
+            teams (list): Team number for each seat
+            deal (bytes): Seat holding each card, indexed like CARD_LIST
+            starting_seat (int): Seat of the player taking the first turn
+            seed (int, optional): Seed the deal and starting player came from
+        """
+        self.seats = list(seats)
+        self.teams = list(teams)
+        self.deal = bytes(deal)
+        self.starting_seat = starting_seat
+        self.seed = seed
+        self.seat_index = {player_id: seat for seat, player_id in enumerate(self.seats)}
+        self.moves = array('I')
+        hands = [0] * len(self.seats)
+        for card_index, seat in enumerate(self.deal):
+            hands[seat] |= 1 << card_index
+        # State after the deal: (hands, turn seat, claimed sets, scores)
+        self.checkpoints = [(tuple(hands), starting_seat, bytes(10), (0, 0))]
+
+    @classmethod
+    def from_deal(cls, players, starting_player_id, seed=None):
+        """
+        Create a history for a freshly dealt game.
+
+        Args:
+            players (list): LiteraturePlayer objects in seat order
+            starting_player_id: ID of the player taking the first turn
+            seed (int, optional): Seed of the game's random stream
+        """
+        seats = [player.id for player in players]
+        deal = bytearray(len(CARD_LIST))
+        for seat, player in enumerate(players):
+            for card in player.hand:
+                deal[CARD_INDEX[card]] = seat
+        return cls(seats, [player.team for player in players], deal, seats.index(starting_player_id), seed)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def record_ask(self, asking_player_id, asked_player_id, card, success):
+        """Record an ask and whether the card changed hands."""
+        self._append(encode_move(ASK, self.seat_index[asking_player_id],
+                                 self.seat_index[asked_player_id], CARD_INDEX[card], success))
+
+    def record_claim(self, declaring_player_id, set_number, success):
+        """Record a set claim and whether the claiming team won the set."""
+        self._append(encode_move(CLAIM, self.seat_index[declaring_player_id], 0, set_number, success))
+
+    def record_pass(self, passer_id, teammate_id):
+        """Record a turn passed to a teammate."""
+        self._append(encode_move(PASS, self.seat_index[passer_id], self.seat_index[teammate_id]))
+
+    def _append(self, move):
+        self.moves.append(move)
+        if len(self.moves) % CHECKPOINT_INTERVAL == 0:
+            self.checkpoints.append(self._apply(self.checkpoints[-1], self.moves[-CHECKPOINT_INTERVAL:]))
+
+    def _apply(self, state, moves):
+        hands, turn, claimed, scores = state
+        hands, claimed, scores = list(hands), bytearray(claimed), list(scores)
+        for move in moves:
+            move_type, actor, target, value, outcome = decode_move(move)
+            if move_type == ASK:
+                if outcome:
+                    hands[target] &= ~(1 << value)
+                    hands[actor] |= 1 << value
+                else:
+                    turn = target
+            elif move_type == CLAIM:
+                hands = [hand & ~SET_MASKS[value] for hand in hands]
+                team = self.teams[actor] if outcome else 3 - self.teams[actor]
+                claimed[value] = team
+                scores[team - 1] += 1
+            else:
+                turn = target
+        return tuple(hands), turn, bytes(claimed), tuple(scores)
+
+    def state_at(self, index):
+        """
+        Rebuild the game state after the first `index` moves.
+
+        Starts from the nearest checkpoint, so at most CHECKPOINT_INTERVAL - 1
+        moves are replayed.
+
+        Args:
+            index (int): Number of moves applied, from 0 to len(self)
+
+        Returns:
+            dict: Hands, current player, claimed sets and scores at that point
+
+        Raises:
+            ValueError: If the index is out of range
+        """
+        if index < 0 or index > len(self.moves):
+            raise ValueError(f"Move index must be between 0 and {len(self.moves)}")
+        checkpoint = index // CHECKPOINT_INTERVAL
+        start = checkpoint * CHECKPOINT_INTERVAL
+        hands, turn, claimed, scores = self._apply(self.checkpoints[checkpoint], self.moves[start:index])
+        return {
+            'moveIndex': index,
+            'hands': {player_id: [card for i, card in enumerate(CARD_LIST) if hands[seat] >> i & 1]
+                      for seat, player_id in enumerate(self.seats)},
+            'currentPlayerId': self.seats[turn],
+            'claimedSets': {set_number: team for set_number, team in enumerate(claimed) if team},
+            'scores': {1: scores[0], 2: scores[1]},
+        }
+
+    def describe_move(self, index):
+        """Return a readable dictionary for the move at a given index."""
+        move_type, actor, target, value, outcome = decode_move(self.moves[index])
+        move = {'index': index, 'type': MOVE_TYPE_NAMES[move_type], 'actorId': self.seats[actor]}
+        if move_type == ASK:
+            move.update({'targetId': self.seats[target], 'card': CARD_LIST[value], 'success': outcome})
+        elif move_type == CLAIM:
+            move.update({'setNumber': value, 'success': outcome})
+        else:
+            move['targetId'] = self.seats[target]
+        return move
+
+    def iter_chunks(self, offset=0, chunk_size=CHECKPOINT_INTERVAL * 4):
+        """
+        Yield readable moves in chunks, starting at an offset.
+
+        Args:
+            offset (int): Index of the first move to yield
+            chunk_size (int): Maximum number of moves per chunk
+
+        Yields:
+            list: Consecutive move dictionaries
+        """
+        for start in range(max(offset, 0), len(self.moves), chunk_size):
+            yield [self.describe_move(i) for i in range(start, min(start + chunk_size, len(self.moves)))]
+
+    def to_dict(self):
+        """Return a compact JSON-serializable form of the history."""
+        return {
+            'seats': self.seats,
+            'teams': self.teams,
+            'deal': base64.b64encode(self.deal).decode(),
+            'startingSeat': self.starting_seat,
+            'seed': self.seed,
+            'moves': base64.b64encode(self.moves.tobytes()).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a history from GameHistory.to_dict output, including its checkpoints."""
+        history = cls(data['seats'], data['teams'], base64.b64decode(data['deal']), data['startingSeat'],
+                      data.get('seed'))
+        for move in array('I', base64.b64decode(data['moves'])):
+            history._append(move)
+        return history
@@ -0,0 +1,100 @@
+"""
+Legal move generation for Literature.
+
+The moves open to the player whose turn it is are computed once per game
+state and shared by the client broadcast, the turn clock and bots, so none of
+them has to rediscover the rules by trial and error against the engine.
+"""
+
+from .card import get_set_cards, get_set_number
+
+
+class LegalMoves:
+    """Every move the current player may make in one game state."""
+
+    __slots__ = ('player_id', 'ask_targets', 'ask_cards', 'claims', 'passes', '_encoded')
+
+    def __init__(self, player_id, ask_targets, ask_cards, claims, passes):
+        """
+        Initialize the move set.
+
+        Any ask target may be asked for any ask card, so asks are kept as the
+        two factors of their cross product rather than as pairs.
+
+        Args:
+            player_id: ID of the player the moves belong to
+            ask_targets (tuple): IDs of opponents that may be asked for a card
+            ask_cards (tuple): Cards that may be asked for, sorted
+            claims (tuple): Set numbers that may be claimed, sorted
+            passes (tuple): IDs of teammates the turn may be passed to
+        """
+        self.player_id = player_id
+        self.ask_targets = ask_targets
+        self.ask_cards = ask_cards
+        self.claims = claims
+        self.passes = passes
+        self._encoded = None
+
+    def __len__(self):
+        return len(self.ask_targets) * len(self.ask_cards) + len(self.claims) + len(self.passes)
+
+    def actions(self):
+        """
+        Yield every legal move as an in-game action.
+
+        Yields:
+            dict: Action accepted by Game.register_in_game_action
+        """
+        for target in self.ask_targets:
+            for card in self.ask_cards:
+                yield {'type': 'ask_card', 'asked_player_id': target, 'card': card}
+        for set_number in self.claims:
+            yield {'type': 'claim_set', 'set_number': set_number}
+        for teammate_id in self.passes:
+            yield {'type': 'pass_turn', 'teammate_id': teammate_id}
+
+    def to_dict(self):
+        """
+        Return the compact form sent to the current player.
+
+        The dict is built once and shared, so callers must not modify it.
+
+        Returns:
+            dict: askPlayers and askCards (any pairing is legal), claimSets and passTo
+        """
+        if self._encoded is None:
+            self._encoded = {
+                'askPlayers': list(self.ask_targets),
+                'askCards': list(self.ask_cards),
+                'claimSets': list(self.claims),
+                'passTo': list(self.passes),
+            }
+        return self._encoded
+
+
+def generate_legal_moves(game, player):
+    """
+    Compute the moves open to a player, following the checks in Game.
+
+    Args:
+        game (Game): Game in progress
+        player (LiteraturePlayer): Player whose turn it is
+
+    Returns:
+        LegalMoves: The player's legal moves
+    """
+    ask_targets, ask_cards, passes = (), (), ()
+    if player.hand:
+        ask_targets = tuple(p.id for p in game.players.values() if p.team != player.team and p.hand)
+        if ask_targets:
+            held_sets = {get_set_number(card) for card in player.hand}
+            wanted = set()
+            for set_number in held_sets:
+                wanted |= get_set_cards(set_number)
+            ask_cards = tuple(sorted(wanted - player.hand))
+        if not ask_cards:
+            ask_targets = ()
+    else:
+        passes = tuple(p.id for p in game.players.values() if p.team == player.team and p.id != player.id)
+    claims = tuple(set_number for set_number in range(1, 10) if set_number not in game.claimed_sets)
+    return LegalMoves(player.id, ask_targets, ask_cards, claims, passes)
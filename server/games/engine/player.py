@@ -5,6 +5,8 @@ Player implementations for Literature card game.
 class Player:
     """Base player class with core identity attributes."""
 
+    __slots__ = ('id', 'name', 'token')
+
     def __init__(self, id, name, token):
         """
         Initialize a base player.
@@ -38,6 +40,8 @@ class Player:
 class LiteraturePlayer(Player):
     """Specialized player for the Literature card game with game-specific attributes."""
 
+    __slots__ = ('team', 'hand')
+
     def __init__(self, id, name, token, team):
         """
         Initialize a Literature player.
@@ -0,0 +1,43 @@
+"""
+Zobrist keys for hashing Literature game states.
+
+Each hashed fact (a card in a seat's hand, a seat's card count, whose turn it
+is, a claimed set, a team's score, the game state) has a random 64-bit key and
+a state's hash is the XOR of the keys of the facts that hold in it. A move
+changes the hash by XORing out the keys of facts it ends and in the keys of
+facts it starts, so the hash is kept up to date in constant time per change.
+
+Keys come from a fixed seed so every server derives the same hash for the
+same state, including after a room migrates between nodes.
+"""
+
+import random
+from .card import ALL_CARDS
+
+ZOBRIST_SEED = 0x5EED_11CA
+MAX_SEATS = 6
+MAX_HAND = len(ALL_CARDS)
+
+_rng = random.Random(ZOBRIST_SEED)
+
+
+def _keys(count):
+    return tuple(_rng.getrandbits(64) for _ in range(count))
+
+
+# card -> key per seat holding it
+CARD_KEYS = {card: _keys(MAX_SEATS) for card in sorted(ALL_CARDS)}
+# seat -> key per card count
+COUNT_KEYS = tuple(_keys(MAX_HAND + 1) for _ in range(MAX_SEATS))
+# seat whose turn it is
+TURN_KEYS = _keys(MAX_SEATS)
+# set number -> key per claiming team (index 0 unused)
+CLAIM_KEYS = {set_number: _keys(3) for set_number in range(1, 10)}
+# team -> key per score (index 0 unused)
+SCORE_KEYS = (None, _keys(10), _keys(10))
+STATE_KEYS = dict(zip(("not_started", "in_progress", "ended"), _keys(3)))
+
+
+def format_hash(value):
+    """Render a hash as the fixed-width hex string sent to clients."""
+    return format(value, '016x')
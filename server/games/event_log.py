@@ -0,0 +1,166 @@
+"""
+Durable event log for Literature rooms.
+Applied room actions are appended per room and periodically compacted into
+snapshots so rooms can be rebuilt after a restart.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Largest number of records written in one transaction
+LOG_BATCH_SIZE = 512
+# Seconds the writer waits for more records before committing a batch
+LOG_FLUSH_INTERVAL = 0.02
+
+_CLOSE = object()
+
+
+class EventLog:
+    """
+    Append-only room event log stored in SQLite.
+
+    Writes are queued and committed by a background thread in batches, so a
+    single fsync covers every action that arrived while the previous commit
+    was in flight. Callers never wait on the disk.
+    """
+
+    def __init__(self, path, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        """
+        Initialize the event log.
+
+        Args:
+            path: Location of the SQLite database file
+            batch_size (int): Maximum records per commit
+            flush_interval (float): Seconds to wait for a batch to fill up
+        """
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.writer = None
+        connection = self._connect()
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                room_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                PRIMARY KEY (room_id, version)
+            );
+            CREATE TABLE IF NOT EXISTS snapshots (
+                room_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                state TEXT NOT NULL
+            );
+        """)
+        connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        return connection
+
+    def start(self):
+        """Start the background writer thread."""
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._run, name="room-event-log", daemon=True)
+            self.writer.start()
+
+    def close(self):
+        """Flush pending records and stop the writer thread."""
+        if self.writer is not None:
+            self.queue.put(_CLOSE)
+            self.writer.join()
+            self.writer = None
+
+    def append(self, room_id, version, action):
+        """
+        Queue an applied action for a room.
+
+        Args:
+            room_id: ID of the room the action was applied to
+            version (int): Room version after the action
+            action (dict): The validated action, including its token
+        """
+        self.queue.put(('event', room_id, version, json.dumps(action, separators=(',', ':'))))
+
+    def snapshot(self, room_id, version, state):
+        """
+        Queue a room snapshot. Events up to the snapshot version are dropped.
+
+        Args:
+            room_id: ID of the room
+            version (int): Room version the snapshot was taken at
+            state (dict): Snapshot produced by Room.snapshot
+        """
+        self.queue.put(('snapshot', room_id, version, json.dumps(state, separators=(',', ':'))))
+
+    def forget(self, room_id):
+        """
+        Queue the removal of a room's snapshot and events.
+
+        Args:
+            room_id: ID of a room that no longer lives on this node
+        """
+        self.queue.put(('forget', room_id, None, None))
+
+    def load(self):
+        """
+        Read every logged room.
+
+        Returns:
+            list: (snapshot dict, list of action dicts after the snapshot) per room
+        """
+        connection = self._connect()
+        try:
+            rooms = []
+            for room_id, version, state in connection.execute(
+                    "SELECT room_id, version, state FROM snapshots"):
+                tail = connection.execute(
+                    "SELECT action FROM events WHERE room_id = ? AND version > ? ORDER BY version",
+                    (room_id, version))
+                rooms.append((json.loads(state), [json.loads(action) for action, in tail]))
+            return rooms
+        finally:
+            connection.close()
+
+    def _run(self):
+        connection = self._connect()
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                pass
+            if _CLOSE in batch:
+                batch.remove(_CLOSE)
+                closing = True
+            try:
+                self._write(connection, batch)
+            except sqlite3.Error as e:
+                log.error("event_log_write_failed", records=len(batch), error=str(e))
+        connection.close()
+
+    def _write(self, connection, batch):
+        with connection:
+            for kind, room_id, version, payload in batch:
+                if kind == 'event':
+                    connection.execute(
+                        "INSERT OR REPLACE INTO events (room_id, version, action) VALUES (?, ?, ?)",
+                        (room_id, version, payload))
+                elif kind == 'forget':
+                    connection.execute("DELETE FROM snapshots WHERE room_id = ?", (room_id,))
+                    connection.execute("DELETE FROM events WHERE room_id = ?", (room_id,))
+                else:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO snapshots (room_id, version, state) VALUES (?, ?, ?)",
+                        (room_id, version, payload))
+                    connection.execute(
+                        "DELETE FROM events WHERE room_id = ? AND version <= ?", (room_id, version))
@@ -0,0 +1,65 @@
+"""
+Cold storage for finished Literature game histories.
+Histories are compressed to one file per game so they no longer take up
+memory once a game has ended.
+"""
+
+import json
+import re
+import zlib
+from pathlib import Path
+from .engine.history import GameHistory
+
+_SAFE_GAME_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class HistoryStore:
+    """Stores finished game histories as compressed files in a directory."""
+
+    def __init__(self, directory):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding one file per archived game
+        """
+        self.directory = Path(directory)
+
+    def _path(self, game_id):
+        if not _SAFE_GAME_ID.match(game_id):
+            raise ValueError("Invalid game ID")
+        return self.directory / f"{game_id}.hist"
+
+    def save(self, game_id, history):
+        """
+        Write a game history to disk.
+
+        Args:
+            game_id: ID of the finished game
+            history (GameHistory): History to archive
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(game_id)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_bytes(zlib.compress(json.dumps(history.to_dict(), separators=(',', ':')).encode()))
+        temporary.replace(path)
+
+    def load(self, game_id):
+        """
+        Read an archived game history.
+
+        Args:
+            game_id: ID of the game
+
+        Returns:
+            GameHistory: The history, or None if the game was never archived
+        """
+        try:
+            data = self._path(game_id).read_bytes()
+        except (FileNotFoundError, ValueError):
+            return None
+        return GameHistory.from_dict(json.loads(zlib.decompress(data)))
+
+    def game_ids(self):
+        """List the IDs of every archived game."""
+        return sorted(path.stem for path in self.directory.glob('*.hist'))
@@ -0,0 +1,22 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from games.archive import open_columns, summarize
+
+
+class Command(BaseCommand):
+    help = "Scan the columnar game archive and print aggregate statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive-dir', default=getattr(settings, 'GAME_ARCHIVE_DIR', None),
+                            help="Archive directory (defaults to GAME_ARCHIVE_DIR)")
+        parser.add_argument('--top-players', type=int, default=10,
+                            help="Number of most active players to report")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        games, moves = open_columns(options['archive_dir'])
+        stats = summarize(games, moves, options['top_players'])
+        stats['scanSeconds'] = round(time.perf_counter() - started, 3)
+        self.stdout.write(json.dumps(stats, indent=2))
@@ -0,0 +1,61 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from games.archive import open_columns, shard_directories
+from games.stats import DjangoStatsStore, backfill_totals
+
+
+def unsharded_archive_dir():
+    """GAME_ARCHIVE_DIR without the suffix a sharded worker adds to it."""
+    directory = getattr(settings, 'GAME_ARCHIVE_DIR', None)
+    suffix = getattr(settings, 'SHARD_SUFFIX', '')
+    if directory and suffix and directory.endswith(suffix):
+        directory = directory[:-len(suffix)]
+    return directory
+
+
+class Command(BaseCommand):
+    help = "Rebuild every player's statistics from the columnar game archives of all shards"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive-dir', default=unsharded_archive_dir(),
+                            help="Archive directory without a shard suffix (defaults to GAME_ARCHIVE_DIR)")
+        parser.add_argument('--shards', type=int, default=getattr(settings, 'SHARD_COUNT', 1),
+                            help="Number of shards whose archives must all be present (defaults to SHARD_COUNT)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compute the totals without writing them")
+        parser.add_argument('--force', action='store_true',
+                            help="Replace the table even with no totals or with shard archives missing")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        directories = shard_directories(options['archive_dir'])
+        shard_indexes = [index for index in directories if index is not None]
+        expected = max([options['shards'] if options['shards'] > 1 else 0] + [index + 1 for index in shard_indexes])
+        missing = [index for index in range(expected) if index not in directories]
+        totals = {}
+        game_count = 0
+        for directory in directories.values():
+            games, moves = open_columns(directory)
+            game_count += len(games['winner'])
+            # A player's games on different shards add up
+            for key, values in backfill_totals(games, moves).items():
+                held = totals.get(key)
+                totals[key] = values if held is None else [a + b for a, b in zip(held, values)]
+        if not options['dry_run']:
+            # The archives hold every finished game, so their totals replace the table;
+            # partial ones would wipe the statistics of the games they lack
+            if missing and not options['force']:
+                raise CommandError(f"Archives of shards {missing} are missing; use --force to replace anyway")
+            if not totals and not options['force']:
+                raise CommandError("The archives hold no games; use --force to clear the statistics")
+            DjangoStatsStore().replace(totals)
+        self.stdout.write(json.dumps({
+            'archives': [str(directory) for directory in directories.values()],
+            'missingShards': missing,
+            'games': game_count,
+            'players': len(totals),
+            'written': not options['dry_run'],
+            'seconds': round(time.perf_counter() - started, 3),
+        }))
@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imported in a fresh interpreter exactly like a daphne worker does at startup
+COLD_START_SCRIPT = """
+import os, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'literature.settings')
+import literature.asgi
+print(round((time.perf_counter() - started) * 1000, 1))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure worker cold-start import time and fail if it exceeds the budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=float, default=getattr(settings, 'COLD_START_BUDGET_MS', 1500),
+                            help="Maximum allowed import time in milliseconds")
+        parser.add_argument('--top', type=int, default=15,
+                            help="Number of slowest imports to list")
+        parser.add_argument('--record', help="Append the result as a JSON line to this file")
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', COLD_START_SCRIPT],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Worker import failed:\n{result.stderr[-2000:]}")
+        total_ms = float(result.stdout.strip().splitlines()[-1])
+
+        # Lines look like "import time:   self [us] | cumulative | imported package"
+        imports = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            _, cumulative, package = line[len('import time:'):].split('|')
+            imports.append((int(cumulative) / 1000, package.rstrip()))
+        # Top-level packages only: nested entries are included in their parent's time
+        top_level = sorted((entry for entry in imports if not entry[1].startswith(' ' * 3)), reverse=True)
+
+        self.stdout.write(f"Cold start: {total_ms:.1f} ms (budget {options['budget_ms']:.0f} ms)")
+        for cumulative_ms, package in top_level[:options['top']]:
+            self.stdout.write(f"{cumulative_ms:10.1f} ms  {package.strip()}")
+
+        if options['record']:
+            with Path(options['record']).open('a') as record:
+                record.write(json.dumps({
+                    'time': time.time(),
+                    'totalMs': total_ms,
+                    'top': [[package.strip(), ms] for ms, package in top_level[:options['top']]],
+                }) + '\n')
+
+        if total_ms > options['budget_ms']:
+            raise CommandError(f"Cold start of {total_ms:.1f} ms exceeds the {options['budget_ms']:.0f} ms budget")
@@ -0,0 +1,20 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from games.cluster import node_channel
+from games.pubsub import create_pubsub
+
+
+class Command(BaseCommand):
+    help = "Ask a node to move all of its rooms to other nodes, e.g. before a deploy"
+
+    def add_arguments(self, parser):
+        parser.add_argument('node_id', help="ID of the node to drain")
+
+    def handle(self, *args, **options):
+        async def send():
+            pubsub = create_pubsub(settings.CLUSTER_PUBSUB)
+            await pubsub.publish(node_channel(options['node_id']), {'type': 'drain'})
+            await pubsub.close()
+        asyncio.run(send())
+        self.stdout.write(f"Drain requested for node {options['node_id']}")
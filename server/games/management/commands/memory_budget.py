@@ -0,0 +1,32 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from games.benchmarks import ROOM_KINDS, measure_room_memory
+
+# Bytes allowed per room in each state
+DEFAULT_BUDGETS = {'empty': 512, 'lobby': 6 * 1024, 'in_progress': 16 * 1024}
+# Idle rooms the projected total is reported for
+IDLE_ROOMS_TARGET = 100000
+
+
+class Command(BaseCommand):
+    help = "Measure bytes per room in each state and fail if any exceeds its budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=10000, help="Rooms built per state")
+        for kind in ROOM_KINDS:
+            parser.add_argument(f'--budget-{kind.replace("_", "-")}', type=int, default=DEFAULT_BUDGETS[kind],
+                                help=f"Bytes allowed per {kind.replace('_', ' ')} room")
+
+    def handle(self, *args, **options):
+        report = {}
+        over = []
+        for kind in ROOM_KINDS:
+            per_room = measure_room_memory(kind, options['rooms'])
+            budget = options[f'budget_{kind}']
+            report[kind] = {'bytesPerRoom': round(per_room), 'budget': budget}
+            if per_room > budget:
+                over.append(f"{kind} rooms use {per_room:.0f} bytes (budget {budget})")
+        report['idleRoomsMegabytes'] = round(report['empty']['bytesPerRoom'] * IDLE_ROOMS_TARGET / 2 ** 20, 1)
+        self.stdout.write(json.dumps(report, indent=2))
+        if over:
+            raise CommandError("Memory budget exceeded: " + "; ".join(over))
@@ -0,0 +1,23 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from games.pubsub import UnixSocketPubSubHub
+
+
+class Command(BaseCommand):
+    help = "Run the Unix socket pub/sub hub connecting the nodes on this machine"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Socket path (defaults to the path in CLUSTER_PUBSUB)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            if not settings.CLUSTER_PUBSUB.startswith('unix:'):
+                raise CommandError("CLUSTER_PUBSUB is not a unix: URL; pass --path")
+            path = settings.CLUSTER_PUBSUB[len('unix:'):]
+        self.stdout.write(f"Pub/sub hub listening on {path}")
+        try:
+            asyncio.run(UnixSocketPubSubHub(path).serve())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,27 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from games.benchmarks import run_replay_benchmark
+from games.history_store import HistoryStore
+
+
+class Command(BaseCommand):
+    help = "Replay archived games through the current engine, check their outcomes and report throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-dir', default=getattr(settings, 'GAME_HISTORY_DIR', None),
+                            help="Directory of archived game histories (defaults to GAME_HISTORY_DIR)")
+        parser.add_argument('--repeat', type=int, default=1, help="Times each game is replayed")
+        parser.add_argument('--limit', type=int, help="Replay at most this many games")
+
+    def handle(self, *args, **options):
+        if not options['history_dir']:
+            raise CommandError("No history directory configured")
+        store = HistoryStore(options['history_dir'])
+        game_ids = store.game_ids()[:options['limit']]
+        # Load everything first so only the engine is timed
+        histories = {game_id: store.load(game_id) for game_id in game_ids}
+        report = run_replay_benchmark(histories, options['repeat'])
+        self.stdout.write(json.dumps(report, indent=2))
+        if report['failures']:
+            raise CommandError(f"{len(report['failures'])} games did not replay identically")
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import subprocess
+import sys
+from django.core.management.base import BaseCommand
+from games.shard_router import ShardRouter
+
+
+class Command(BaseCommand):
+    help = "Run one daphne worker per shard behind a room-affinity router"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (defaults to the CPU count)")
+        parser.add_argument('--host', default='0.0.0.0', help="Address the router listens on")
+        parser.add_argument('--port', type=int, default=8000, help="Port the router listens on")
+        parser.add_argument('--worker-port-base', type=int,
+                            help="First worker port; workers use consecutive ports (defaults to port + 1)")
+
+    def handle(self, *args, **options):
+        shard_count = options['shards']
+        base_port = options['worker_port_base'] or options['port'] + 1
+        backends = [('127.0.0.1', base_port + index) for index in range(shard_count)]
+        workers = []
+        for index, (host, port) in enumerate(backends):
+            env = dict(os.environ, SHARD_INDEX=str(index), SHARD_COUNT=str(shard_count))
+            workers.append(subprocess.Popen(
+                # Workers listen on loopback only, so the forwarded client address comes from the router
+                [sys.executable, '-m', 'daphne', '--proxy-headers', '-b', host, '-p', str(port),
+                 'literature.asgi:application'],
+                env=env,
+            ))
+        self.stdout.write(f"Routing {options['host']}:{options['port']} to {shard_count} shards "
+                          f"on ports {base_port}-{base_port + shard_count - 1}")
+        try:
+            asyncio.run(ShardRouter(backends).serve(options['host'], options['port']))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.wait()
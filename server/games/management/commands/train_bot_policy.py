@@ -0,0 +1,51 @@
+import json
+import time
+from array import array
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from games.bot_training import train
+from games.bots import PolicyTables
+
+
+class Command(BaseCommand):
+    help = "Train the bot policy tables by self-play and write them to a policy file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=getattr(settings, 'BOT_POLICY_FILE', '') or None,
+                            help="Policy file to write (defaults to BOT_POLICY_FILE)")
+        parser.add_argument('--rounds', type=int, default=5,
+                            help="Rounds of self-play, each using the previous round's tables")
+        parser.add_argument('--games-per-round', type=int, default=100000,
+                            help="Games played per round")
+        parser.add_argument('--processes', type=int, default=4,
+                            help="Worker processes playing games")
+        parser.add_argument('--epsilon', type=float, default=0.1,
+                            help="Probability of a random move, to explore moves the policy avoids")
+        parser.add_argument('--seed', type=int, default=None,
+                            help="Seed making the run reproducible")
+        parser.add_argument('--resume', action='store_true',
+                            help="Start from the tables in the output file instead of the defaults")
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError("Give --output or set BOT_POLICY_FILE")
+        tables = None
+        if options['resume']:
+            try:
+                mapped = PolicyTables.load(options['output'])
+                # Copy out of the mapping, as the same file is rewritten at the end
+                tables = PolicyTables(array('f', mapped.ask), array('f', mapped.claim))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot resume: {e}")
+        started = time.perf_counter()
+        try:
+            tables = train(options['rounds'], options['games_per_round'], options['processes'],
+                           options['epsilon'], options['seed'], tables, report=self.stderr.write)
+        except ValueError as e:
+            raise CommandError(str(e))
+        tables.save(options['output'])
+        self.stdout.write(json.dumps({
+            'output': options['output'],
+            'games': options['rounds'] * options['games_per_round'],
+            'seconds': round(time.perf_counter() - started, 3),
+        }))
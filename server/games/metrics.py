@@ -0,0 +1,73 @@
+"""
+Process-wide metrics for the Literature server, exposed in the Prometheus
+text format by the metrics endpoint.
+"""
+
+import threading
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in sorted(labels.items())) + '}'
+
+
+class Metrics:
+    """Counters, gauges and gauges computed when scraped."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}  # (name, labels) -> value
+        self.gauge_functions = {}  # name -> callable returning the current value
+        self.help = {}  # name -> (type, description)
+
+    def describe(self, name, kind, description):
+        """Register a metric's type ('counter' or 'gauge') and help text."""
+        self.help[name] = (kind, description)
+
+    def inc(self, name, value=1, **labels):
+        """Add to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Set a gauge."""
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def gauge_function(self, name, function):
+        """Register a gauge whose value is read from a callable at scrape time."""
+        self.gauge_functions[name] = function
+
+    def value(self, name, **labels):
+        """Current value of a counter or gauge, or 0 if never set."""
+        key = (name, tuple(sorted(labels.items())))
+        return self.counters.get(key, self.gauges.get(key, 0))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self.lock:
+            samples = list(self.counters.items())
+        samples += list(self.gauges.items())
+        for name, function in list(self.gauge_functions.items()):
+            try:
+                samples.append(((name, ()), function()))
+            except Exception as e:
+                log.error("metric_read_failed", metric=name, error=str(e))
+        lines = []
+        described = set()
+        for (name, labels), value in sorted(samples, key=lambda sample: sample[0]):
+            if name not in described and name in self.help:
+                kind, description = self.help[name]
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                described.add(name)
+            lines.append(f'{name}{_format_labels(dict(labels))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
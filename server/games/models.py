@@ -1,3 +1,19 @@
 from django.db import models
 
-# Create your models here.
+
+class PlayerStats(models.Model):
+    """
+    Running totals of one player's results, maintained by games.stats.
+
+    Players are identified by the archive key of their token (see
+    games.archive.player_key), as 16 hex digits.
+    """
+
+    player_key = models.CharField(max_length=16, primary_key=True)
+    games_played = models.PositiveIntegerField(default=0)
+    games_won = models.PositiveIntegerField(default=0)
+    asks = models.PositiveIntegerField(default=0)
+    asks_successful = models.PositiveIntegerField(default=0)
+    claims_correct = models.PositiveIntegerField(default=0)
+    claims_incorrect = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
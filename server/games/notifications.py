@@ -0,0 +1,36 @@
+"""
+Push notifications for Literature game events.
+Turns engine events into queued notifications so game actions never wait on FCM.
+"""
+
+from literature.push_notifications import get_notification_service
+
+
+def notify_game_event(game, event, details):
+    """
+    Game listener that notifies players when the game starts or their turn comes up.
+
+    Args:
+        game (Game): Game that emitted the event
+        event (str): Event type
+        details (dict): Event details
+    """
+    service = get_notification_service()
+    if event == 'game_started':
+        for player in game.players.values():
+            service.notify(
+                service.devices_for(player.token),
+                "Game started",
+                f"Your game in room {game.game_id} has started",
+                {'room_id': game.game_id},
+            )
+    elif event == 'turn_changed':
+        player = game.get_player(details['player_id'])
+        # Only the latest turn in a room is worth delivering
+        service.notify(
+            service.devices_for(player.token),
+            "Your turn",
+            f"It's your turn in room {game.game_id}",
+            {'room_id': game.game_id},
+            coalesce_key=(game.game_id, 'turn'),
+        )
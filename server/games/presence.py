@@ -0,0 +1,78 @@
+"""
+Presence tracking for rooms in the Literature card game.
+Keeps a seat reserved for a while after its socket drops so a player
+can resume without rejoining.
+"""
+
+import time
+
+# Seconds a dropped player keeps their seat before being removed
+DISCONNECT_GRACE_SECONDS = 60
+# Shared by every tracker with no pending changes, so idle rooms don't each hold an empty set
+NO_CHANGES = frozenset()
+
+
+class Presence:
+    """Tracks which seated players are currently disconnected."""
+
+    __slots__ = ('disconnected', 'changed')
+
+    def __init__(self):
+        """Initialize an empty presence tracker."""
+        self.disconnected = {}  # token -> monotonic time of disconnect
+        self.changed = NO_CHANGES  # Tokens marked since the last take_changes, a set once there are any
+
+    def mark_disconnected(self, token, now=None):
+        """
+        Mark a player's socket as dropped.
+
+        Args:
+            token: Token of the player who disconnected
+            now (float, optional): Monotonic timestamp, defaults to the current time
+        """
+        self.disconnected[token] = time.monotonic() if now is None else now
+        self._changed(token)
+
+    def mark_connected(self, token):
+        """
+        Clear the disconnected flag for a player.
+
+        Args:
+            token: Token of the player who (re)connected or left
+        """
+        if self.disconnected.pop(token, None) is not None:
+            self._changed(token)
+
+    def _changed(self, token):
+        if self.changed is NO_CHANGES:
+            self.changed = set()
+        self.changed.add(token)
+
+    def is_disconnected(self, token):
+        """Check if a player is currently inside their grace period."""
+        return token in self.disconnected
+
+    def remaining(self, token, grace=DISCONNECT_GRACE_SECONDS, now=None):
+        """
+        Get the time left in a player's grace period.
+
+        Args:
+            token: Token of a disconnected player
+            grace (float): Grace period in seconds
+            now (float, optional): Monotonic timestamp, defaults to the current time
+
+        Returns:
+            float: Seconds until the player should be removed, 0 if already due
+        """
+        now = time.monotonic() if now is None else now
+        return max(self.disconnected[token] + grace - now, 0.0)
+
+    def take_changes(self):
+        """
+        Get the players marked connected or disconnected since the last call.
+
+        Returns:
+            set: Their tokens
+        """
+        changed, self.changed = self.changed, NO_CHANGES
+        return changed
@@ -0,0 +1,147 @@
+"""
+Pluggable publish/subscribe transport connecting Literature server nodes.
+
+Messages are JSON-serializable dictionaries published to named channels.
+LocalPubSub connects nodes living in one process (tests, single-node runs);
+UnixSocketPubSub connects processes on one machine through a small hub and
+is the stand-in for a networked broker.
+"""
+
+import asyncio
+import json
+import os
+
+
+class PubSub:
+    """Interface of every pub/sub transport."""
+
+    async def publish(self, channel, message):
+        """Deliver a message to every subscriber of a channel."""
+        raise NotImplementedError
+
+    async def subscribe(self, channel, handler):
+        """
+        Subscribe to a channel.
+
+        Args:
+            channel (str): Channel name
+            handler: Coroutine function called with each message
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Release the transport's resources."""
+
+
+class LocalPubSub(PubSub):
+    """Delivers messages between subscribers in the same process."""
+
+    def __init__(self):
+        self.handlers = {}  # channel -> list of handlers
+
+    async def publish(self, channel, message):
+        # Round-trip through JSON so local delivery behaves like a real transport
+        data = json.dumps(message)
+        for handler in self.handlers.get(channel, ()):
+            asyncio.ensure_future(handler(json.loads(data)))
+
+    async def subscribe(self, channel, handler):
+        self.handlers.setdefault(channel, []).append(handler)
+
+
+class UnixSocketPubSubHub:
+    """Hub process forwarding messages between UnixSocketPubSub clients."""
+
+    def __init__(self, path):
+        """
+        Initialize the hub.
+
+        Args:
+            path (str): Filesystem path of the Unix socket to listen on
+        """
+        self.path = path
+        self.subscribers = {}  # channel -> set of stream writers
+
+    async def serve(self):
+        """Accept clients until cancelled."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, self.path)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                if request['op'] == 'sub':
+                    self.subscribers.setdefault(request['channel'], set()).add(writer)
+                elif request['op'] == 'pub':
+                    for subscriber in list(self.subscribers.get(request['channel'], ())):
+                        subscriber.write(line)
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            for subscribers in self.subscribers.values():
+                subscribers.discard(writer)
+            writer.close()
+
+
+class UnixSocketPubSub(PubSub):
+    """Client of a UnixSocketPubSubHub."""
+
+    def __init__(self, path):
+        """
+        Initialize the client. The connection is opened on first use.
+
+        Args:
+            path (str): Filesystem path of the hub's Unix socket
+        """
+        self.path = path
+        self.handlers = {}  # channel -> list of handlers
+        self.writer = None
+        self.reader_task = None
+
+    async def _connect(self):
+        if self.writer is None:
+            reader, self.writer = await asyncio.open_unix_connection(self.path)
+            self.reader_task = asyncio.ensure_future(self._read(reader))
+
+    async def _read(self, reader):
+        while line := await reader.readline():
+            envelope = json.loads(line)
+            for handler in self.handlers.get(envelope['channel'], ()):
+                asyncio.ensure_future(handler(envelope['message']))
+
+    async def _send(self, request):
+        await self._connect()
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+
+    async def publish(self, channel, message):
+        await self._send({'op': 'pub', 'channel': channel, 'message': message})
+
+    async def subscribe(self, channel, handler):
+        if channel not in self.handlers:
+            await self._send({'op': 'sub', 'channel': channel})
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def close(self):
+        if self.writer is not None:
+            self.reader_task.cancel()
+            self.writer.close()
+            self.writer = None
+
+
+def create_pubsub(url):
+    """
+    Build a transport from a URL: "local" or "unix:<socket path>".
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    if url == 'local':
+        return LocalPubSub()
+    if url.startswith('unix:'):
+        return UnixSocketPubSub(url[len('unix:'):])
+    raise ValueError(f"Unsupported pub/sub URL: {url}")
@@ -0,0 +1,62 @@
+"""
+Token-bucket rate limiting for client messages.
+"""
+
+import time
+
+# Keys tracked before idle buckets are pruned
+MAX_TRACKED_KEYS = 100000
+
+
+class RateLimiter:
+    """
+    One token bucket per key (player token, client IP, ...).
+
+    Each bucket holds up to `burst` tokens and refills at `rate` tokens per
+    second; a message spends one token. A bucket is two floats in a list, so
+    checking a message costs a dict lookup and a little arithmetic.
+    """
+
+    def __init__(self, rate, burst, max_keys=MAX_TRACKED_KEYS):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate (float): Tokens added per second
+            burst (int): Bucket capacity
+            max_keys (int): Buckets kept before idle ones are dropped
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = {}  # key -> [tokens, last refill time]
+
+    def allow(self, key, now=None):
+        """
+        Spend a token for a key.
+
+        Returns:
+            bool: False if the key is over its rate and the message must be dropped
+        """
+        now = time.monotonic() if now is None else now
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.prune(now)
+            bucket = self.buckets[key] = [self.burst, now]
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def prune(self, now=None):
+        """Drop buckets that have refilled completely, which behave like new ones."""
+        now = time.monotonic() if now is None else now
+        full = self.burst / self.rate
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if now - bucket[1] < full}
+        if len(self.buckets) >= self.max_keys:
+            # Too many active keys; forget the older half rather than prune on every new key
+            self.buckets = dict(list(self.buckets.items())[len(self.buckets) // 2:])
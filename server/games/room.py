@@ -3,16 +3,37 @@ Room implementation for Literature card game.
 Manages a lobby where players can join before the game starts.
 """
 
+import hashlib
+import json
 import random
 import string
+import time
 import uuid
-from .engine.game import IN_PROGRESS, NOT_STARTED, Game
+from collections import deque
+from itertools import islice
+from .bots import is_bot_token, new_bot_token
+from .engine.game import EMPTY_GAME, IN_PROGRESS, NOT_STARTED, Game
 from .engine.player import Player
+from .engine.zobrist import format_hash
+from .presence import Presence
+
+# Number of applied actions kept per room for resuming clients
+EVENT_BUFFER_SIZE = 128
+# A full snapshot is logged every this many room versions
+SNAPSHOT_INTERVAL = 50
+# Game implementation for each room type
+GAME_CLASSES = {'literature': Game}
+# Event buffer of rooms that have not applied an action yet
+EMPTY_EVENTS = ()
 
 class Room:
     """Represents a game room where players can join before starting a game."""
+
+    __slots__ = ('room_id', 'game_type', 'connected_players', 'game', 'host_token', 'version', 'events',
+                 'presence', 'log', 'frozen', 'public_payload_cache', 'turn_deadline', 'game_listeners', 'seed',
+                 'room_hash_cache')
     
-    def __init__(self, game_type = 'literature', room_id=None):
+    def __init__(self, game_type = 'literature', room_id=None, seed=None):
         """
         Initialize a new room.
         
@@ -20,30 +41,52 @@ class Room:
             host_id: Unique identifier for the host player
             host_name (str): Display name of the host
             room_id (str, optional): Room identifier. If None, one will be generated.
+            seed (int, optional): Seed for the room's games, making their deals reproducible
         """
+        if game_type not in GAME_CLASSES:
+            raise ValueError(f"Unsupported game type: {game_type}")
         self.room_id = room_id or self._generate_room_id()
         self.game_type = game_type
         self.connected_players = {}  # token -> Player object
-        self.game = self.create_game_instance()
+        self.game = EMPTY_GAME  # Replaced by a real game when the first player joins
+        self.game_listeners = ()  # Attached to the game once it exists
+        self.seed = seed
         self.host_token = None
+        self.version = 0  # Incremented on every applied action
+        self.events = EMPTY_EVENTS  # Recent applied actions, a bounded deque once there are any
+        self.presence = Presence()
+        self.log = None  # EventLog receiving applied actions, if persistence is enabled
+        self.frozen = False  # Set while the room is being moved to another node
+        self.public_payload_cache = None  # (version, serialized spectator state)
+        self.room_hash_cache = None  # (version, hash of the room fields outside the game)
+        self.turn_deadline = None  # Monotonic time the current turn clock runs out, if running
     
-    def _generate_room_id(self, length=6):
+    @staticmethod
+    def _generate_room_id(length=6):
         """Generate a random room ID."""
         return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
     
     def create_game_instance(self):
         """Create a new game instance based on the game type."""
-        if self.game_type == 'literature':
-            return Game(self.room_id)
-        else:
-            raise ValueError(f"Unsupported game type: {self.game_type}")
+        game = GAME_CLASSES[self.game_type](self.room_id, self.seed)
+        for listener in self.game_listeners:
+            game.add_listener(listener)
+        return game
+
+    def add_game_listener(self, listener):
+        """Subscribe a listener to this room's game, now or once it is created."""
+        self.game_listeners += (listener,)
+        if self.game is not EMPTY_GAME:
+            self.game.add_listener(listener)
     
-    def add_player(self, player_name, player_token):
+    def add_player(self, player_name, player_token, player_id=None):
         """
         Add a player to the room.
         
         Args:
             player (Player): Player object to add
+            player_id (str, optional): ID to give a new player. Only set when
+                replaying logged actions; a fresh ID is generated otherwise.
             
         Raises:
             ValueError: If the room is full or the player ID already exists
@@ -52,12 +95,18 @@ class Room:
             Player: The added player
         """ 
         if player_token in self.connected_players:
-            raise ValueError("Player already in room")
+            if not self.presence.is_disconnected(player_token):
+                raise ValueError("Player already in room")
+            # Returning within the grace period keeps the seat as it was
+            self.presence.mark_connected(player_token)
+            return
         
         if not player_name:
             raise ValueError("Player name cannot be empty")
+        if self.game is EMPTY_GAME:
+            self.game = self.create_game_instance()
         if self.game.state == NOT_STARTED:
-            player_id = str(uuid.uuid4())
+            player_id = player_id or str(uuid.uuid4())
             player = self.game.add_player(player_id, player_name, player_token)
         else:
             player = self.game.get_player_by_token(player_token)
@@ -83,11 +132,44 @@ class Room:
             raise ValueError("Only the host or the player themselves can be removed")
         
         del self.connected_players[player.token]
-        if self.connected_players and self.is_host(player):
-            self.host_token = next(iter(self.connected_players.keys()))
+        self.presence.mark_connected(player.token)
+        removed = [player]
+        humans = [token for token in self.connected_players if not is_bot_token(token)]
+        if not humans:
+            # Bots do not keep a room alive on their own
+            removed += self.connected_players.values()
+            self.connected_players.clear()
+        elif self.is_host(player):
+            self.host_token = humans[0]
 
         if self.game.state == NOT_STARTED:
-            self.game.remove_player(player.id)
+            for removed_player in removed:
+                self.game.remove_player(removed_player.id)
+            if not self.connected_players:
+                self.game = EMPTY_GAME
+
+    def add_bot(self, requester, bot_token, bot_id=None):
+        """
+        Seat a bot in the room.
+
+        Args:
+            requester (Player): Player asking for the bot (must be host)
+            bot_token (str): Token of the bot's seat, from new_bot_token
+            bot_id (str, optional): ID of the bot, only set when replaying logged actions
+
+        Returns:
+            Player: The bot's player
+
+        Raises:
+            ValueError: If the requester is not the host or the game has started
+        """
+        if not self.is_host(requester):
+            raise ValueError("Only the host can add bots")
+        if self.game.state != NOT_STARTED:
+            raise ValueError("Game has already started, cannot add bots")
+        bots = sum(1 for token in self.connected_players if is_bot_token(token))
+        self.add_player(f"Bot {bots + 1}", bot_token, bot_id)
+        return self.connected_players[bot_token]
     
     def start_game(self, start_requester):
         """
@@ -117,29 +199,57 @@ class Room:
             raise ValueError("Cannot change host to the same player")
         self.host_token = new_host.token
 
-    def register_action(self, action):
+    def register_action(self, action, player_id=None):
         """
         Register an action from a player.
+
+        Args:
+            action (dict): The action, including the actor's token
+            player_id (str, optional): Player ID to reuse for add_player when
+                replaying a logged action
         """
+        if self.frozen:
+            raise ValueError("Room is moving to another server, try again shortly")
+        record = dict(action)
         action_token = action.get('action_token')
         if not action_token:
             raise ValueError("Action token is required")
         action_type = action.get('type')
+        before = self._public_facts()
         if action_type == 'add_player':
             player_name = action.get('player_name')
             if not player_name:
                 raise ValueError("Player name is required")
-            self.add_player(player_name, action_token)
+            self.add_player(player_name, action_token, player_id)
             actor = self.get_player_by_token(action_token)
+        elif action_type == 'turn_timeout':
+            # The clock also runs out for players who left the room mid-game
+            actor = (self.get_player_by_token(action_token, raise_if_not_found=False)
+                     or self.game.get_player_by_token(action_token))
+            if actor is None:
+                raise ValueError("Player not found with token: {}".format(action_token))
+            self.game.register_timeout_action(actor.id, action.get('in_game_action') or {})
         else:
             actor = self.get_player_by_token(action_token)
             if action_type == 'start_game':
+                # Only logged actions carry a seed; it must not reach clients
+                seed = action.pop('seed', None)
+                if seed is not None and self.game.rng is None:
+                    self.game.seed = seed
                 self.start_game(actor)
+                record['seed'] = self.game.seed
+            elif action_type == 'add_bot':
+                # Only logged actions carry the bot's token and ID; the token must not reach clients
+                bot_token = action.pop('bot_token', None) or new_bot_token()
+                bot = self.add_bot(actor, bot_token, action.pop('bot_id', None))
+                record['bot_token'], record['bot_id'] = bot_token, bot.id
             elif action_type == 'remove_player':
                 player_id = action.get('player_id')
                 self.remove_player(actor, player_id)
             elif action_type == 'exit_room':
                 self.remove_player(actor, actor.id)
+            elif action_type == 'disconnect':
+                self.presence.mark_disconnected(actor.token)
             elif action_type == 'change_host':
                 new_host_id = action.get('new_host_id')
                 self.change_host(actor, new_host_id)
@@ -153,8 +263,181 @@ class Room:
                 self.game.register_in_game_action(actor.id, in_game_action)
             else:
                 raise ValueError("Unknown action type")
-        del action['action_token']
-        action['actor_id'] = actor.id
+        self.version += 1
+        if self.events is EMPTY_EVENTS:
+            self.events = deque(maxlen=EVENT_BUFFER_SIZE)
+        self.events.append(self._event(action_type, actor, before))
+        if self.log:
+            record['actor_id'] = actor.id
+            self.log.append(self.room_id, self.version, record)
+            if self.version % SNAPSHOT_INTERVAL == 0:
+                self.log.snapshot(self.room_id, self.version, self.snapshot())
+
+    def _public_facts(self):
+        """Capture the fields every client sees alike, to find what an action changed."""
+        game = self.game
+        host = self.connected_players.get(self.host_token)
+        return (
+            host.id if host else None,
+            tuple(player.id for player in self.connected_players.values()),
+            tuple(player.id for token, player in self.connected_players.items()
+                  if self.presence.is_disconnected(token)),
+            {player.id: (player.team, len(player.hand)) for player in game.players.values()},
+            game.state,
+            game.current_turn_player_id,
+            game.last_ask,
+            len(game.claimed_sets),
+            game.winning_team,
+        )
+
+    def _event(self, action_type, actor, before):
+        """
+        Build the buffered event of an applied action.
+
+        An event holds the actor and only the public fields the action
+        changed, under the names to_dict uses, so a resuming client can apply
+        it to the state it holds. Hands are left out; the resume message
+        carries the resuming player's own hand.
+
+        Args:
+            action_type (str): Type of the applied action
+            actor (Player): Player who acted
+            before (tuple): Public facts captured before the action
+
+        Returns:
+            dict: The event
+        """
+        (host_id, connected, disconnected, seats, state, current_player_id, last_ask, claimed,
+         winning_team) = before
+        game = self.game
+        event = {'type': action_type, 'actorId': actor.id}
+        after = self._public_facts()
+        if after[0] != host_id:
+            event['hostId'] = after[0]
+        if after[1] != connected:
+            event['connectedPlayers'] = after[1]
+        if after[2] != disconnected:
+            event['disconnectedPlayers'] = after[2]
+        if after[3] != seats:
+            joined = tuple((player.id, player.name, player.team)
+                           for player in game.players.values() if player.id not in seats)
+            if joined:
+                event['joined'] = joined
+            removed = tuple(player_id for player_id in seats if player_id not in after[3])
+            if removed:
+                event['removed'] = removed
+            teams = {player_id: team for player_id, (team, _) in after[3].items()
+                     if player_id in seats and seats[player_id][0] != team}
+            if teams:
+                event['teams'] = teams
+            counts = {player_id: count for player_id, (_, count) in after[3].items()
+                      if seats.get(player_id, (None, 0))[1] != count}
+            if counts:
+                event['counts'] = counts
+        if game.state != state:
+            event['state'] = game.state
+        if game.current_turn_player_id != current_player_id:
+            event['currentPlayerId'] = game.current_turn_player_id
+        if game.last_ask is not last_ask:
+            event['lastAsk'] = game.last_ask
+        if len(game.claimed_sets) != claimed:
+            event['claimedSets'] = dict(game.claimed_sets)
+            event['scores'] = dict(game.scores)
+        if game.winning_team != winning_team:
+            event['winningTeam'] = game.winning_team
+        # Public hash after the action, so a client can check it holds this version before applying later ones
+        event['hash'] = self.public_hash()
+        return event
+
+    def replay_action(self, record):
+        """Apply an action read back from the event log."""
+        record = dict(record)
+        self.register_action(record, player_id=record.pop('actor_id', None))
+
+    def snapshot(self):
+        """
+        Return a JSON-serializable snapshot of the room and its game.
+
+        Returns:
+            dict: Snapshot accepted by Room.from_snapshot
+        """
+        return {
+            'room_id': self.room_id,
+            'type': self.game_type,
+            'version': self.version,
+            'hostToken': self.host_token,
+            'seed': self.seed,
+            'connectedPlayers': [player.id for player in self.connected_players.values()],
+            # Logged resume joins only replay onto seats that were held when the snapshot was taken
+            'disconnectedPlayers': [player.id for token, player in self.connected_players.items()
+                                    if self.presence.is_disconnected(token)],
+            'game': self.game.snapshot() if self.game is not EMPTY_GAME else None,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """
+        Rebuild a room from a snapshot produced by Room.snapshot.
+
+        Args:
+            data (dict): Snapshot data
+
+        Returns:
+            Room: The restored room
+        """
+        room = cls(data['type'], data['room_id'], data.get('seed'))
+        if data['game']:
+            room.game = GAME_CLASSES[room.game_type].from_snapshot(data['game'])
+        room.version = data['version']
+        room.host_token = data['hostToken']
+        for player_id in data['connectedPlayers']:
+            player = room.game.get_player(player_id)
+            room.connected_players[player.token] = player
+        for player_id in data.get('disconnectedPlayers', ()):
+            room.presence.mark_disconnected(room.game.get_player(player_id).token)
+        return room
+
+    def resume_state(self, asker_token, version):
+        """
+        Get what a returning client needs to catch up from the version it holds.
+
+        Args:
+            asker_token (str): Token of the returning player
+            version (int): Last room version seen by the client
+
+        Returns:
+            dict: The events newer than the version, the public hash the client
+                  must hold to apply them, and the player's own hand and legal
+                  moves now; None if the buffer no longer covers the version and
+                  a full snapshot is needed
+        """
+        if version > self.version:
+            return None
+        # The buffer holds the latest versions in order, so an event's version is its position
+        first_version = self.version - len(self.events) + 1
+        if version == self.version:
+            events = []
+            base_hash = self.public_hash()
+        elif version < first_version:
+            return None
+        else:
+            # The event at the client's version supplies the hash its state must match
+            events = list(islice(self.events, version - first_version, None))
+            base_hash = events.pop(0)['hash']
+        asker = self.get_player_by_token(asker_token, raise_if_not_found=False)
+        game = self.game.to_dict(asker.id if asker else None)
+        hand = next((player['hand'] for player in game['players'] if asker and player['id'] == asker.id), [])
+        return {
+            'version': self.version,
+            'baseHash': format_hash(base_hash),
+            'publicHash': format_hash(self.public_hash()),
+            'stateHash': self.state_hash(asker_token),
+            'turnTimeRemaining': self._turn_time_remaining(),
+            'hand': hand,
+            'legalMoves': game['legalMoves'],
+            'events': [dict(((key, value) for key, value in event.items() if key != 'hash'), version=number)
+                       for number, event in enumerate(events, version + 1)],
+        }
     
     def get_player(self, player_id):
         """Get a player by ID."""
@@ -177,6 +460,52 @@ class Room:
         """Check if a player is the host."""
         return player.token == self.host_token
     
+    def _room_hash(self):
+        """Hash the lobby fields around the game, once per room version."""
+        if self.room_hash_cache is None or self.room_hash_cache[0] != self.version:
+            host = self.connected_players.get(self.host_token)
+            fields = (
+                host.id if host else None,
+                [(player.id, self.presence.is_disconnected(token)) for token, player in self.connected_players.items()],
+                [(player.id, player.team) for player in self.game.players.values()],
+            )
+            digest = hashlib.blake2b(repr(fields).encode(), digest_size=8).digest()
+            self.room_hash_cache = (self.version, int.from_bytes(digest, 'big'))
+        return self.room_hash_cache[1]
+
+    def public_hash(self):
+        """
+        Get the hash of the room state every client sees alike, hands aside.
+
+        Returns:
+            int: 64-bit hash
+        """
+        return self._room_hash() ^ self.game.public_hash
+
+    def state_hash(self, asker_token):
+        """
+        Get the hash of the room state one client sees.
+
+        Clients compare it with the hash of the state they hold to find out
+        whether they missed anything, without fetching the state. The game's
+        part is its Zobrist view hash; the lobby fields around it are hashed
+        once per room version.
+
+        Args:
+            asker_token (str, optional): Token of the viewer; None for a spectator
+
+        Returns:
+            str: 64-bit hash as 16 hex digits
+        """
+        asker = self.connected_players.get(asker_token)
+        return format_hash(self._room_hash() ^ self.game.view_hash(asker.id if asker else None))
+
+    def _turn_time_remaining(self):
+        """Seconds left on the current turn's clock, or None when no clock runs."""
+        if self.turn_deadline is None:
+            return None
+        return round(max(self.turn_deadline - time.monotonic(), 0.0), 1)
+
     def to_dict(self, asker_token):
         """
         Return a dictionary representation of the room.
@@ -187,11 +516,39 @@ class Room:
         """
         asker = self.get_player_by_token(asker_token, raise_if_not_found=False)
         host = self.get_player_by_token(self.host_token, raise_if_not_found=False)
+        game = self.game.to_dict(asker.id if asker else None)
+        if self.game is EMPTY_GAME:
+            game['gameId'] = self.room_id
         return {
             'room_id': self.room_id,
             'type': self.game_type,
             'hostId': host.id if host else None,
-            'receiverId': asker.id,
+            'receiverId': asker.id if asker else None,
             'connectedPlayers': [player.id for player in self.connected_players.values()],
-            'game': self.game.to_dict(asker.id if asker else None),
-        }
\ No newline at end of file
+            'disconnectedPlayers': [player.id for token, player in self.connected_players.items()
+                                    if self.presence.is_disconnected(token)],
+            'version': self.version,
+            'stateHash': self.state_hash(asker_token),
+            'publicHash': format_hash(self.public_hash()),
+            'turnTimeRemaining': self._turn_time_remaining(),
+            'game': game,
+        }
+
+    def public_payload(self):
+        """
+        Get the spectator message for the current version, serialized once.
+
+        Spectators see what any outsider may see: hand counts, the last ask,
+        claimed sets and scores, but no cards.
+
+        Returns:
+            tuple: (room version, JSON text shared by every spectator)
+        """
+        if self.public_payload_cache is None or self.public_payload_cache[0] != self.version:
+            text = json.dumps({
+                'success': True,
+                'spectating': True,
+                'currentState': self.to_dict(None),
+            })
+            self.public_payload_cache = (self.version, text)
+        return self.public_payload_cache
\ No newline at end of file
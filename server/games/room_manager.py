@@ -3,11 +3,33 @@ Room manager for the Literature card game.
 Handles room creation, lookup, and management.
 """
 
+import json
+import random
+import threading
+import time
+import uuid
 from .room import Room
+from .bots import (BOT_BATCH_SIZE, BOT_BATCH_WAIT, BOT_MOVE_DELAY, BotPolicy, DecisionBatcher, Knowledge,
+                   PolicyTables, is_bot_token)
 from .engine.player import Player
-from .engine.game import NOT_STARTED
+from .engine.game import ENDED, IN_PROGRESS, NOT_STARTED
+from .event_log import EventLog
+from .history_store import HistoryStore
+from .archive import GameArchive
+from .sharding import ShardConfig
+from .timer_wheel import TimerWheel
+from .metrics import metrics
+from literature.logs import get_logger
+
+log = get_logger(__name__)
 
 available_game_types = ['literature', ]
+# Seconds before removing an expired seat is retried when its room refused the exit
+PRESENCE_RETRY_SECONDS = 1.0
+# Moves made for a player whose turn clock runs out
+TURN_TIMEOUT_POLICIES = ('random_ask', 'pass')
+# Game states the room list can be filtered by
+LOBBY_STATES = (NOT_STARTED, IN_PROGRESS, ENDED)
 
 class RoomManager:
     """Singleton manager for game rooms."""
@@ -16,18 +38,107 @@ class RoomManager:
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = RoomManager()
+            from django.conf import settings
+            from .bots import get_bot_policy
+            event_log = None
+            history_store = None
+            game_archive = None
+            if getattr(settings, 'ROOM_EVENT_LOG', None):
+                event_log = EventLog(settings.ROOM_EVENT_LOG)
+            if getattr(settings, 'GAME_HISTORY_DIR', None):
+                history_store = HistoryStore(settings.GAME_HISTORY_DIR)
+            if getattr(settings, 'GAME_ARCHIVE_DIR', None):
+                game_archive = GameArchive(settings.GAME_ARCHIVE_DIR)
+            shard = ShardConfig(getattr(settings, 'SHARD_INDEX', 0), getattr(settings, 'SHARD_COUNT', 1))
+            cls._instance = RoomManager(event_log, history_store, game_archive, shard,
+                                        getattr(settings, 'TURN_TIMEOUT_SECONDS', 0),
+                                        getattr(settings, 'TURN_TIMEOUT_POLICY', 'random_ask'),
+                                        get_bot_policy(), getattr(settings, 'BOT_MOVE_DELAY', BOT_MOVE_DELAY),
+                                        getattr(settings, 'BOT_BATCH_SIZE', BOT_BATCH_SIZE),
+                                        getattr(settings, 'BOT_BATCH_WAIT', BOT_BATCH_WAIT))
+            from .notifications import notify_game_event
+            cls._instance.add_game_listener(notify_game_event)
+            from .stats import get_stats_service
+            cls._instance.add_game_listener(get_stats_service().record_game_event)
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, event_log=None, history_store=None, game_archive=None, shard=None,
+                 turn_timeout=0, turn_timeout_policy='random_ask', bot_policy=None, bot_move_delay=BOT_MOVE_DELAY,
+                 bot_batch_size=BOT_BATCH_SIZE, bot_batch_wait=BOT_BATCH_WAIT):
+        if turn_timeout_policy not in TURN_TIMEOUT_POLICIES:
+            raise ValueError(f"Unsupported turn timeout policy: {turn_timeout_policy}")
         self.rooms = {}  # room_id -> Room
+        self.shard = shard or ShardConfig()
+        self.event_log = event_log
+        self.history_store = history_store
+        self.game_archive = game_archive
+        if self.game_archive:
+            self.game_archive.start()
+        self.archiving = set()  # room IDs whose history is being written to cold storage
+        self.game_listeners = []  # Listeners attached to every room's game
+        self.timers = TimerWheel()  # Every turn clock and periodic job of this process
+        self.turn_timeout = turn_timeout  # Seconds per move; 0 disables turn clocks
+        self.turn_timeout_policy = turn_timeout_policy
+        self.turn_timers = {}  # room_id -> Timer of the running turn clock
+        self.timer_changes = []  # IDs of rooms changed by timers since the last run_timers
+        self.presence_timers = {}  # room_id -> {token: Timer removing the disconnected seat}
+        self.rng = random.Random()  # Picks moves for players who ran out of time and breaks bots' ties
+        self.bot_policy = bot_policy or BotPolicy(PolicyTables.default())
+        self.bot_move_delay = bot_move_delay
+        self.bot_knowledge = {}  # room_id -> Knowledge of the game its bots play
+        self.bot_batcher = DecisionBatcher(self.timers, self.decide_bot_moves, bot_batch_size, bot_batch_wait)
+        self.lobby_version = 0  # Bumped whenever the room list changes
+        self.lobby_epoch = uuid.uuid4().hex[:8]  # Keeps ETags from repeating across restarts
+        self.lobby_cache = {}  # (game_type, state) -> (lobby version, encoded room list)
+        metrics.describe('rooms', 'gauge', "Rooms served by this worker")
+        metrics.gauge_function('rooms', lambda: len(self.rooms))
+        metrics.describe('bot_batches_total', 'counter', "Batches of bot turns decided")
+        metrics.describe('bot_decisions_total', 'counter', "Bot turns decided")
+        metrics.describe('bot_decision_latency_seconds_total', 'counter',
+                         "Seconds from bot turns coming due to their moves being applied, summed")
+        metrics.describe('bot_batch_size', 'gauge', "Bot turns in the last batch")
+        metrics.describe('bot_batch_decide_seconds', 'gauge', "Seconds the last batch took to decide")
+        metrics.describe('bot_batch_latency_max_seconds', 'gauge', "Longest bot turn latency in the last batch")
+        metrics.gauge_function('bot_turns_pending', lambda: len(self.bot_batcher.pending))
+        if self.event_log:
+            self.restore_rooms()
+            self.event_log.start()
         self.create_public_rooms()
 
+    def restore_rooms(self):
+        """Rebuild rooms from the latest snapshot plus the logged actions after it."""
+        for snapshot, actions in self.event_log.load():
+            room = Room.from_snapshot(snapshot)
+            for action in actions:
+                try:
+                    room.replay_action(action)
+                except ValueError as e:
+                    # Skip only the action that failed, keeping the versions of the ones after it
+                    log.error("action_replay_failed", room_id=room.room_id, action_type=action.get("type"), error=str(e))
+                    room.version += 1
+            # Nobody is connected after a restart; give everyone the usual grace period
+            for token in room.connected_players:
+                if not is_bot_token(token):
+                    room.presence.mark_disconnected(token)
+            room.log = self.event_log
+            self.rooms[room.room_id] = room
+            self.update_turn_clock(room)
+            self.update_presence_timers(room)
+
+    def add_game_listener(self, listener):
+        """Subscribe a listener to the games of all current and future rooms."""
+        self.game_listeners.append(listener)
+        for room in self.rooms.values():
+            room.add_game_listener(listener)
+
     def create_public_rooms(self):
         """Create initial public rooms for the game."""
         for game_type in available_game_types:
             for _ in range(5):
-                self.create_room(game_type, room_id = "Public_" + game_type + "_game_" + str(_))
+                room_id = "Public_" + game_type + "_game_" + str(_)
+                if room_id in self.rooms or not self.shard.owns(room_id):
+                    continue
+                self.create_room(game_type, room_id = room_id)
 
     def register_action(self, action):
         """Register an action from a player and return the updated room state."""
@@ -37,25 +148,324 @@ class RoomManager:
         room = self.get_room(room_id)
         if not room:
             raise ValueError("Room does not exist")
-        room.register_action(action)
+        was_ended = room.game.state == ENDED
+        listed = (len(room.connected_players), room.game.state)
+        try:
+            room.register_action(action)
+        finally:
+            self.update_presence_timers(room)
+        if (len(room.connected_players), room.game.state) != listed:
+            self.lobby_version += 1
+        if action.get("type") in ("start_game", "in_game_action", "turn_timeout"):
+            self.update_turn_clock(room)
+        if room.game.state == ENDED and not was_ended:
+            self.finish_game(room)
+
+    def update_turn_clock(self, room):
+        """
+        Restart a room's turn clock after a move, or stop it once no game is running.
+
+        When it is a bot's turn, its move is scheduled instead.
+        """
+        timer = self.turn_timers.pop(room.room_id, None)
+        if timer is not None:
+            self.timers.cancel(timer)
+        room.turn_deadline = None
+        self.bot_batcher.discard(room.room_id)
+        if room.game.state != IN_PROGRESS or room.game.current_turn_player_id is None:
+            return
+        room_id = room.room_id
+        player = room.game.get_current_player()
+        if is_bot_token(player.token) and player.token in room.connected_players:
+            # After the delay the turn joins the next batch of bot decisions
+            self.turn_timers[room_id] = self.timers.schedule(self.bot_move_delay,
+                                                             lambda: self.bot_batcher.submit(room_id))
+            return
+        if not self.turn_timeout:
+            return
+        self.turn_timers[room_id] = self.timers.schedule(self.turn_timeout, lambda: self.turn_timed_out(room_id))
+        room.turn_deadline = time.monotonic() + self.turn_timeout
+
+    def turn_timed_out(self, room_id):
+        """Make the configured move for a player whose turn clock ran out."""
+        self.turn_timers.pop(room_id, None)
+        room = self.get_room(room_id)
+        if room is None or room.game.state != IN_PROGRESS:
+            return
+        if room.frozen:
+            # Mid-migration; give the player a fresh clock if the room stays here
+            self.update_turn_clock(room)
+            return
+        player = room.game.get_current_player()
+        move = room.game.choose_timeout_move(self.turn_timeout_policy, self.rng)
+        if move is None:
+            room.turn_deadline = None
+            return
+        try:
+            self.register_action({
+                "type": "turn_timeout",
+                "action_token": player.token,
+                "room_id": room_id,
+                "in_game_action": move,
+            })
+        except ValueError as e:
+            log.warning("turn_timeout_failed", room_id=room_id, player_id=player.id, error=str(e))
+            return
+        self.timer_changes.append(room_id)
+
+    def decide_bot_moves(self, batch):
+        """
+        Decide a batch of bot turns from any number of rooms in one policy call and apply the moves.
+
+        Args:
+            batch (dict): room_id -> monotonic time the bot's turn came due
+        """
+        started = time.monotonic()
+        turns, requests = [], []
+        for room_id in batch:
+            room = self.get_room(room_id)
+            if room is None or room.game.state != IN_PROGRESS:
+                continue
+            if room.frozen:
+                self.update_turn_clock(room)
+                continue
+            player = room.game.get_current_player()
+            if player is None or not is_bot_token(player.token) or player.token not in room.connected_players:
+                continue
+            knowledge = self.bot_knowledge.get(room_id)
+            if knowledge is None or knowledge.history is not room.game.history:
+                knowledge = self.bot_knowledge[room_id] = Knowledge(room.game.history)
+            turns.append((room_id, player.token))
+            requests.append((room.game, player.id, knowledge))
+        if not requests:
+            return
+        moves = self.bot_policy.decide_batch(requests, self.rng)
+        decided = time.monotonic()
+        for (room_id, token), move in zip(turns, moves):
+            if move is not None:
+                try:
+                    self.register_action({
+                        "type": "in_game_action",
+                        "action_token": token,
+                        "room_id": room_id,
+                        "in_game_action": move,
+                    })
+                except ValueError as e:
+                    log.warning("bot_move_failed", room_id=room_id, action_type=move["type"], error=str(e))
+                else:
+                    self.timer_changes.append(room_id)
+                    continue
+            self._bot_fallback_move(room_id, token)
+        finished = time.monotonic()
+        metrics.inc('bot_batches_total')
+        metrics.inc('bot_decisions_total', len(turns))
+        metrics.inc('bot_decision_latency_seconds_total', sum(finished - batch[room_id] for room_id, _ in turns))
+        metrics.set('bot_batch_size', len(turns))
+        metrics.set('bot_batch_decide_seconds', round(decided - started, 6))
+        metrics.set('bot_batch_latency_max_seconds', round(finished - min(batch[room_id] for room_id, _ in turns), 6))
+
+    def _bot_fallback_move(self, room_id, token):
+        # The policy had no move or made an illegal one: play as if the bot's clock ran out,
+        # and failing that try the turn again later so the game never stalls on it
+        room = self.get_room(room_id)
+        move = room.game.choose_timeout_move('random_ask', self.rng)
+        if move is not None:
+            try:
+                self.register_action({
+                    "type": "turn_timeout",
+                    "action_token": token,
+                    "room_id": room_id,
+                    "in_game_action": move,
+                })
+            except ValueError as e:
+                log.warning("bot_fallback_failed", room_id=room_id, action_type=move["type"], error=str(e))
+            else:
+                self.timer_changes.append(room_id)
+                return
+        self.update_turn_clock(room)
+
+    def update_presence_timers(self, room):
+        """
+        Start or stop the timers removing a room's disconnected seats.
+
+        Each disconnected seat has one timer on the wheel, due when its grace
+        period runs out and cancelled when the player resumes or leaves, so
+        no timer ever scans the rooms.
+        """
+        changed = room.presence.take_changes()
+        if not changed:
+            return
+        timers = self.presence_timers.setdefault(room.room_id, {})
+        for token in changed:
+            timer = timers.pop(token, None)
+            if timer is not None:
+                self.timers.cancel(timer)
+            if room.presence.is_disconnected(token):
+                timers[token] = self._schedule_seat_expiry(room.room_id, token, room.presence.remaining(token))
+        if not timers:
+            del self.presence_timers[room.room_id]
+
+    def _schedule_seat_expiry(self, room_id, token, delay):
+        return self.timers.schedule(delay, lambda: self.expire_seat(room_id, token))
+
+    def expire_seat(self, room_id, token):
+        """Remove a player whose disconnect grace period has run out."""
+        timers = self.presence_timers.get(room_id)
+        if timers is not None:
+            timers.pop(token, None)
+        room = self.get_room(room_id)
+        if room is None or not room.presence.is_disconnected(token):
+            return
+        try:
+            room.register_action({"type": "exit_room", "action_token": token})
+        except ValueError:
+            # A frozen room, say; the seat stays disconnected and is retried
+            self.presence_timers.setdefault(room_id, {})[token] = self._schedule_seat_expiry(
+                room_id, token, PRESENCE_RETRY_SECONDS)
+            return
+        self.update_presence_timers(room)
+        self.lobby_version += 1
+        self.timer_changes.append(room_id)
+
+    def run_timers(self, now=None):
+        """
+        Advance the timer wheel and run every due timer.
+
+        Returns:
+            list: IDs of rooms whose state changed
+        """
+        self.timers.advance(now)
+        changed, self.timer_changes = self.timer_changes, []
+        return list(dict.fromkeys(changed))
+
+    def finish_game(self, room):
+        """Hand a game that just ended to the analytics archive and cold storage."""
+        self.bot_knowledge.pop(room.room_id, None)
+        if self.game_archive:
+            self.game_archive.append_game(room.game)
+        self.archive_history(room)
+
+    def archive_history(self, room):
+        """Move a finished game's history to cold storage without blocking the caller."""
+        if not self.history_store or room.room_id in self.archiving:
+            return
+        self.archiving.add(room.room_id)
+        threading.Thread(target=self._archive_history, args=(room,), daemon=True).start()
+
+    def _archive_history(self, room):
+        try:
+            self.history_store.save(room.room_id, room.game.history)
+            room.game.history = None
+        except (OSError, ValueError) as e:
+            log.error("history_archive_failed", room_id=room.room_id, error=str(e))
+        finally:
+            self.archiving.discard(room.room_id)
+
+    def get_history(self, room_id):
+        """
+        Get the move history of a room's game, from memory or cold storage.
+
+        Returns:
+            GameHistory: The history, or None if the game has not started
+        """
+        room = self.get_room(room_id)
+        history = room.game.history if room else None
+        if history is None and self.history_store:
+            history = self.history_store.load(room_id)
+        return history
+
+    def is_game_finished(self, room_id):
+        """Check if a room's game has ended. Rooms no longer in memory count as finished."""
+        room = self.get_room(room_id)
+        return room is None or room.game.state == ENDED
     
-    def create_room(self, game_type, room_id=None):
-        """Create a new room with the given host."""
-         
-        room = Room(game_type, room_id)
+    def adopt_room(self, room):
+        """
+        Start serving a room that was moved here from another node.
+
+        Every seat is held in the disconnect grace period so its player can resume.
+        """
+        if room.room_id in self.rooms:
+            raise ValueError("Room already exists on this node")
+        for token in room.connected_players:
+            if not is_bot_token(token):
+                room.presence.mark_disconnected(token)
+        for listener in self.game_listeners:
+            room.add_game_listener(listener)
+        self.rooms[room.room_id] = room
+        self.lobby_version += 1
+        self.update_turn_clock(room)
+        self.update_presence_timers(room)
+        if self.event_log:
+            room.log = self.event_log
+            self.event_log.snapshot(room.room_id, room.version, room.snapshot())
+
+    def release_room(self, room_id):
+        """Stop serving a room that now lives on another node."""
+        self.rooms.pop(room_id, None)
+        self.bot_knowledge.pop(room_id, None)
+        self.bot_batcher.discard(room_id)
+        for timer in self.presence_timers.pop(room_id, {}).values():
+            self.timers.cancel(timer)
+        self.lobby_version += 1
+        timer = self.turn_timers.pop(room_id, None)
+        if timer is not None:
+            self.timers.cancel(timer)
+        if self.event_log:
+            self.event_log.forget(room_id)
+
+    def create_room(self, game_type, room_id=None, seed=None):
+        """Create a new room, optionally with a fixed seed for its games."""
+        if room_id is None:
+            room_id = self.shard.generate_room_id(Room._generate_room_id)
+        room = Room(game_type, room_id, seed)
+        for listener in self.game_listeners:
+            room.add_game_listener(listener)
         self.rooms[room.room_id] = room
+        self.lobby_version += 1
+        self.update_turn_clock(room)
+        if self.event_log:
+            room.log = self.event_log
+            self.event_log.snapshot(room.room_id, room.version, room.snapshot())
         return room
     
     def get_room(self, room_id):
         """Get a room by ID."""
         return self.rooms.get(room_id)
             
-    def list_available_rooms(self):
-        """List all rooms that haven't started games yet."""
+    def list_available_rooms(self, game_type=None, state=None):
+        """List rooms, optionally only those of one game type or game state."""
         res = []
         for room in self.rooms.values():
+            if (game_type and room.game_type != game_type) or (state and room.game.state != state):
+                continue
             res.append({
                 "room_id": room.room_id,
                 "game_type": room.game_type,
+                "state": room.game.state,
+                "players": len(room.connected_players),
             })
-        return res
\ No newline at end of file
+        return res
+
+    def lobby_etag(self):
+        """ETag of the current room list, the same for every filter."""
+        return f'"{self.lobby_epoch}-{self.lobby_version}"'
+
+    def lobby_body(self, game_type=None, state=None):
+        """
+        Get the encoded room list response, built at most once per lobby version and filter.
+
+        Raises:
+            ValueError: If a filter value is unknown, so the cache stays bounded
+        """
+        if game_type is not None and game_type not in available_game_types:
+            raise ValueError(f"Unsupported game type: {game_type}")
+        if state is not None and state not in LOBBY_STATES:
+            raise ValueError(f"Unknown game state: {state}")
+        version = self.lobby_version
+        cached = self.lobby_cache.get((game_type, state))
+        if cached and cached[0] == version:
+            return cached[1]
+        body = json.dumps({'rooms': self.list_available_rooms(game_type, state)}).encode()
+        self.lobby_cache[(game_type, state)] = (version, body)
+        return body
\ No newline at end of file
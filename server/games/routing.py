@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     path("ws/room/<str:room_id>/<str:user_token>/<str:username>/", consumers.RoomConsumer.as_asgi()),
+    path("ws/spectate/<str:room_id>/", consumers.SpectatorConsumer.as_asgi()),
 ]
@@ -0,0 +1,198 @@
+"""
+Front router for a sharded single-host deployment.
+
+Reads just the request head of every incoming connection, picks the worker
+that owns the room in the path and then splices bytes between the client and
+that worker. Requests that are not tied to a room go to workers round-robin,
+and the room list is gathered from every worker and merged.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import re
+from urllib.parse import unquote, urlsplit
+from .sharding import shard_for_room
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Paths whose first segment after the prefix is a room ID
+ROOM_PATH = re.compile(r'^/(?:ws/room|ws/spectate|api/games/history)/([^/]+)')
+LIST_ROOMS_PATH = '/api/games/list-rooms'
+MAX_HEAD_BYTES = 64 * 1024
+COPY_CHUNK_BYTES = 64 * 1024
+# Distinct room list URLs whose merged responses are cached
+MAX_CACHED_LISTS = 64
+# Seconds between attempts to reach a worker that is still starting, and the longest it may take
+WARM_UP_RETRY_SECONDS, WARM_UP_TIMEOUT_SECONDS = 0.5, 120
+
+
+# Headers set by the router; copies sent by clients are dropped so they cannot claim another address
+FORWARDED_HEADERS = (b'x-forwarded-for:', b'x-forwarded-port:')
+
+
+def _rewrite_head(head, drop, extra):
+    """Rewrite an HTTP request head without the headers starting with drop, plus the extra lines."""
+    lines = [line for line in head[:-4].split(b'\r\n') if not line.lower().startswith(drop)]
+    return b'\r\n'.join(lines + extra) + b'\r\n\r\n'
+
+
+def _forwarded_head(head, peer, close):
+    """
+    Rewrite a request head for a worker.
+
+    Args:
+        head (bytes): Request head read from the client
+        peer (tuple): Client's (address, port), passed on for the workers' --proxy-headers
+        close (bool): Make the worker close the connection after replying
+
+    Returns:
+        bytes: The head to send to the worker
+    """
+    drop = FORWARDED_HEADERS + ((b'connection:',) if close else ())
+    extra = [b'X-Forwarded-For: ' + str(peer[0]).encode('latin-1'),
+             b'X-Forwarded-Port: ' + str(peer[1]).encode('latin-1')] if peer else []
+    return _rewrite_head(head, drop, extra + ([b'Connection: close'] if close else []))
+
+
+async def _pipe(reader, writer):
+    try:
+        while data := await reader.read(COPY_CHUNK_BYTES):
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+class ShardRouter:
+    """Routes HTTP and websocket connections to the worker owning each room."""
+
+    def __init__(self, backends):
+        """
+        Initialize the router.
+
+        Args:
+            backends (list): (host, port) of each worker, indexed by shard
+        """
+        self.backends = backends
+        self.round_robin = itertools.cycle(backends)
+        # Room list target -> {'shards': [(etag, rooms) per backend], 'etag': ..., 'body': ...}
+        self.room_lists = {}
+
+    def backend_for(self, path):
+        """Pick the worker for a request path."""
+        match = ROOM_PATH.match(path)
+        if match:
+            return self.backends[shard_for_room(unquote(match.group(1)), len(self.backends))]
+        return next(self.round_robin)
+
+    async def serve(self, host, port):
+        """Accept connections until cancelled."""
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEAD_BYTES)
+        warm_up = asyncio.ensure_future(self.warm_up())  # Held so the task is not collected while it runs
+        async with server:
+            await server.serve_forever()
+
+    async def warm_up(self):
+        """
+        Poll every worker's room list until it answers.
+
+        Daphne sends no lifespan events, so this first request is what makes
+        a restarted worker restore its rooms and start their timers before
+        any client arrives.
+        """
+        async def poll(host, port):
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + WARM_UP_TIMEOUT_SECONDS
+            while True:
+                try:
+                    await self._fetch_json(host, port, LIST_ROOMS_PATH)
+                    return
+                except (OSError, ValueError) as e:
+                    if loop.time() >= deadline:
+                        log.error("shard_warm_up_failed", host=host, port=port, error=str(e))
+                        return
+                await asyncio.sleep(WARM_UP_RETRY_SECONDS)
+        await asyncio.gather(*(poll(host, port) for host, port in self.backends))
+
+    async def handle(self, reader, writer):
+        """Route a single client connection."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            method, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+        path = urlsplit(target).path
+        if method == 'GET' and path.rstrip('/') == LIST_ROOMS_PATH:
+            await self.list_rooms(target, head, writer)
+            return
+        # One request per connection unless upgraded, so the next one is routed again
+        head = _forwarded_head(head, writer.get_extra_info('peername'), b'upgrade: websocket' not in head.lower())
+        host, port = self.backend_for(path)
+        try:
+            backend_reader, backend_writer = await asyncio.open_connection(host, port)
+        except OSError:
+            writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            writer.close()
+            return
+        backend_writer.write(head)
+        await asyncio.gather(_pipe(reader, backend_writer), _pipe(backend_reader, writer))
+
+    async def list_rooms(self, target, head, writer):
+        """
+        Answer a room list request with the merged lists of every worker.
+
+        Each worker is revalidated with the ETag of its last list, and the
+        merged body is rebuilt only when some worker's list changed. The merged
+        ETag combines the workers' ETags, so an idle client gets a 304.
+        """
+        cached = self.room_lists.get(target)
+        shards = cached['shards'] if cached else [(None, [])] * len(self.backends)
+        results = await asyncio.gather(
+            *(self._fetch_json(host, port, target, etag) for (host, port), (etag, _) in zip(self.backends, shards)),
+            return_exceptions=True)
+        fresh = []
+        for shard, result in zip(shards, results):
+            if isinstance(result, Exception):
+                log.warning("shard_listing_failed", error=str(result))
+                fresh.append((None, []))
+            else:
+                fresh.append(shard if result is None else result)
+        if cached is None or fresh != shards:
+            etag = '"' + hashlib.blake2b(repr([etag for etag, _ in fresh]).encode(), digest_size=8).hexdigest() + '"'
+            body = json.dumps({'rooms': [room for _, rooms in fresh for room in rooms]}).encode()
+            if len(self.room_lists) >= MAX_CACHED_LISTS:
+                self.room_lists.clear()
+            cached = self.room_lists[target] = {'shards': fresh, 'etag': etag, 'body': body}
+        if_none_match = re.search(rb'(?im)^if-none-match:(.*)$', head)
+        common = (b'Access-Control-Allow-Origin: *\r\nCache-Control: no-cache\r\nETag: '
+                  + cached['etag'].encode() + b'\r\nConnection: close\r\n')
+        if if_none_match and cached['etag'].encode() in if_none_match.group(1):
+            writer.write(b'HTTP/1.1 304 Not Modified\r\n' + common + b'\r\n')
+        else:
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n' + common +
+                b'Content-Length: ' + str(len(cached['body'])).encode() + b'\r\n\r\n' + cached['body'])
+        await writer.drain()
+        writer.close()
+
+    async def _fetch_json(self, host, port, target, etag=None):
+        """Fetch a worker's room list; returns (etag, rooms), or None if unchanged since etag."""
+        reader, writer = await asyncio.open_connection(host, port)
+        conditional = f'If-None-Match: {etag}\r\n' if etag else ''
+        writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}:{port}\r\n{conditional}Connection: close\r\n\r\n'.encode())
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        status_line = head.split(b'\r\n', 1)[0].decode('latin-1')
+        if ' 304 ' in status_line:
+            return None
+        if ' 200 ' not in status_line:
+            raise ValueError(f"Shard {host}:{port} answered {status_line}")
+        match = re.search(rb'(?im)^etag:\s*(.*?)\s*$', head)
+        return (match.group(1).decode('latin-1') if match else None, json.loads(body).get('rooms', []))
@@ -0,0 +1,59 @@
+"""
+Room sharding across worker processes on one host.
+
+Each worker owns the rooms whose ID hashes to its shard index. The front
+router sends every room connection to the owning worker, so a room's state
+and channel group only ever live in one process.
+"""
+
+import zlib
+
+
+def shard_for_room(room_id, shard_count):
+    """
+    Get the index of the shard owning a room.
+
+    Args:
+        room_id (str): Room identifier
+        shard_count (int): Number of shards
+
+    Returns:
+        int: Shard index from 0 to shard_count - 1
+    """
+    return zlib.crc32(room_id.encode()) % shard_count
+
+
+class ShardConfig:
+    """Identity of the current worker within a sharded deployment."""
+
+    def __init__(self, shard_index=0, shard_count=1):
+        """
+        Initialize the configuration.
+
+        Args:
+            shard_index (int): Index of this worker
+            shard_count (int): Total number of workers
+        """
+        if not 0 <= shard_index < shard_count:
+            raise ValueError("Shard index must be between 0 and the shard count")
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+
+    def owns(self, room_id):
+        """Check if this worker owns a room."""
+        return self.shard_count == 1 or shard_for_room(room_id, self.shard_count) == self.shard_index
+
+    def generate_room_id(self, generate):
+        """
+        Generate a room ID that this worker owns.
+
+        Args:
+            generate: Callable returning a random room ID
+
+        Returns:
+            str: A room ID hashing to this shard
+        """
+        while True:
+            room_id = generate()
+            if self.owns(room_id):
+                return room_id
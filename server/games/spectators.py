@@ -0,0 +1,135 @@
+"""
+Spectator fan-out for Literature rooms.
+
+Spectators do not go through the room's channel group. Each watched room has
+one broadcaster task that serializes the public state once per version and
+writes the same text to every spectator, at most once per spectator interval.
+Players only set a flag to wake the broadcaster, so the cost of a crowd is
+paid off their path.
+"""
+
+import asyncio
+import time
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Shortest time between two updates sent to one spectator
+SPECTATOR_MIN_INTERVAL = 0.2
+# Longest update interval a spectator may ask for
+SPECTATOR_MAX_INTERVAL = 30.0
+# Sends between yields to the event loop during a fan-out
+SPECTATOR_SEND_BATCH = 100
+
+
+class RoomBroadcaster:
+    """Sends one room's public state to its spectators."""
+
+    def __init__(self, room_id, get_room):
+        """
+        Initialize the broadcaster.
+
+        Args:
+            room_id: ID of the watched room
+            get_room: Callable returning the room for an ID, or None
+        """
+        self.room_id = room_id
+        self.get_room = get_room
+        self.spectators = {}  # consumer -> {'interval', 'next_send', 'version'}
+        self.wake = asyncio.Event()
+        self.task = None
+
+    def add(self, consumer, interval):
+        self.spectators[consumer] = {'interval': interval, 'next_send': 0.0, 'version': None}
+        self.wake.set()
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+
+    def remove(self, consumer):
+        self.spectators.pop(consumer, None)
+        self.wake.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self.spectators:
+            await self.wake.wait()
+            self.wake.clear()
+            room = self.get_room(self.room_id)
+            if room is None:
+                for consumer in list(self.spectators):
+                    try:
+                        await consumer.room_gone()
+                    except Exception as e:
+                        log.warning("spectator_send_failed", room_id=self.room_id, error=str(e))
+                self.spectators.clear()
+                break
+            version, payload = room.public_payload()
+            now = time.monotonic()
+            next_due = None
+            for count, (consumer, state) in enumerate(list(self.spectators.items()), 1):
+                if state['version'] == version:
+                    continue
+                if now >= state['next_send']:
+                    state['version'] = version
+                    state['next_send'] = now + state['interval']
+                    try:
+                        await consumer.send(text_data=payload)
+                    except Exception as e:
+                        # One broken socket must not stop the updates of every other spectator
+                        self.remove(consumer)
+                        log.warning("spectator_send_failed", room_id=self.room_id, error=str(e))
+                else:
+                    next_due = state['next_send'] if next_due is None else min(next_due, state['next_send'])
+                if count % SPECTATOR_SEND_BATCH == 0:
+                    await asyncio.sleep(0)
+            if next_due is not None:
+                loop.call_later(next_due - now, self.wake.set)
+
+
+class SpectatorHub:
+    """Broadcasters of every watched room in this process."""
+
+    def __init__(self, get_room):
+        """
+        Initialize the hub.
+
+        Args:
+            get_room: Callable returning the room for an ID, or None
+        """
+        self.get_room = get_room
+        self.broadcasters = {}  # room_id -> RoomBroadcaster
+
+    def add(self, room_id, consumer, interval=SPECTATOR_MIN_INTERVAL):
+        """
+        Start sending a room's public state to a spectator.
+
+        Args:
+            room_id: ID of the watched room
+            consumer: Websocket consumer with async send() and room_gone()
+            interval (float): Requested seconds between updates
+        """
+        interval = min(max(interval, SPECTATOR_MIN_INTERVAL), SPECTATOR_MAX_INTERVAL)
+        broadcaster = self.broadcasters.get(room_id)
+        if broadcaster is None:
+            broadcaster = self.broadcasters[room_id] = RoomBroadcaster(room_id, self.get_room)
+        broadcaster.add(consumer, interval)
+
+    def remove(self, room_id, consumer):
+        """Stop sending updates to a spectator."""
+        broadcaster = self.broadcasters.get(room_id)
+        if broadcaster is None:
+            return
+        broadcaster.remove(consumer)
+        if not broadcaster.spectators:
+            del self.broadcasters[room_id]
+
+    def notify(self, room_id):
+        """Signal that a room changed. Cheap enough to call on every action."""
+        broadcaster = self.broadcasters.get(room_id)
+        if broadcaster is not None:
+            broadcaster.wake.set()
+
+    def count(self, room_id):
+        """Number of spectators watching a room."""
+        broadcaster = self.broadcasters.get(room_id)
+        return len(broadcaster.spectators) if broadcaster else 0
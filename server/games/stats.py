@@ -0,0 +1,303 @@
+"""
+Per-player statistics maintained from game events.
+
+The service listens to every game, adds each ask, claim and result to
+in-memory deltas, and flushes them to the database in batches from a
+background thread. Profile reads add the pending deltas to cached totals,
+so they never scan history and only touch the database on a cache miss.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from .archive import player_key
+from .bots import is_bot_token
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Counters kept per player, in the order of every stats list
+STAT_FIELDS = ('games_played', 'games_won', 'asks', 'asks_successful', 'claims_correct', 'claims_incorrect')
+GAMES_PLAYED, GAMES_WON, ASKS, ASKS_SUCCESSFUL, CLAIMS_CORRECT, CLAIMS_INCORRECT = range(len(STAT_FIELDS))
+# Seconds between flushes, and pending players that trigger an early flush
+STATS_FLUSH_INTERVAL = 5.0
+STATS_FLUSH_BATCH = 500
+# Profiles whose flushed totals are cached, and seconds before a cached total is
+# reloaded to pick up what other workers flushed
+STATS_CACHE_SIZE = 10000
+STATS_CACHE_TTL = 30.0
+
+
+def format_player_key(token):
+    """Key of a player's stats: their archive key as 16 hex digits."""
+    return f"{player_key(token):016x}"
+
+
+def profile_dict(key, totals):
+    """Serialize a player's totals with the derived rates."""
+    asks, claims = totals[ASKS], totals[CLAIMS_CORRECT] + totals[CLAIMS_INCORRECT]
+    return {
+        'player': key,
+        'gamesPlayed': totals[GAMES_PLAYED],
+        'gamesWon': totals[GAMES_WON],
+        'winRate': totals[GAMES_WON] / totals[GAMES_PLAYED] if totals[GAMES_PLAYED] else None,
+        'asks': asks,
+        'askSuccessRate': totals[ASKS_SUCCESSFUL] / asks if asks else None,
+        'claimsCorrect': totals[CLAIMS_CORRECT],
+        'claimsIncorrect': totals[CLAIMS_INCORRECT],
+        'claimAccuracy': totals[CLAIMS_CORRECT] / claims if claims else None,
+    }
+
+
+class DjangoStatsStore:
+    """Stores totals in the PlayerStats table, adding deltas atomically."""
+
+    def load(self, key):
+        """
+        Get a player's flushed totals.
+
+        Returns:
+            list: Totals in STAT_FIELDS order, all zero for an unknown player
+        """
+        from .models import PlayerStats
+        row = PlayerStats.objects.filter(player_key=key).values_list(*STAT_FIELDS).first()
+        return list(row) if row else [0] * len(STAT_FIELDS)
+
+    def add(self, deltas):
+        """
+        Add deltas to players' totals in one transaction.
+
+        Increments happen in the database, so workers flushing the same
+        player concurrently do not overwrite each other.
+
+        Args:
+            deltas (dict): Player key -> list of increments in STAT_FIELDS order
+        """
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+        from .models import PlayerStats
+
+        def increments(values):
+            return {field: F(field) + value for field, value in zip(STAT_FIELDS, values) if value}
+
+        with transaction.atomic():
+            for key, values in deltas.items():
+                if PlayerStats.objects.filter(player_key=key).update(**increments(values)):
+                    continue
+                try:
+                    with transaction.atomic():
+                        PlayerStats.objects.create(player_key=key, **dict(zip(STAT_FIELDS, values)))
+                except IntegrityError:
+                    # Another worker created the row first
+                    PlayerStats.objects.filter(player_key=key).update(**increments(values))
+
+    def replace(self, totals):
+        """
+        Replace every player's totals, as when backfilling from the archive.
+
+        Args:
+            totals (dict): Player key -> totals in STAT_FIELDS order
+        """
+        from django.db import transaction
+        from .models import PlayerStats
+        with transaction.atomic():
+            PlayerStats.objects.all().delete()
+            PlayerStats.objects.bulk_create(
+                [PlayerStats(player_key=key, **dict(zip(STAT_FIELDS, values))) for key, values in totals.items()],
+                batch_size=1000,
+            )
+
+
+class StatsService:
+    """Running per-player aggregates with batched writes and cached reads."""
+
+    def __init__(self, store, flush_interval=STATS_FLUSH_INTERVAL, flush_batch=STATS_FLUSH_BATCH,
+                 cache_size=STATS_CACHE_SIZE, cache_ttl=STATS_CACHE_TTL):
+        """
+        Initialize the service.
+
+        Args:
+            store: Persistence with load(key) and add(deltas), e.g. DjangoStatsStore
+            flush_interval (float): Seconds between flushes
+            flush_batch (int): Pending players that trigger an early flush
+            cache_size (int): Profiles whose flushed totals are cached
+            cache_ttl (float): Seconds a cached total is trusted
+        """
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.pending = {}  # key -> increments not yet flushed
+        self.flushing = {}  # key -> increments being written by the current flush
+        self.cache = OrderedDict()  # key -> (expiry, flushed totals)
+        self.lock = threading.Lock()  # Guards pending, flushing and cache
+        self.store_lock = threading.Lock()  # Keeps cache loads from interleaving with a flush
+        self.wake = threading.Event()
+        self.flusher = None
+
+    def start(self):
+        """Start the background flush thread."""
+        if self.flusher is None:
+            self.flusher = threading.Thread(target=self._run, name="stats-flusher", daemon=True)
+            self.flusher.start()
+
+    def _run(self):
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def _add(self, token, *increments):
+        """Add (field index, amount) increments to a player's pending deltas."""
+        if is_bot_token(token):
+            # Every bot seat has a fresh token; its statistics would never be read
+            return
+        key = format_player_key(token)
+        with self.lock:
+            deltas = self.pending.get(key)
+            if deltas is None:
+                deltas = self.pending[key] = [0] * len(STAT_FIELDS)
+            for index, amount in increments:
+                deltas[index] += amount
+            if len(self.pending) >= self.flush_batch:
+                self.wake.set()
+
+    def record_game_event(self, game, event, details):
+        """
+        Game listener updating the players' aggregates. Runs inside the game
+        action, so it only touches memory.
+
+        Args:
+            game (Game): Game that emitted the event
+            event (str): Event type
+            details (dict): Event details
+        """
+        if event == 'card_asked':
+            self._add(game.players[details['asking_player_id']].token,
+                      (ASKS, 1), (ASKS_SUCCESSFUL, int(details['success'])))
+        elif event == 'set_claimed':
+            self._add(game.players[details['player_id']].token,
+                      (CLAIMS_CORRECT if details['success'] else CLAIMS_INCORRECT, 1))
+        elif event == 'game_ended':
+            for player in game.players.values():
+                self._add(player.token, (GAMES_PLAYED, 1), (GAMES_WON, int(player.team == details['winning_team'])))
+
+    def flush(self):
+        """
+        Write the pending deltas to the store in one batch.
+
+        Returns:
+            int: Number of players written
+        """
+        with self.store_lock:
+            with self.lock:
+                if not self.pending:
+                    return 0
+                self.flushing, self.pending = self.pending, {}
+            try:
+                self.store.add(self.flushing)
+            except Exception as e:
+                log.error("stats_flush_failed", players=len(self.flushing), error=str(e))
+                with self.lock:
+                    # Keep the deltas for the next flush
+                    for key, deltas in self.flushing.items():
+                        pending = self.pending.setdefault(key, [0] * len(STAT_FIELDS))
+                        for index, amount in enumerate(deltas):
+                            pending[index] += amount
+                    self.flushing = {}
+                return 0
+            with self.lock:
+                for key, deltas in self.flushing.items():
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        for index, amount in enumerate(deltas):
+                            cached[1][index] += amount
+                written, self.flushing = len(self.flushing), {}
+            return written
+
+    def profile(self, key, now=None):
+        """
+        Get a player's statistics, including results not flushed yet.
+
+        Args:
+            key (str): Player key from format_player_key
+
+        Returns:
+            dict: Profile from profile_dict
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None and cached[0] > now:
+                self.cache.move_to_end(key)
+                return self._profile_locked(key, cached[1])
+        with self.store_lock:
+            totals = self.store.load(key)
+        with self.lock:
+            self.cache[key] = (now + self.cache_ttl, totals)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return self._profile_locked(key, totals)
+
+    def _profile_locked(self, key, flushed):
+        totals = list(flushed)
+        for deltas in (self.flushing.get(key), self.pending.get(key)):
+            if deltas:
+                for index, amount in enumerate(deltas):
+                    totals[index] += amount
+        return profile_dict(key, totals)
+
+
+def backfill_totals(games, moves):
+    """
+    Compute every player's totals from the columnar archive.
+
+    Args:
+        games (dict): Game columns from archive.open_columns
+        moves (dict): Move columns from archive.open_columns
+
+    Returns:
+        dict: Player key -> totals in STAT_FIELDS order
+    """
+    import numpy as np
+    from .archive import SEATS_PER_GAME, moves_by_game
+    from .engine.history import ASK, CLAIM
+
+    game_count = len(games['winner'])
+    if game_count == 0:
+        return {}
+    keys, player_index = np.unique(games['player_keys'], return_inverse=True)
+    player_index = player_index.reshape(games['player_keys'].shape)
+    game_of_move, moves = moves_by_game(games, moves)
+    seat_teams = np.where((games['team2_seats'][:, None] >> np.arange(SEATS_PER_GAME)) & 1, 2, 1)
+    totals = np.zeros((len(keys), len(STAT_FIELDS)), dtype=np.int64)
+    totals[:, GAMES_PLAYED] = np.bincount(player_index.ravel(), minlength=len(keys))
+    won = (seat_teams == games['winner'][:, None]).ravel()
+    totals[:, GAMES_WON] = np.bincount(player_index.ravel(), weights=won, minlength=len(keys))
+    for move_type, counted, succeeded, failed in ((ASK, ASKS, ASKS_SUCCESSFUL, None),
+                                                  (CLAIM, None, CLAIMS_CORRECT, CLAIMS_INCORRECT)):
+        selected = moves['move_type'] == move_type
+        actors = player_index[game_of_move[selected], moves['actor'][selected]]
+        outcome = moves['outcome'][selected].astype(bool)
+        if counted is not None:
+            totals[:, counted] = np.bincount(actors, minlength=len(keys))
+        totals[:, succeeded] = np.bincount(actors[outcome], minlength=len(keys))
+        if failed is not None:
+            totals[:, failed] = np.bincount(actors[~outcome], minlength=len(keys))
+    # Key 0 pads the seats of games with fewer than six players
+    return {f"{int(key):016x}": [int(value) for value in row] for key, row in zip(keys, totals) if key}
+
+
+stats_service = None
+
+
+def get_stats_service():
+    """Return the process-wide stats service, creating and starting it on first use."""
+    global stats_service
+    if stats_service is None:
+        from django.conf import settings
+        stats_service = StatsService(DjangoStatsStore(), getattr(settings, 'STATS_FLUSH_INTERVAL', STATS_FLUSH_INTERVAL))
+        stats_service.start()
+    return stats_service
@@ -1,3 +1,951 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import re
+import tempfile
+from array import array
+from pathlib import Path
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from games.acks import AckTracker, ack_frame, nack_frame
+from games.admission import AdmissionController, AdmissionRefused
+from games.archive import GAME_COLUMNS, MOVE_COLUMNS, SEATS_PER_GAME, GameArchive, open_columns
+from games import cluster
+from games.bots import BotPolicy, Knowledge, PolicyTables
+from games.cluster import ClusterNode
+from games.engine.game import IN_PROGRESS, Game
+from games.engine.history import GameHistory
+from games.event_log import EventLog
+from games.metrics import metrics
+from games.pubsub import LocalPubSub
+from games.rate_limit import RateLimiter
+from games.room import EVENT_BUFFER_SIZE, Room
+from games.room_manager import RoomManager
+from games.shard_router import ShardRouter
+from games.sharding import shard_for_room
+from games.spectators import RoomBroadcaster
+from games.stats import GAMES_PLAYED, STAT_FIELDS, StatsService, backfill_totals, format_player_key
+from games.timer_wheel import TimerWheel
+from games.views import GameHistoryStreamView, GameHistoryView, GameStateAtMoveView
+from games.validation import MAX_FRAME_LENGTH, decode_client_frame, validate_client_action
+from literature.push_notifications import FakeTransport, NotificationService
+from literature.ws_auth import AuthenticatedUser, TokenAuthenticator, TokenCache, token_from_scope
 
-# Create your tests here.
+
+def self_play_positions(seed, games=3):
+    """Yield (game, current player ID, Knowledge) at every turn of some bot self-play games."""
+    policy = BotPolicy(PolicyTables.default())
+    rng = random.Random(seed)
+    for _ in range(games):
+        game = Game('self-play', rng.getrandbits(64))
+        for seat in range(6):
+            game.add_player(f'bot{seat}', f'Bot {seat + 1}', f'bot-{seat}')
+        game.start_game()
+        knowledge = Knowledge(game.history)
+        while game.state == IN_PROGRESS and len(game.history) < 300:
+            player_id = game.current_turn_player_id
+            yield game, player_id, knowledge
+            move = policy.decide(game, player_id, knowledge, rng)
+            if move is None:
+                break
+            game.register_in_game_action(player_id, move)
+
+
+def finished_game(seed, tokens, listener=None):
+    """Play a game of six seats with the given tokens to its end, the bot policy moving for everyone."""
+    policy = BotPolicy(PolicyTables.default())
+    rng = random.Random(seed)
+    game = Game(f'game-{seed}', seed)
+    if listener:
+        game.add_listener(listener)
+    for seat, token in enumerate(tokens):
+        game.add_player(f'p{seat}', f'Player {seat + 1}', token)
+    game.start_game()
+    knowledge = Knowledge(game.history)
+    while game.state == IN_PROGRESS:
+        player_id = game.current_turn_player_id
+        game.register_in_game_action(player_id, policy.decide(game, player_id, knowledge, rng))
+    return game
+
+
+class EventLogReplayTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def logged_room(self):
+        log = EventLog(self.path)
+        log.start()
+        room = Room('literature', 'R1', seed=1)
+        room.log = log
+        log.snapshot(room.room_id, room.version, room.snapshot())
+        return log, room
+
+    def restore(self):
+        manager = RoomManager(event_log=EventLog(self.path))
+        self.addCleanup(manager.event_log.close)
+        return manager.get_room('R1')
+
+    def test_restores_room_from_snapshot_and_actions(self):
+        log, room = self.logged_room()
+        for i in range(6):
+            room.register_action({'type': 'add_player', 'action_token': f't{i}', 'player_name': f'p{i}'})
+        room.register_action({'type': 'change_host', 'action_token': 't0',
+                              'new_host_id': room.connected_players['t2'].id})
+        room.register_action({'type': 'start_game', 'action_token': 't2'})
+        log.close()
+        restored = self.restore()
+        self.assertEqual(restored.version, room.version)
+        self.assertEqual(restored.host_token, 't2')
+        self.assertEqual(restored.game.state_hash, room.game.state_hash)
+
+    def test_snapshot_keeps_disconnected_seats(self):
+        log, room = self.logged_room()
+        for i in range(6):
+            room.register_action({'type': 'add_player', 'action_token': f't{i}', 'player_name': f'p{i}'})
+        # t3 keeps dropping and coming back; the room snapshots at version 50 with t0 and t3 away
+        while room.version < 49:
+            action = 'add_player' if room.presence.is_disconnected('t3') else 'disconnect'
+            room.register_action({'type': action, 'action_token': 't3', 'player_name': 'p3'})
+        room.register_action({'type': 'disconnect', 'action_token': 't0'})
+        self.assertEqual(room.version, 50)
+        room.register_action({'type': 'add_player', 'action_token': 't0', 'player_name': 'p0'})
+        room.register_action({'type': 'change_host', 'action_token': 't0',
+                              'new_host_id': room.connected_players['t1'].id})
+        log.close()
+        restored = self.restore()
+        self.assertEqual(restored.version, room.version)
+        self.assertEqual(restored.host_token, 't1')
+        # Nobody is connected after a restart
+        self.assertTrue(all(restored.presence.is_disconnected(token) for token in restored.connected_players))
+
+
+def apply_room_events(state, resumed):
+    """Apply resume events to a held room state the way the web client's store does."""
+    state = json.loads(json.dumps(state))
+    game = state['game']
+    for event in resumed['events']:
+        for key in ('hostId', 'connectedPlayers', 'disconnectedPlayers'):
+            if key in event:
+                state[key] = event[key]
+        removed = event.get('removed', ())
+        game['players'] = [player for player in game['players'] if player['id'] not in removed]
+        game['players'] += [{'id': player_id, 'name': name, 'team': team, 'hand': [], 'card_count': 0}
+                            for player_id, name, team in event.get('joined', ())]
+        for player in game['players']:
+            player['team'] = event.get('teams', {}).get(player['id'], player['team'])
+            player['card_count'] = event.get('counts', {}).get(player['id'], player['card_count'])
+        for key in ('state', 'currentPlayerId', 'lastAsk', 'claimedSets', 'scores', 'winningTeam'):
+            if key in event:
+                game[key] = event[key]
+    for player in game['players']:
+        player['hand'] = resumed['hand'] if player['id'] == state['receiverId'] else []
+    game['legalMoves'] = resumed['legalMoves']
+    for key in ('version', 'stateHash', 'publicHash', 'turnTimeRemaining'):
+        state[key] = resumed[key]
+    return state
+
+
+class ResumeEventTests(SimpleTestCase):
+    def seated_room(self, players=6):
+        room = Room('literature', 'R1', seed=3)
+        for i in range(players):
+            room.register_action({'type': 'add_player', 'action_token': f't{i}', 'player_name': f'p{i}'})
+        return room
+
+    def play_turns(self, room, turns):
+        policy = BotPolicy(PolicyTables.default())
+        rng = random.Random(5)
+        tokens = {player.id: token for token, player in room.connected_players.items()}
+        for _ in range(turns):
+            game = room.game
+            if game.state != IN_PROGRESS:
+                break
+            player_id = game.current_turn_player_id
+            move = policy.decide(game, player_id, Knowledge(game.history), rng)
+            room.register_action({'type': 'in_game_action', 'action_token': tokens[player_id],
+                                  'in_game_action': move})
+
+    def assert_resumes(self, room, token, held):
+        resumed = json.loads(json.dumps(room.resume_state(token, held['version'])))
+        self.assertEqual(resumed['baseHash'], held['publicHash'])
+        self.assertEqual(apply_room_events(held, resumed), json.loads(json.dumps(room.to_dict(token))))
+
+    def test_events_rebuild_lobby_changes(self):
+        room = self.seated_room(players=3)
+        held = room.to_dict('t0')
+        room.register_action({'type': 'disconnect', 'action_token': 't0'})
+        for i in range(3, 6):
+            room.register_action({'type': 'add_player', 'action_token': f't{i}', 'player_name': f'p{i}'})
+        room.register_action({'type': 'remove_player', 'action_token': 't0', 'player_id': room.connected_players['t1'].id})
+        room.register_action({'type': 'change_host', 'action_token': 't0',
+                              'new_host_id': room.connected_players['t2'].id})
+        room.register_action({'type': 'add_player', 'action_token': 't0', 'player_name': 'p0'})
+        self.assert_resumes(room, 't0', held)
+
+    def test_events_rebuild_game_with_own_hand(self):
+        room = self.seated_room()
+        held = room.to_dict('t0')
+        room.register_action({'type': 'pre_game_action', 'action_token': 't0', 'pre_game_action': {
+            'type': 'change_team', 'player_id': room.connected_players['t0'].id, 'new_team': 2}})
+        room.register_action({'type': 'pre_game_action', 'action_token': 't0', 'pre_game_action': {
+            'type': 'change_team', 'player_id': room.connected_players['t1'].id, 'new_team': 1}})
+        room.register_action({'type': 'start_game', 'action_token': 't0'})
+        self.play_turns(room, 40)
+        resumed = room.resume_state('t0', held['version'])
+        self.assertEqual(resumed['hand'], room.game.get_player(room.connected_players['t0'].id).to_dict()['hand'])
+        self.assertNotIn('hand', json.dumps(resumed['events']))
+        self.assert_resumes(room, 't0', held)
+        self.play_turns(room, 220)
+        held = room.to_dict('t4')
+        # Claims, scores and the end of the game arrive as events too
+        self.play_turns(room, EVENT_BUFFER_SIZE)
+        self.assertNotEqual(room.game.state, IN_PROGRESS)
+        self.assert_resumes(room, 't4', held)
+
+    def test_version_outside_buffer_needs_snapshot(self):
+        room = self.seated_room()
+        self.assertIsNone(room.resume_state('t0', room.version + 1))
+        self.assertEqual(room.resume_state('t0', room.version)['events'], [])
+        room.events.popleft()
+        self.assertIsNone(room.resume_state('t0', 1))
+        self.assertEqual(len(room.resume_state('t0', 2)['events']), room.version - 2)
+
+
+class GameArchiveTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def archive_games(self, seeds):
+        archive = GameArchive(self.directory)
+        archive.start()
+        games = [finished_game(seed, [f't{seed}-{seat}' for seat in range(6)]) for seed in seeds]
+        for game in games:
+            archive.append_game(game)
+        archive.close()
+        return games
+
+    def column_rows(self, name):
+        code = {**GAME_COLUMNS, **MOVE_COLUMNS}[name]
+        return (self.directory / f"{name}.col").stat().st_size // array(code).itemsize
+
+    def append_rows(self, name, rows):
+        code = {**GAME_COLUMNS, **MOVE_COLUMNS}[name]
+        with open(self.directory / f"{name}.col", 'ab') as column:
+            column.write(bytes(rows * array(code).itemsize))
+
+    def test_columns_hold_every_game(self):
+        played = self.archive_games([1, 2])
+        games, moves = open_columns(self.directory)
+        self.assertEqual(list(games['move_count']), [len(game.history.moves) for game in played])
+        self.assertEqual(list(games['move_start']), [0, len(played[0].history.moves)])
+        self.assertEqual(list(games['winner']), [game.winning_team or 0 for game in played])
+        self.assertEqual(len(moves['move_type']), sum(len(game.history.moves) for game in played))
+
+    def test_repair_drops_interrupted_write(self):
+        played = self.archive_games([1, 2])
+        # A write cut short: some move rows and part of a game row
+        for name in ('move_type', 'actor'):
+            self.append_rows(name, 40)
+        self.append_rows('move_start', 1)
+        self.assertEqual(GameArchive(self.directory).repair(), 2)
+        move_rows = sum(len(game.history.moves) for game in played)
+        for name in MOVE_COLUMNS:
+            self.assertEqual(self.column_rows(name), move_rows)
+        for name in GAME_COLUMNS:
+            self.assertEqual(self.column_rows(name), 2 * (SEATS_PER_GAME if name == 'player_keys' else 1))
+        # The next game lines up with the kept ones
+        self.archive_games([3])
+        games, _ = open_columns(self.directory)
+        self.assertEqual(list(games['move_start'])[2], move_rows)
+
+    def test_repair_drops_game_with_missing_moves(self):
+        played = self.archive_games([1, 2])
+        with open(self.directory / 'outcome.col', 'r+b') as column:
+            column.truncate(len(played[0].history.moves) + 5)
+        self.assertEqual(GameArchive(self.directory).repair(), 1)
+        games, moves = open_columns(self.directory)
+        self.assertEqual(len(games['winner']), 1)
+        self.assertEqual(len(moves['outcome']), len(played[0].history.moves))
+
+
+class MemoryStatsStore:
+    """Stats store keeping totals in a dict."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def load(self, key):
+        return list(self.totals.get(key, [0] * len(STAT_FIELDS)))
+
+    def add(self, deltas):
+        for key, values in deltas.items():
+            self.totals[key] = [total + value for total, value in zip(self.load(key), values)]
+
+
+class StatsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_backfill_matches_live_totals(self):
+        service = StatsService(MemoryStatsStore())
+        archive = GameArchive(self.directory)
+        archive.start()
+        # Players meet again across games; seat 5 is always a bot
+        for seed in range(4):
+            tokens = [f'player{(seed + seat) % 7}' for seat in range(5)] + [f'bot-{seed}']
+            archive.append_game(finished_game(seed, tokens, service.record_game_event))
+        archive.close()
+        service.flush()
+        backfilled = backfill_totals(*open_columns(self.directory))
+        self.assertEqual(backfilled, service.store.totals)
+        self.assertEqual(len(backfilled), 7)
+        self.assertEqual(sum(totals[GAMES_PLAYED] for totals in backfilled.values()), 20)
+
+    def test_profile_adds_pending_to_flushed_totals(self):
+        service = StatsService(MemoryStatsStore())
+        finished_game(1, [f'player{seat}' for seat in range(6)], service.record_game_event)
+        key = format_player_key('player0')
+        played = service.profile(key)
+        service.flush()
+        self.assertEqual(service.profile(key), played)
+        self.assertEqual(played['gamesPlayed'], 1)
+        self.assertEqual(service.profile(format_player_key('nobody'))['gamesPlayed'], 0)
+
+
+class ZobristTests(SimpleTestCase):
+    def test_incremental_hashes_match_rehash(self):
+        for game, _, _ in self_play_positions(seed=7):
+            hashes = (game.state_hash, game.public_hash, list(game.hand_hashes))
+            game.rehash()
+            self.assertEqual((game.state_hash, game.public_hash, game.hand_hashes), hashes)
+
+
+class GameHistoryTests(SimpleTestCase):
+    def setUp(self):
+        previous = RoomManager._instance
+        RoomManager._instance = RoomManager()
+        self.addCleanup(setattr, RoomManager, '_instance', previous)
+        self.factory = RequestFactory()
+
+    def live_state(self, game):
+        return {
+            'hands': {player_id: sorted(player.hand) for player_id, player in game.players.items()},
+            'currentPlayerId': game.current_turn_player_id,
+            'claimedSets': dict(game.claimed_sets),
+            'scores': dict(game.scores),
+        }
+
+    def replayed_state(self, history, index):
+        state = history.state_at(index)
+        self.assertEqual(state.pop('moveIndex'), index)
+        state['hands'] = {player_id: sorted(hand) for player_id, hand in state['hands'].items()}
+        return state
+
+    def test_state_at_matches_every_position(self):
+        states = []
+        for game, _, _ in self_play_positions(seed=13, games=1):
+            states.append(self.live_state(game))
+        history = game.history
+        states.append(self.live_state(game))
+        self.assertEqual(len(states), len(history) + 1)
+        restored = GameHistory.from_dict(json.loads(json.dumps(history.to_dict())))
+        for index, state in enumerate(states):
+            self.assertEqual(self.replayed_state(history, index), state)
+            self.assertEqual(self.replayed_state(restored, index), state)
+        with self.assertRaises(ValueError):
+            history.state_at(len(history) + 1)
+
+    def room_with_game(self, game):
+        room = RoomManager.get_instance().create_room('literature', 'HIST')
+        room.game = game
+        return room
+
+    def get(self, view, path, room_id='HIST', **kwargs):
+        response = view.as_view()(self.factory.get(path), room_id=room_id, **kwargs)
+        if isinstance(response, StreamingHttpResponse):
+            return response.status_code, [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        return response.status_code, json.loads(response.content)
+
+    def test_history_pages_and_stream_cover_every_move(self):
+        game = finished_game(5, [f't{seat}' for seat in range(6)])
+        self.room_with_game(game)
+        moves, offset = [], 0
+        while offset is not None:
+            status, page = self.get(GameHistoryView, f'/api/games/history/HIST?offset={offset}&limit=50')
+            self.assertEqual((status, page['totalMoves']), (200, len(game.history)))
+            moves += page['moves']
+            offset = page['nextOffset']
+        self.assertEqual(moves, [game.history.describe_move(i) for i in range(len(game.history))])
+        status, chunks = self.get(GameHistoryStreamView, '/api/games/history/HIST/stream?offset=10')
+        self.assertEqual([move for chunk in chunks for move in chunk], moves[10:])
+        status, page = self.get(GameHistoryView, '/api/games/history/HIST?offset=x')
+        self.assertEqual(status, 400)
+
+    def test_state_view_only_serves_finished_games(self):
+        game = Game('HIST', 7)
+        for seat in range(6):
+            game.add_player(f'p{seat}', f'Player {seat + 1}', f't{seat}')
+        game.start_game()
+        self.room_with_game(game)
+        status, _ = self.get(GameStateAtMoveView, '/api/games/history/HIST/state/0', move_index=0)
+        self.assertEqual(status, 403)
+        game = finished_game(7, [f't{seat}' for seat in range(6)])
+        self.room_with_game(game)
+        status, state = self.get(GameStateAtMoveView, '/api/games/history/HIST/state/20', move_index=20)
+        self.assertEqual((status, state['moveIndex']), (200, 20))
+        status, _ = self.get(GameStateAtMoveView, '/api/games/history/HIST/state/9999', move_index=9999)
+        self.assertEqual(status, 400)
+        status, _ = self.get(GameHistoryView, '/api/games/history/NONE', room_id='NONE')
+        self.assertEqual(status, 404)
+
+
+class TimerWheelTests(SimpleTestCase):
+    def test_timers_fire_on_their_tick_across_cascades(self):
+        # 3 levels of 4 slots cover 64 ticks; most of these delays start in a higher level
+        wheel = TimerWheel(tick=1, slots=4, levels=3, now=0)
+        fired = {}
+        for delay in range(1, 64):
+            wheel.schedule(delay, lambda delay=delay: fired.setdefault(delay, wheel.current))
+        for now in range(1, 64):
+            wheel.advance(now)
+            self.assertEqual(fired.get(now), now)
+        self.assertEqual(len(fired), 63)
+
+    def test_cancelled_timer_never_fires(self):
+        wheel = TimerWheel(tick=1, slots=4, levels=3, now=0)
+        fired = []
+        timer = wheel.schedule(20, lambda: fired.append('cancelled'))
+        wheel.schedule(20, lambda: fired.append('kept'))
+        wheel.advance(10)
+        self.assertEqual(wheel.remaining(timer, now=10), 10)
+        wheel.cancel(timer)
+        self.assertIsNone(wheel.remaining(timer, now=10))
+        self.assertEqual(wheel.advance(30), 1)
+        self.assertEqual(fired, ['kept'])
+
+    def test_callbacks_may_schedule_timers(self):
+        wheel = TimerWheel(tick=1, slots=4, levels=3, now=0)
+        fired = []
+        wheel.schedule(3, lambda: wheel.schedule(5, lambda: fired.append(wheel.current)))
+        wheel.advance(3)
+        wheel.advance(8)
+        self.assertEqual(fired, [8])
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_bucket_refills_at_rate(self):
+        limiter = RateLimiter(rate=2, burst=3)
+        self.assertEqual([limiter.allow('a', now=0) for _ in range(4)], [True, True, True, False])
+        self.assertFalse(limiter.allow('a', now=0.25))
+        self.assertTrue(limiter.allow('a', now=0.75))
+        self.assertTrue(limiter.allow('b', now=0.75))
+
+    def test_prunes_refilled_buckets_when_full(self):
+        limiter = RateLimiter(rate=1, burst=2, max_keys=3)
+        limiter.allow('idle', now=0)
+        limiter.allow('busy', now=9)
+        limiter.allow('new', now=9)
+        # A fourth key prunes 'idle', refilled by now, and keeps the others' spent tokens
+        limiter.allow('late', now=10)
+        self.assertEqual(set(limiter.buckets), {'busy', 'new', 'late'})
+        self.assertEqual(limiter.buckets['busy'], [1, 9])
+
+    def test_prune_drops_older_half_of_active_keys(self):
+        limiter = RateLimiter(rate=1, burst=100, max_keys=4)
+        for i, key in enumerate('abcd'):
+            limiter.allow(key, now=i)
+        limiter.allow('e', now=4)
+        self.assertEqual(list(limiter.buckets), ['c', 'd', 'e'])
+
+
+class BotBatchTests(SimpleTestCase):
+    def move_value(self, policy, game, player_id, knowledge, move):
+        """Table value of a move, by the features the scalar policy computes."""
+        asks, claims = policy.features(game, game.players[player_id], knowledge)
+        if move['type'] == 'claim_set':
+            return 'claim', max(policy.tables.claim[index] for index, number in claims if number == move['set_number'])
+        if move['type'] == 'ask_card':
+            return 'ask', max(policy.tables.ask[index] for index, target, card in asks
+                              if (target, card) == (move['asked_player_id'], move['card']))
+        return move['type'], None
+
+    def test_batched_moves_are_as_good_as_scalar_moves(self):
+        policy = BotPolicy(PolicyTables.default())
+        positions = 0
+        for game, player_id, knowledge in self_play_positions(seed=11):
+            scalar = policy.decide(game, player_id, knowledge, random.Random(1))
+            batched, = policy.decide_batch([(game, player_id, knowledge)], random.Random(1))
+            self.assertEqual(batched is None, scalar is None)
+            if scalar is not None:
+                self.assertEqual(self.move_value(policy, game, player_id, knowledge, batched),
+                                 self.move_value(policy, game, player_id, knowledge, scalar))
+            positions += 1
+        self.assertGreater(positions, 50)
+
+    def test_batch_answers_each_request_in_order(self):
+        policy = BotPolicy(PolicyTables.default())
+        requests = [position for _, position in zip(range(12), self_play_positions(seed=5, games=1))][-1:]
+        requests += [position for _, position in zip(range(4), self_play_positions(seed=6, games=1))][-1:]
+        moves = policy.decide_batch(requests, random.Random(2))
+        self.assertEqual(len(moves), len(requests))
+        for move, request in zip(moves, requests):
+            alone, = policy.decide_batch([request], random.Random(2))
+            self.assertEqual(move['type'], alone['type'])
+
+
+class AckTrackerTests(SimpleTestCase):
+    def test_retransmitted_action_gets_its_original_answer(self):
+        acks = AckTracker()
+        key = ('R1', 't0')
+        self.assertIsNone(acks.replay(key, 1))
+        acks.record(key, 1, ack_frame(1, version=3))
+        acks.record(key, 2, nack_frame(2, "Not your turn"))
+        self.assertEqual(acks.replay(key, 1), ack_frame(1, version=3))
+        self.assertEqual(acks.replay(key, 2), nack_frame(2, "Not your turn"))
+        self.assertIsNone(acks.replay(key, 3))
+        self.assertIsNone(acks.replay(('R1', 't1'), 1))
+
+    def test_answers_beyond_the_window_are_only_acknowledged(self):
+        acks = AckTracker(window=2)
+        key = ('R1', 't0')
+        for seq in range(1, 4):
+            acks.record(key, seq, nack_frame(seq, "rejected"))
+        self.assertEqual(acks.replay(key, 1), ack_frame(1))
+        self.assertEqual(acks.replay(key, 3), nack_frame(3, "rejected"))
+
+    def test_least_recently_active_player_is_forgotten(self):
+        acks = AckTracker(max_keys=2)
+        acks.record('a', 1, ack_frame(1))
+        acks.record('b', 1, ack_frame(1))
+        acks.replay('a', 1)
+        acks.record('c', 1, ack_frame(1))
+        self.assertIsNone(acks.replay('b', 1))
+        self.assertIsNotNone(acks.replay('a', 1))
+
+
+class ValidationTests(SimpleTestCase):
+    def test_valid_actions_pass(self):
+        for frame in (
+            '{"type": "start_game", "seq": 5}',
+            '{"type": "chat", "text": "hi"}',
+            '{"type": "in_game_action", "in_game_action": {"type": "claim_set", "set_number": 9}}',
+            '{"type": "pre_game_action", "pre_game_action": {"type": "change_team", "player_id": "p1", "new_team": 2}}',
+        ):
+            message, _ = decode_client_frame(frame)
+            validate_client_action(message)
+
+    def test_sequence_number_is_split_off(self):
+        self.assertEqual(decode_client_frame('{"type": "sync", "seq": 7}'), ({'type': 'sync'}, 7))
+        self.assertEqual(decode_client_frame('{"type": "sync"}'), ({'type': 'sync'}, None))
+
+    def test_invalid_frames_are_rejected(self):
+        for frame in (
+            b'{"type": "sync"}',
+            'x' * (MAX_FRAME_LENGTH + 1),
+            'not json',
+            '[]',
+            '{"type": "sync", "seq": -1}',
+            '{"type": "sync", "seq": true}',
+            '[' * 1500 + ']' * 1500,
+        ):
+            with self.assertRaises(ValueError, msg=frame[:40]):
+                decode_client_frame(frame)
+
+    def test_invalid_actions_are_rejected(self):
+        for message in (
+            {'type': 'fly'},
+            {'type': 'start_game', 'extra': 1},
+            {'type': 'chat'},
+            {'type': 'chat', 'text': ''},
+            {'type': 'in_game_action', 'in_game_action': {'type': 'claim_set', 'set_number': 10}},
+            {'type': 'in_game_action', 'in_game_action': {'type': 'claim_set', 'set_number': True}},
+            {'type': 'in_game_action', 'in_game_action': {'type': 'ask_card', 'asked_player_id': 'p1', 'card': 'ZZ'}},
+            {'type': 'in_game_action', 'in_game_action': []},
+            {'type': 'pre_game_action', 'pre_game_action': {'type': 'change_team', 'player_id': 'p1', 'new_team': 3}},
+        ):
+            with self.assertRaises(ValueError, msg=json.dumps(message)):
+                validate_client_action(message)
+
+
+class NotificationServiceTests(SimpleTestCase):
+    def test_batches_coalesces_and_retries(self):
+        async def run():
+            transport = FakeTransport(fail_tokens={'bad'})
+            service = NotificationService(transport, batch_window=0.01, max_retries=1, retry_backoff=0.01)
+            service.start()
+            service.notify(['d1'], "Your turn", "Room R1", coalesce_key=('turn', 'R1'))
+            service.notify(['d2'], "Your turn", "Room R1 again", coalesce_key=('turn', 'R1'))
+            service.notify(['d3', 'bad'], "Game started", "Room R2")
+            service.notify(['d4'], "Game started", "Room R2")
+            await asyncio.sleep(0.2)
+            service.worker.cancel()
+            return transport.sent
+
+        sent = asyncio.run(run())
+        self.assertEqual(sent[0], (['d2'], "Your turn", "Room R1 again", {}))
+        self.assertEqual(sent[1], (['d3', 'bad', 'd4'], "Game started", "Room R2", {}))
+        # The failed device is retried once, then given up on
+        self.assertEqual(sent[2:], [(['bad'], "Game started", "Room R2", {})])
+
+
+class CountingPool:
+    """Connection pool stand-in answering token lookups from a dict, counting queries."""
+
+    def __init__(self, users):
+        self.users = users
+        self.queries = 0
+
+    async def fetchone(self, query, params):
+        self.queries += 1
+        await asyncio.sleep(0.01)
+        return self.users.get(params[0])
+
+
+class TokenAuthTests(SimpleTestCase):
+    def test_cache_entries_expire(self):
+        cache = TokenCache(ttl=10, max_entries=10)
+        user = AuthenticatedUser(1, 'alice')
+        cache.put('good', user, now=0)
+        cache.put('bad', None, now=0)
+        self.assertEqual(cache.get('good', now=5), (True, user))
+        self.assertEqual(cache.get('bad', now=5), (True, None))
+        self.assertEqual(cache.get('good', now=10), (False, None))
+        self.assertNotIn('good', cache.entries)
+
+    def test_cache_drops_least_recently_used(self):
+        cache = TokenCache(ttl=10, max_entries=2)
+        cache.put('a', None, now=0)
+        cache.put('b', None, now=0)
+        cache.get('a', now=1)
+        cache.put('c', None, now=1)
+        self.assertEqual(list(cache.entries), ['a', 'c'])
+
+    def test_token_from_scope(self):
+        header = [(b'authorization', b'Token abc123 ')]
+        self.assertEqual(token_from_scope({'query_string': b'auth_token=q1', 'headers': header}), 'q1')
+        self.assertEqual(token_from_scope({'query_string': b'', 'headers': header}), 'abc123')
+        self.assertIsNone(token_from_scope({'headers': [(b'authorization', b'Bearer abc123')]}))
+        self.assertIsNone(token_from_scope({'headers': [(b'authorization', b'Token')]}))
+        self.assertIsNone(token_from_scope({}))
+
+    def test_concurrent_lookups_share_one_query(self):
+        pool = CountingPool({'good': (1, 'alice')})
+        authenticator = TokenAuthenticator(TokenCache(ttl=10, max_entries=10), pool)
+
+        async def run():
+            users = await asyncio.gather(*(authenticator.authenticate('good') for _ in range(20)),
+                                         authenticator.authenticate('bad'))
+            return users + [await authenticator.authenticate('good'), await authenticator.authenticate('bad')]
+        users = asyncio.run(run())
+        self.assertEqual(pool.queries, 2)
+        self.assertEqual({user.username for user in users if user}, {'alice'})
+        self.assertEqual(users.count(None), 2)
+
+
+class LocalPubSubTests(SimpleTestCase):
+    def test_delivers_copies_to_every_subscriber_of_a_channel(self):
+        async def run():
+            pubsub, received = LocalPubSub(), []
+
+            async def handler(message):
+                received.append(message)
+            await pubsub.subscribe('node.a', handler)
+            await pubsub.subscribe('node.a', handler)
+            await pubsub.subscribe('node.b', handler)
+            message = {'type': 'drain'}
+            await pubsub.publish('node.a', message)
+            await asyncio.sleep(0)
+            message['type'] = 'changed'
+            return received
+
+        self.assertEqual(asyncio.run(run()), [{'type': 'drain'}, {'type': 'drain'}])
+
+
+class ClusterMigrationTests(SimpleTestCase):
+    async def nodes(self):
+        pubsub = LocalPubSub()
+        source = ClusterNode('a', 'a:1', RoomManager(), pubsub)
+        target = ClusterNode('b', 'b:1', RoomManager(), pubsub)
+        for node in (source, target):
+            await node.start()
+            self.addCleanup(node.reporter.cancel)
+        room = source.manager.create_room('literature')
+        room.register_action({'type': 'add_player', 'action_token': 't0', 'player_name': 'p0'})
+        await source.directory.assign(room.room_id, 'a')
+        return source, target, room
+
+    def test_room_moves_to_target(self):
+        async def run():
+            source, target, room = await self.nodes()
+            self.assertTrue(await source.migrate_room(room.room_id, 'b'))
+            await asyncio.sleep(0.01)
+            self.assertNotIn(room.room_id, source.manager.rooms)
+            self.assertTrue(target.manager.get_room(room.room_id).presence.is_disconnected('t0'))
+            self.assertEqual(target.directory.lookup(room.room_id), 'b')
+        asyncio.run(run())
+
+    def test_late_target_never_serves_the_room(self):
+        async def run():
+            source, target, room = await self.nodes()
+            accept = target._accept_room
+
+            async def slow_accept(message):
+                await asyncio.sleep(0.1)
+                await accept(message)
+            target._accept_room = slow_accept
+            self.assertFalse(await source.migrate_room(room.room_id, 'b'))
+            await asyncio.sleep(0.2)
+            self.assertFalse(room.frozen)
+            self.assertNotIn(room.room_id, target.manager.rooms)
+            self.assertEqual(target.incoming, {})
+        timeout, cluster.MIGRATION_TIMEOUT_SECONDS = cluster.MIGRATION_TIMEOUT_SECONDS, 0.05
+        self.addCleanup(setattr, cluster, 'MIGRATION_TIMEOUT_SECONDS', timeout)
+        asyncio.run(run())
+
+    def test_failed_send_unfreezes_the_room(self):
+        async def run():
+            source, _, room = await self.nodes()
+
+            async def broken_request(node_id, message):
+                raise ConnectionError("hub gone")
+            source._request = broken_request
+            with self.assertRaises(ConnectionError):
+                await source.migrate_room(room.room_id, 'b')
+            self.assertFalse(room.frozen)
+        asyncio.run(run())
+
+
+class EchoWorker:
+    """Worker answering every HTTP request with its head and body, as a shard router backend."""
+
+    def __init__(self):
+        self.heads = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def handle(self, reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        self.heads.append(head)
+        length = re.search(rb'(?im)^content-length:\s*(\d+)', head)
+        body = await reader.readexactly(int(length.group(1))) if length else b''
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        await writer.drain()
+        writer.close()
+
+
+class RoomListWorker(EchoWorker):
+    """Worker serving a room list with an ETag and answering conditional GETs."""
+
+    def __init__(self, rooms):
+        super().__init__()
+        self.rooms = rooms
+
+    def etag(self):
+        return '"%s"' % ','.join(room['roomId'] for room in self.rooms)
+
+    async def handle(self, reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        self.heads.append(head)
+        etag = self.etag().encode()
+        if b'If-None-Match: ' + etag in head:
+            writer.write(b'HTTP/1.1 304 Not Modified\r\nETag: ' + etag + b'\r\n\r\n')
+        else:
+            body = json.dumps({'rooms': self.rooms}).encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nETag: ' + etag + b'\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        await writer.drain()
+        writer.close()
+
+
+async def http_request(address, request):
+    """Send a raw request and read the response until the connection closes."""
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(request)
+    response = await reader.read()
+    writer.close()
+    return response
+
+
+class ShardRouterTests(SimpleTestCase):
+    def route(self, workers, check):
+        """Run check(router, router address) with a router in front of the workers."""
+        async def run():
+            backends = [await worker.start() for worker in workers]
+            router = ShardRouter(backends)
+            server = await asyncio.start_server(router.handle, '127.0.0.1', 0)
+            try:
+                await check(router, server.sockets[0].getsockname()[:2])
+            finally:
+                for running in [server] + [worker.server for worker in workers]:
+                    running.close()
+                    await running.wait_closed()
+        asyncio.run(run())
+
+    def test_room_requests_reach_owning_worker(self):
+        workers = [EchoWorker(), EchoWorker()]
+
+        async def check(router, address):
+            for room_id in ('ROOM1', 'ROOM2', 'ROOM3', 'ROOM4'):
+                await http_request(address, f'GET /api/games/history/{room_id}/ HTTP/1.1\r\n\r\n'.encode())
+                self.assertIn(room_id.encode(), workers[shard_for_room(room_id, 2)].heads[-1])
+            self.assertEqual(sum(len(worker.heads) for worker in workers), 4)
+        self.route(workers, check)
+
+    def test_splices_body_and_rewrites_forwarded_headers(self):
+        worker = EchoWorker()
+
+        async def check(router, address):
+            body = b'x' * 200000
+            response = await http_request(address, b'POST /api/games/create-room HTTP/1.1\r\n'
+                                          b'X-Forwarded-For: 10.0.0.1\r\nConnection: keep-alive\r\n'
+                                          b'Content-Length: %d\r\n\r\n' % len(body) + body)
+            self.assertTrue(response.startswith(b'HTTP/1.1 200 OK'))
+            self.assertTrue(response.endswith(body))
+            head = worker.heads[0].lower()
+            self.assertNotIn(b'10.0.0.1', head)
+            self.assertIn(b'x-forwarded-for: 127.0.0.1', head)
+            self.assertIn(b'connection: close', head)
+            self.assertNotIn(b'keep-alive', head)
+        self.route([worker], check)
+
+    def test_unreachable_worker_is_bad_gateway(self):
+        worker = EchoWorker()
+
+        async def check(router, address):
+            worker.server.close()
+            await worker.server.wait_closed()
+            response = await http_request(address, b'GET /ws/room/ROOM1/ HTTP/1.1\r\n\r\n')
+            self.assertTrue(response.startswith(b'HTTP/1.1 502'))
+        self.route([worker], check)
+
+
+    def list_rooms(self, address, etag=None):
+        """Get the router's room list; returns (status, ETag, rooms or None)."""
+        async def fetch():
+            conditional = f'If-None-Match: {etag}\r\n' if etag else ''
+            response = await http_request(address, f'GET /api/games/list-rooms HTTP/1.1\r\n{conditional}\r\n'.encode())
+            head, _, body = response.partition(b'\r\n\r\n')
+            status = int(head.split(b' ', 2)[1])
+            merged_etag = re.search(rb'(?im)^etag:\s*(.*?)\s*$', head).group(1).decode()
+            return status, merged_etag, json.loads(body)['rooms'] if status == 200 else None
+        return fetch()
+
+    def test_room_lists_are_merged_and_revalidated(self):
+        workers = [RoomListWorker([{'roomId': 'A'}]), RoomListWorker([{'roomId': 'B'}, {'roomId': 'C'}])]
+
+        async def check(router, address):
+            status, etag, rooms = await self.list_rooms(address)
+            self.assertEqual((status, rooms), (200, [{'roomId': 'A'}, {'roomId': 'B'}, {'roomId': 'C'}]))
+            # Unchanged workers answer 304 to the router, which answers 304 to the client
+            status, same_etag, _ = await self.list_rooms(address, etag)
+            self.assertEqual((status, same_etag), (304, etag))
+            for worker in workers:
+                self.assertIn(b'If-None-Match: ' + worker.etag().encode(), worker.heads[-1])
+            workers[0].rooms = [{'roomId': 'A'}, {'roomId': 'D'}]
+            status, new_etag, rooms = await self.list_rooms(address, etag)
+            self.assertEqual(status, 200)
+            self.assertNotEqual(new_etag, etag)
+            self.assertEqual([room['roomId'] for room in rooms], ['A', 'D', 'B', 'C'])
+        self.route(workers, check)
+
+    def test_room_list_skips_unreachable_worker(self):
+        workers = [RoomListWorker([{'roomId': 'A'}]), RoomListWorker([{'roomId': 'B'}])]
+
+        async def check(router, address):
+            _, etag, _ = await self.list_rooms(address)
+            workers[1].server.close()
+            await workers[1].server.wait_closed()
+            status, new_etag, rooms = await self.list_rooms(address, etag)
+            self.assertEqual((status, rooms), (200, [{'roomId': 'A'}]))
+            self.assertNotEqual(new_etag, etag)
+        self.route(workers, check)
+
+
+class AdmissionTests(SimpleTestCase):
+    def test_limits_apply_to_their_kind(self):
+        controller = AdmissionController(max_rooms=2, max_sockets=1)
+        self.assertIsNone(controller.admit('room', 1))
+        self.assertEqual(controller.admit('room', 2), 'rooms')
+        self.assertIsNone(controller.admit('connection', 2))
+        controller.socket_opened()
+        self.assertEqual(controller.admit('spectator', 0), 'sockets')
+        self.assertIsNone(controller.admit('room', 0))
+        controller.socket_closed()
+        controller.socket_closed()
+        self.assertEqual(controller.sockets, 0)
+
+    def test_smoothed_lag_refuses_everything(self):
+        controller = AdmissionController(max_loop_lag=0.25)
+        refused = metrics.value('admission_rejected_total', kind='connection', reason='loop_lag')
+        # One slow wake-up is smoothed away; sustained lag is not
+        controller.record_lag(1.0)
+        self.assertIsNone(controller.admit('connection', 0))
+        for _ in range(5):
+            controller.record_lag(1.0)
+        self.assertEqual(controller.admit('connection', 0), 'loop_lag')
+        self.assertEqual(controller.admit('room', 0), 'loop_lag')
+        self.assertEqual(metrics.value('admission_rejected_total', kind='connection', reason='loop_lag'), refused + 1)
+        for _ in range(20):
+            controller.record_lag(0.0)
+        self.assertIsNone(controller.admit('connection', 0))
+
+    def test_remote_node_applies_its_own_admission(self):
+        async def run():
+            pubsub = LocalPubSub()
+            source = ClusterNode('a', 'a:1', RoomManager(), pubsub)
+            target = ClusterNode('b', 'b:1', RoomManager(), pubsub, AdmissionController(max_rooms=1))
+            for node in (source, target):
+                await node.start()
+                self.addCleanup(node.reporter.cancel)
+            # The source looks busier, so rooms are placed on the target
+            await source.directory.report_load(50, 0.0)
+            await target.directory.report_load(0, 0.0)
+            await asyncio.sleep(0.01)
+            public_rooms = len(target.manager.rooms)
+            with self.assertRaises(AdmissionRefused) as refused:
+                await source.create_room('literature')
+            self.assertEqual(refused.exception.reason, 'rooms')
+            self.assertEqual(len(target.manager.rooms), public_rooms)
+            target.admission.max_rooms = public_rooms + 1
+            room_id, address = await source.create_room('literature')
+            self.assertEqual(address, 'b:1')
+            self.assertIn(room_id, target.manager.rooms)
+        asyncio.run(run())
+
+
+class SpectatorTests(SimpleTestCase):
+    def test_broken_spectator_socket_does_not_stop_the_others(self):
+        class Spectator:
+            def __init__(self, broken=False):
+                self.broken, self.sent = broken, []
+
+            async def send(self, text_data):
+                if self.broken:
+                    raise ConnectionError("socket closed")
+                self.sent.append(text_data)
+
+        async def run():
+            room = Room('literature', 'R1', seed=1)
+            broadcaster = RoomBroadcaster('R1', lambda room_id: room)
+            broken, watching = Spectator(broken=True), Spectator()
+            broadcaster.add(broken, 0.01)
+            broadcaster.add(watching, 0.01)
+            await asyncio.sleep(0.01)
+            room.register_action({'type': 'add_player', 'action_token': 't0', 'player_name': 'p0'})
+            broadcaster.wake.set()
+            await asyncio.sleep(0.05)
+            broadcaster.remove(watching)
+            await asyncio.sleep(0)
+            return broadcaster, watching
+
+        broadcaster, watching = asyncio.run(run())
+        self.assertEqual(len(watching.sent), 2)
+        self.assertEqual(broadcaster.spectators, {})
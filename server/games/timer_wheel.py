@@ -0,0 +1,132 @@
+"""
+Hierarchical timing wheel shared by every timer in the process.
+
+Timers are hashed into slots by expiry tick. Level 0 has one slot per tick;
+each higher level has slots covering a whole rotation of the level below and
+is cascaded down as time reaches it. Scheduling and cancelling are O(1), and
+advancing one tick touches one level-0 slot plus, rarely, one higher slot,
+however many timers are pending.
+"""
+
+import math
+import threading
+import time
+from literature.logs import get_logger
+
+log = get_logger(__name__)
+
+# Seconds per tick of the lowest level
+TIMER_TICK_SECONDS = 0.1
+# Slots per level, a power of two
+WHEEL_SLOTS = 64
+# Number of levels; 4 levels of 64 slots at 0.1s cover about 19 days
+WHEEL_LEVELS = 4
+
+
+class Timer:
+    """Handle of a scheduled callback."""
+
+    __slots__ = ('expires', 'callback', 'slot')
+
+    def __init__(self, expires, callback):
+        self.expires = expires  # Tick at which the timer fires
+        self.callback = callback
+        self.slot = None  # Set holding the timer while it is pending
+
+
+class TimerWheel:
+    """Schedules callbacks to run after a delay, at tick resolution."""
+
+    def __init__(self, tick=TIMER_TICK_SECONDS, slots=WHEEL_SLOTS, levels=WHEEL_LEVELS, now=None):
+        """
+        Initialize the wheel.
+
+        Args:
+            tick (float): Seconds per tick
+            slots (int): Slots per level, a power of two
+            levels (int): Number of levels
+            now (float, optional): Current monotonic time
+        """
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.start = time.monotonic() if now is None else now
+        self.current = 0  # Last tick processed
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.lock = threading.Lock()
+
+    def _insert(self, timer):
+        expires = max(timer.expires, self.current)
+        for level in range(self.levels):
+            span = self.slots ** (level + 1)
+            if expires // span == self.current // span or level == self.levels - 1:
+                slot = self.wheels[level][(expires // self.slots ** level) % self.slots]
+                break
+        slot.add(timer)
+        timer.slot = slot
+
+    def schedule(self, delay, callback):
+        """
+        Run a callback after a delay.
+
+        Args:
+            delay (float): Seconds from now, rounded up to whole ticks
+            callback: Callable taking no arguments
+
+        Returns:
+            Timer: Handle accepted by cancel
+        """
+        with self.lock:
+            timer = Timer(self.current + max(1, math.ceil(delay / self.tick)), callback)
+            self._insert(timer)
+        return timer
+
+    def cancel(self, timer):
+        """Stop a pending timer. Cancelling a fired or cancelled timer does nothing."""
+        with self.lock:
+            if timer.slot is not None:
+                timer.slot.discard(timer)
+                timer.slot = None
+
+    def remaining(self, timer, now=None):
+        """Seconds until a pending timer fires, or None if it is not pending."""
+        if timer.slot is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(timer.expires * self.tick - (now - self.start), 0.0)
+
+    def advance(self, now=None):
+        """
+        Process every tick up to the current time and run the due callbacks.
+
+        Callbacks run outside the wheel's lock, so they may schedule timers.
+
+        Returns:
+            int: Number of callbacks run
+        """
+        now = time.monotonic() if now is None else now
+        target = int((now - self.start) / self.tick)
+        due = []
+        with self.lock:
+            while self.current < target:
+                self.current += 1
+                # Cascade every level whose rotation below just completed
+                level, span = 1, self.slots
+                while level < self.levels and self.current % span == 0:
+                    slot = self.wheels[level][(self.current // span) % self.slots]
+                    timers = list(slot)
+                    slot.clear()
+                    for timer in timers:
+                        self._insert(timer)
+                    level, span = level + 1, span * self.slots
+                slot = self.wheels[0][self.current % self.slots]
+                for timer in slot:
+                    timer.slot = None
+                due.extend(slot)
+                slot.clear()
+        for timer in due:
+            try:
+                timer.callback()
+            except Exception as e:
+                log.exception("timer_callback_failed")
+        return len(due)
@@ -1,6 +1,11 @@
 from django.urls import path
-from .views import CreateRoomView, ListRoomsView
+from .views import CreateRoomView, GameHistoryStreamView, GameHistoryView, GameStateAtMoveView, ListRoomsView, MetricsView, PlayerStatsView
 urlpatterns = [
     path('create-room', CreateRoomView.as_view(), name='create_room'),
     path('list-rooms', ListRoomsView.as_view(), name='list_rooms'),
+    path('history/<str:room_id>', GameHistoryView.as_view(), name='game_history'),
+    path('history/<str:room_id>/stream', GameHistoryStreamView.as_view(), name='game_history_stream'),
+    path('history/<str:room_id>/state/<int:move_index>', GameStateAtMoveView.as_view(), name='game_state_at_move'),
+    path('stats/<str:player_key>', PlayerStatsView.as_view(), name='player_stats'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Validation of messages received from Literature clients.
+
+Every action a client may send (see web-client/src/types/actions.ts) has a
+schema, and any action may carry a sequence number "seq" to be
+acknowledged. Schemas are compiled once at import into closures that check
+a decoded message in a single pass, so malformed or oversize frames are
+rejected before any room or engine code runs.
+"""
+
+import json
+from .chat import CHAT_MAX_LENGTH
+from .engine.card import ALL_CARDS
+
+# Largest text frame accepted from a client, in characters
+MAX_FRAME_LENGTH = 2048
+# Longest player ID accepted in an action
+MAX_ID_LENGTH = 64
+
+
+def string(max_length=MAX_ID_LENGTH):
+    """Schema for a non-empty string of bounded length."""
+    def check(value):
+        return type(value) is str and 0 < len(value) <= max_length
+    return check
+
+
+def integer(low, high):
+    """Schema for an integer in [low, high]; booleans are rejected."""
+    def check(value):
+        return type(value) is int and low <= value <= high
+    return check
+
+
+def one_of(values):
+    """Schema for a value from a fixed set, compared with its type so True is not 1."""
+    values = frozenset((type(value), value) for value in values)
+
+    def check(value):
+        try:
+            return (type(value), value) in values
+        except TypeError:
+            return False
+    return check
+
+
+def compile_schema(fields, nested=None):
+    """
+    Compile an object schema.
+
+    Args:
+        fields (dict): Field name -> check returning True for valid values.
+            Every field is required and no other field is allowed besides "type".
+        nested (dict, optional): Field name -> {type: compiled schema} for
+            fields holding a tagged sub-action
+
+    Returns:
+        Callable raising ValueError for an invalid object
+    """
+    allowed = frozenset(fields) | frozenset(nested or ()) | {'type'}
+    checks = tuple(fields.items())
+    nested = tuple((nested or {}).items())
+
+    def validate(obj):
+        if not allowed.issuperset(obj) or len(obj) != len(allowed):
+            raise ValueError("Unexpected or missing fields")
+        for name, check in checks:
+            if not check(obj[name]):
+                raise ValueError(f"Invalid value for {name}")
+        for name, schemas in nested:
+            validate_tagged(obj[name], schemas)
+    return validate
+
+
+def validate_tagged(obj, schemas):
+    """Validate an object whose "type" field selects its schema."""
+    if type(obj) is not dict:
+        raise ValueError("Message must be an object")
+    validate = schemas.get(obj.get('type')) if type(obj.get('type')) is str else None
+    if validate is None:
+        raise ValueError("Unknown action type")
+    validate(obj)
+
+
+IN_GAME_ACTIONS = {
+    'ask_card': compile_schema({'asked_player_id': string(), 'card': one_of(ALL_CARDS)}),
+    'claim_set': compile_schema({'set_number': integer(1, 9)}),
+    'pass_turn': compile_schema({'teammate_id': string()}),
+}
+
+PRE_GAME_ACTIONS = {
+    'change_team': compile_schema({'player_id': string(), 'new_team': one_of((1, 2))}),
+}
+
+# Sequence numbers start from the client's clock in milliseconds, so they stay
+# increasing across page reloads; 2**53 is the largest exact JavaScript integer
+valid_seq = integer(0, 2 ** 53)
+
+CLIENT_ACTIONS = {
+    'start_game': compile_schema({}),
+    'exit_room': compile_schema({}),
+    'sync': compile_schema({}),
+    'add_bot': compile_schema({}),
+    'chat': compile_schema({'text': string(CHAT_MAX_LENGTH)}),
+    'remove_player': compile_schema({'player_id': string()}),
+    'change_host': compile_schema({'new_host_id': string()}),
+    'in_game_action': compile_schema({}, {'in_game_action': IN_GAME_ACTIONS}),
+    'pre_game_action': compile_schema({}, {'pre_game_action': PRE_GAME_ACTIONS}),
+}
+
+
+def decode_client_frame(text_data):
+    """
+    Decode a frame received from a player and split off its sequence number.
+
+    Args:
+        text_data (str): Raw websocket text frame
+
+    Returns:
+        tuple: (message dict, still to be checked by validate_client_action,
+            sequence number or None if the client did not send one)
+
+    Raises:
+        ValueError: If the frame is too large, not JSON, not a JSON object or carries an
+            invalid sequence number
+    """
+    if not isinstance(text_data, str):
+        raise ValueError("Expected a text message")
+    if len(text_data) > MAX_FRAME_LENGTH:
+        raise ValueError("Message too large")
+    try:
+        message = json.loads(text_data)
+    except RecursionError:
+        # Deeply nested arrays fit in a frame but overflow the decoder's stack
+        raise ValueError("Malformed message")
+    if type(message) is not dict:
+        raise ValueError("Message must be an object")
+    seq = message.pop('seq', None)
+    if seq is not None and not valid_seq(seq):
+        raise ValueError("Invalid value for seq")
+    return message, seq
+
+
+def validate_client_action(message):
+    """
+    Validate an action decoded by decode_client_frame.
+
+    Raises:
+        ValueError: If the message is not a valid action
+    """
+    validate_tagged(message, CLIENT_ACTIONS)
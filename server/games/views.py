@@ -1,13 +1,39 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from games.room_manager import RoomManager
+from games.consumers import ensure_worker_started, start_worker
+from games.admission import AdmissionRefused, get_admission_controller
+from games.metrics import metrics
+from games.stats import get_stats_service
+from asgiref.sync import async_to_sync
 from rest_framework.views import APIView
 import json
 from rest_framework.permissions import AllowAny
 # Create your views here.
+def busy_response(reason):
+    admission = get_admission_controller()
+    response = JsonResponse({'error': admission.busy_message(reason), 'retryAfter': admission.retry_after},
+                            status=503)
+    response['Retry-After'] = str(admission.retry_after)
+    return response
+
+
 class CreateRoomView(APIView):
     def post(self, request):
         game_type = request.data.get('game_type')
-        room = RoomManager.get_instance().create_room(game_type)
+        # Joins the cluster the same way a websocket does, so moved rooms still notify their clients
+        cluster = async_to_sync(start_worker)()
+        if cluster:
+            # Place the room on the least loaded node, which applies its own admission control
+            try:
+                room_id, address = async_to_sync(cluster.create_room)(game_type)
+            except AdmissionRefused as e:
+                return busy_response(e.reason)
+            return JsonResponse({'room_id': room_id, 'address': address})
+        manager = RoomManager.get_instance()
+        reason = get_admission_controller().admit('room', len(manager.rooms))
+        if reason:
+            return busy_response(reason)
+        room = manager.create_room(game_type)
         return JsonResponse({'room_id': room.room_id})
     
 
@@ -15,5 +41,103 @@ class ListRoomsView(APIView):
     permission_classes = [AllowAny]  # Override default permission classes
     authentication_classes = []  # Override default authentication classes
     def get(self, request):
-        rooms = RoomManager.get_instance().list_available_rooms()
-        return JsonResponse({'rooms': rooms})
\ No newline at end of file
+        # Lobby polls, including the shard router's warm-up, start a freshly restarted worker
+        ensure_worker_started()
+        manager = RoomManager.get_instance()
+        etag = manager.lobby_etag()
+        # Unchanged since the client's last poll: nothing to build or send
+        if etag in [tag.strip().removeprefix('W/') for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponse(status=304)
+        else:
+            try:
+                body = manager.lobby_body(request.GET.get('game_type'), request.GET.get('state'))
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+# Moves per page when listing a game's history
+HISTORY_PAGE_SIZE = 100
+MAX_HISTORY_PAGE_SIZE = 1000
+
+
+def _history_or_404(room_id):
+    history = RoomManager.get_instance().get_history(room_id)
+    if history is None:
+        return None, JsonResponse({'error': 'No history for this game'}, status=404)
+    return history, None
+
+
+class GameHistoryView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    def get(self, request, room_id):
+        history, error = _history_or_404(room_id)
+        if error:
+            return error
+        try:
+            offset = max(int(request.GET.get('offset', 0)), 0)
+            limit = min(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), MAX_HISTORY_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({'error': 'offset and limit must be integers'}, status=400)
+        end = min(offset + max(limit, 0), len(history))
+        return JsonResponse({
+            'gameId': room_id,
+            'players': history.seats,
+            'totalMoves': len(history),
+            'offset': offset,
+            'moves': [history.describe_move(i) for i in range(offset, end)],
+            'nextOffset': end if end < len(history) else None,
+        })
+
+
+class GameHistoryStreamView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    def get(self, request, room_id):
+        history, error = _history_or_404(room_id)
+        if error:
+            return error
+        try:
+            offset = int(request.GET.get('offset', 0))
+        except ValueError:
+            return JsonResponse({'error': 'offset must be an integer'}, status=400)
+        # One JSON array of moves per line
+        chunks = (json.dumps(chunk) + '\n' for chunk in history.iter_chunks(offset))
+        return StreamingHttpResponse(chunks, content_type='application/x-ndjson')
+
+
+class GameStateAtMoveView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    def get(self, request, room_id, move_index):
+        manager = RoomManager.get_instance()
+        # Replayed states reveal every hand, so only finished games can be inspected
+        if not manager.is_game_finished(room_id):
+            return JsonResponse({'error': 'Game is still in progress'}, status=403)
+        history, error = _history_or_404(room_id)
+        if error:
+            return error
+        try:
+            return JsonResponse(history.state_at(move_index))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+
+class PlayerStatsView(APIView):
+    """A player's profile statistics, by the key games.stats derives from their token."""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    def get(self, request, player_key):
+        if len(player_key) != 16 or any(c not in '0123456789abcdef' for c in player_key):
+            return JsonResponse({'error': 'Invalid player key'}, status=400)
+        return JsonResponse(get_stats_service().profile(player_key))
+
+
+class MetricsView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4')
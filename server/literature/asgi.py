@@ -12,13 +12,18 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 import games.routing
+from games.consumers import worker_lifespan
+from literature.ws_auth import TokenAuthMiddleware
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'literature.settings')
 
 application = ProtocolTypeRouter({
+    "lifespan": worker_lifespan,
     "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
-        URLRouter(
-            games.routing.websocket_urlpatterns
+    "websocket": TokenAuthMiddleware(
+        AuthMiddlewareStack(
+            URLRouter(
+                games.routing.websocket_urlpatterns
+            )
         )
     ),
 })
\ No newline at end of file
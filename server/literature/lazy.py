@@ -0,0 +1,53 @@
+"""
+Lazy initialization for heavy clients.
+
+Workers should start serving as soon as possible, so clients with expensive
+imports or setup (Firebase, gRPC) are only built the first time they are used.
+"""
+
+import threading
+
+
+class LazyClient:
+    """Builds a client on first use and reuses it afterwards. Thread-safe."""
+
+    def __init__(self, name, factory):
+        """
+        Initialize the lazy client.
+
+        Args:
+            name (str): Name of the client
+            factory: Callable returning the client
+        """
+        self.name = name
+        self.factory = factory
+        self.lock = threading.Lock()
+        self.client = None
+        self.initialized = False
+
+    def get(self):
+        """Return the client, building it if this is the first use."""
+        if not self.initialized:
+            with self.lock:
+                if not self.initialized:
+                    self.client = self.factory()
+                    self.initialized = True
+        return self.client
+
+
+def _init_firebase():
+    import json
+    from django.conf import settings
+    from firebase_admin import credentials, initialize_app
+    service_account_info = json.loads(settings.FIREBASE_SERVICE_ACCOUNT)
+    return initialize_app(credentials.Certificate(service_account_info))
+
+
+def _init_messaging():
+    firebase_app.get()
+    from firebase_admin import messaging
+    return messaging
+
+
+firebase_app = LazyClient('firebase_app', _init_firebase)
+firebase_messaging = LazyClient('firebase_messaging', _init_messaging)
@@ -0,0 +1,208 @@
+"""
+Structured, non-blocking logging for the server.
+
+Code logs named events with fields rather than sentences:
+
+    log = get_logger(__name__)
+    log.warning("invalid_message", room_id=room_id, player_id=player_id, error=str(e))
+
+Warning events, the ones clients can set off at will (invalid_message,
+action_rejected), are rate limited on the calling thread before a log
+record is even created; a flood of one costs a token-bucket check per call.
+Records suppressed by the limit are counted and the count is reported on
+the next record of the same event. Lifecycle events and errors are never
+limited. Every record is put on a bounded queue and written as JSON lines
+by a background thread, so logging never waits on I/O. Records that find
+the queue full are dropped and counted the same way.
+
+The handler is installed through Django's LOGGING setting (see
+queue_handler). Without it, records go wherever the logging module's
+defaults send them.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Records waiting to be written before new ones are dropped
+LOG_QUEUE_SIZE = 10000
+# Records of one event allowed per second, and in a burst
+LOG_EVENT_RATE = 10.0
+LOG_EVENT_BURST = 50
+# Only events logged at this level are rate limited
+LOG_LIMITED_LEVEL = logging.WARNING
+
+# EventRateLimiter applied by every EventLogger, installed by queue_handler
+event_limiter = None
+
+
+class EventLogger:
+    """Logs named events with keyword fields through a standard logger."""
+
+    __slots__ = ('logger',)
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def log(self, level, event, exc_info=False, **fields):
+        """
+        Log an event.
+
+        Args:
+            level (int): Logging level
+            event (str): Event name, also the key warnings are rate limited by
+            exc_info: Exception information to attach, as for logging
+            **fields: Values written with the event (room_id, player_id, ...)
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        if level == LOG_LIMITED_LEVEL and event_limiter is not None:
+            suppressed = event_limiter.allow(self.logger.name, event)
+            if suppressed is None:
+                return
+            if suppressed:
+                fields['suppressed'] = suppressed
+        self.logger.log(level, event, exc_info=exc_info, extra={'fields': fields})
+
+    def debug(self, event, **fields):
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self.log(logging.WARNING, event, **fields)
+
+    def error(self, event, **fields):
+        self.log(logging.ERROR, event, **fields)
+
+    def exception(self, event, **fields):
+        """Log an error event with the exception being handled."""
+        self.log(logging.ERROR, event, exc_info=True, **fields)
+
+
+def get_logger(name):
+    """Return the event logger for a module."""
+    return EventLogger(logging.getLogger(name))
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class EventRateLimiter:
+    """
+    Limits how often each event is logged.
+
+    Each (logger, event) pair has a token bucket, so one noisy event cannot
+    crowd out the others.
+    """
+
+    def __init__(self, rate=LOG_EVENT_RATE, burst=LOG_EVENT_BURST):
+        from games.rate_limit import RateLimiter
+        self.limiter = RateLimiter(rate, burst)
+        self.suppressed = {}  # (logger, event) -> records dropped since the last one passed
+        self.lock = threading.Lock()
+
+    def allow(self, logger_name, event):
+        """
+        Spend a token for an event.
+
+        Returns:
+            int: Records of the event dropped since the last one allowed, or
+                None if this one must be dropped too
+        """
+        key = (logger_name, event)
+        with self.lock:
+            if not self.limiter.allow(key):
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return None
+            return self.suppressed.pop(key, 0)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queues records for a QueueListener without ever blocking the caller.
+
+    Records are handed over as they are, since the listener runs in the same
+    process, and formatting happens on the listener's thread. A full queue
+    drops the record; the count is reported with the next record written.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            record.fields = dict(getattr(record, 'fields', None) or {}, queue_dropped=dropped)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BackgroundListener(QueueListener):
+    """QueueListener whose stop waits for room in a full queue and may be called twice."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+def queue_handler(queue_size=LOG_QUEUE_SIZE, event_rate=LOG_EVENT_RATE, event_burst=LOG_EVENT_BURST, stream=None):
+    """
+    Build the queue-backed handler and start the thread writing its records.
+
+    Used as a handler factory in the LOGGING setting:
+    {'()': 'literature.logs.queue_handler', 'queue_size': ..., ...}
+
+    Args:
+        queue_size (int): Records waiting to be written before new ones are dropped
+        event_rate (float): Records of one warning event allowed per second
+        event_burst (int): Records of one warning event allowed in a burst
+        stream: File records are written to, stderr by default
+
+    Returns:
+        DroppingQueueHandler: Handler to attach to loggers
+    """
+    global event_limiter
+    log_queue = queue.Queue(queue_size)
+    writer = logging.StreamHandler(stream or sys.stderr)
+    writer.setFormatter(JsonFormatter())
+    listener = BackgroundListener(log_queue, writer, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    event_limiter = EventRateLimiter(event_rate, event_burst)
+    handler = DroppingQueueHandler(log_queue)
+    handler.listener = listener
+    return handler
+
+
+def elapsed_ms(started):
+    """Milliseconds since a time.perf_counter() reading, for latency fields."""
+    return round((time.perf_counter() - started) * 1000, 3)
@@ -1,4 +1,18 @@
-from firebase_admin import messaging
+import asyncio
+from collections import OrderedDict
+from .lazy import firebase_messaging
+from .logs import get_logger
+
+log = get_logger(__name__)
+
+# Largest number of device tokens FCM accepts in one multicast
+MULTICAST_LIMIT = 500
+# Seconds to wait for more notifications before sending a batch
+BATCH_WINDOW = 0.05
+# Retry a failed delivery this many times, doubling the delay each time
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
 
 def send_push_notification(token, title, body, data=None):
     """
@@ -13,6 +27,7 @@ def send_push_notification(token, title, body, data=None):
     Returns:
         str: FCM message ID if successful.
     """
+    messaging = firebase_messaging.get()
     message = messaging.Message(
         notification=messaging.Notification(
             title=title,
@@ -26,6 +41,179 @@ def send_push_notification(token, title, body, data=None):
         return response
     except Exception as e:
         # Log the error for debugging
-        print(f"Error sending notification: {e}")
+        log.error("notification_failed", error=str(e))
         return None
 
+
+class FCMTransport:
+    """Delivers notifications through Firebase Cloud Messaging multicast."""
+
+    def send_multicast(self, device_tokens, title, body, data):
+        """
+        Send one notification to many devices. Blocking; run it off the event loop.
+
+        Args:
+            device_tokens (list): FCM device tokens, at most MULTICAST_LIMIT
+            title (str): Title of the notification
+            body (str): Body of the notification
+            data (dict): Data payload
+
+        Returns:
+            tuple: (tokens to retry, tokens that are no longer registered)
+        """
+        messaging = firebase_messaging.get()
+        message = messaging.MulticastMessage(
+            notification=messaging.Notification(title=title, body=body),
+            data=data,
+            tokens=device_tokens,
+        )
+        response = messaging.send_each_for_multicast(message)
+        retry, unregistered = [], []
+        for device_token, result in zip(device_tokens, response.responses):
+            if result.success:
+                continue
+            if isinstance(result.exception, messaging.UnregisteredError):
+                unregistered.append(device_token)
+            else:
+                retry.append(device_token)
+        return retry, unregistered
+
+
+class FakeTransport:
+    """Records notifications instead of sending them, for tests and local development."""
+
+    def __init__(self, fail_tokens=()):
+        """
+        Initialize the fake transport.
+
+        Args:
+            fail_tokens: Device tokens whose deliveries always fail
+        """
+        self.sent = []  # (device tokens, title, body, data) per multicast
+        self.fail_tokens = set(fail_tokens)
+
+    def send_multicast(self, device_tokens, title, body, data):
+        self.sent.append((list(device_tokens), title, body, data))
+        return [token for token in device_tokens if token in self.fail_tokens], []
+
+
+class NotificationService:
+    """
+    Queues push notifications and sends them in batches from a background task.
+
+    Notifications sharing a coalesce key replace each other while queued, so
+    only the latest one (for example the current "your turn") is delivered.
+    Identical notifications are merged into one multicast. Failed deliveries
+    are retried with exponential backoff.
+    """
+
+    def __init__(self, transport, batch_window=BATCH_WINDOW, max_retries=MAX_RETRIES, retry_backoff=RETRY_BACKOFF):
+        """
+        Initialize the service.
+
+        Args:
+            transport: Object with a blocking send_multicast method
+            batch_window (float): Seconds to gather notifications into a batch
+            max_retries (int): Retries for a failed delivery
+            retry_backoff (float): Delay before the first retry, in seconds
+        """
+        self.transport = transport
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.devices = {}  # player token -> set of FCM device tokens
+        self.pending = OrderedDict()  # coalesce key -> (device tokens, title, body, data, attempt)
+        self.loop = None
+        self.wakeup = None
+        self.worker = None
+
+    def start(self):
+        """Start the sending worker on the running event loop if it is not running."""
+        if self.worker is None or self.worker.done():
+            self.loop = asyncio.get_running_loop()
+            self.wakeup = asyncio.Event()
+            self.worker = self.loop.create_task(self._run())
+
+    def register_device(self, player_token, device_token):
+        """Associate an FCM device token with a player token."""
+        self.devices.setdefault(player_token, set()).add(device_token)
+
+    def devices_for(self, player_token):
+        """Get the FCM device tokens registered for a player."""
+        return list(self.devices.get(player_token, ()))
+
+    def notify(self, device_tokens, title, body, data=None, coalesce_key=None):
+        """
+        Queue a notification. Safe to call from any thread; never blocks.
+
+        Args:
+            device_tokens (list): FCM device tokens of the recipients
+            title (str): Title of the notification
+            body (str): Body of the notification
+            data (dict, optional): Data payload, string values only
+            coalesce_key (hashable, optional): Queued notifications with the same
+                key are replaced by this one
+        """
+        if not device_tokens or self.loop is None:
+            return
+        item = (tuple(device_tokens), title, body, data or {}, 0)
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._enqueue(coalesce_key, item)
+        else:
+            self.loop.call_soon_threadsafe(self._enqueue, coalesce_key, item)
+
+    def _enqueue(self, coalesce_key, item):
+        if coalesce_key is None:
+            coalesce_key = object()
+        self.pending.pop(coalesce_key, None)
+        self.pending[coalesce_key] = item
+        self.wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self.wakeup.wait()
+            await asyncio.sleep(self.batch_window)
+            self.wakeup.clear()
+            batch, self.pending = self.pending, OrderedDict()
+            # Merge identical notifications so they share multicasts
+            groups = OrderedDict()
+            for device_tokens, title, body, data, attempt in batch.values():
+                group_key = (title, body, tuple(sorted(data.items())), attempt)
+                groups.setdefault(group_key, OrderedDict()).update(dict.fromkeys(device_tokens))
+            for (title, body, data, attempt), device_tokens in groups.items():
+                device_tokens = list(device_tokens)
+                for start in range(0, len(device_tokens), MULTICAST_LIMIT):
+                    await self._send(device_tokens[start:start + MULTICAST_LIMIT], title, body, dict(data), attempt)
+
+    async def _send(self, device_tokens, title, body, data, attempt):
+        try:
+            retry, unregistered = await asyncio.to_thread(
+                self.transport.send_multicast, device_tokens, title, body, data)
+        except Exception as e:
+            log.error("notification_batch_failed", devices=len(device_tokens), attempt=attempt, error=str(e))
+            retry, unregistered = device_tokens, []
+        for device_token in unregistered:
+            for registered in self.devices.values():
+                registered.discard(device_token)
+        if retry and attempt < self.max_retries:
+            self.loop.call_later(self.retry_backoff * 2 ** attempt, self._enqueue, None,
+                                 (tuple(retry), title, body, data, attempt + 1))
+
+
+notification_service = None
+
+
+def get_notification_service():
+    """Return the process-wide notification service, creating it on first use."""
+    global notification_service
+    if notification_service is None:
+        from django.conf import settings
+        from django.utils.module_loading import import_string
+        transport_class = import_string(getattr(settings, 'NOTIFICATION_TRANSPORT',
+                                                'literature.push_notifications.FCMTransport'))
+        notification_service = NotificationService(transport_class())
+    return notification_service
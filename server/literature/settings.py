@@ -10,12 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
-import json
 import os
 from pathlib import Path
 from decouple import config
 import dj_database_url
-from firebase_admin import credentials, initialize_app
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -90,6 +88,59 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Rooms are hash-partitioned across SHARD_COUNT worker processes (see games.sharding).
+# SHARD_INDEX identifies this worker; runshards sets both for every worker it starts.
+SHARD_COUNT = config('SHARD_COUNT', default=1, cast=int)
+SHARD_INDEX = config('SHARD_INDEX', default=0, cast=int)
+SHARD_SUFFIX = f'.shard{SHARD_INDEX}' if SHARD_COUNT > 1 else ''
+
+# Multi-node deployments: a unique node ID (empty disables clustering), the host:port
+# clients use to reach this node, and the pub/sub transport ("local" or "unix:<path>")
+CLUSTER_NODE_ID = config('CLUSTER_NODE_ID', default='')
+CLUSTER_NODE_ADDRESS = config('CLUSTER_NODE_ADDRESS', default='localhost:8000')
+CLUSTER_PUBSUB = config('CLUSTER_PUBSUB', default='local')
+
+# SQLite file holding the room event log used to recover rooms after a restart.
+# Set to an empty string to keep rooms in memory only.
+ROOM_EVENT_LOG = config('ROOM_EVENT_LOG', default=str(BASE_DIR / 'room_events.sqlite3'))
+if ROOM_EVENT_LOG:
+    ROOM_EVENT_LOG += SHARD_SUFFIX
+
+# Directory where finished game histories are moved out of memory
+GAME_HISTORY_DIR = config('GAME_HISTORY_DIR', default=str(BASE_DIR / 'game_history'))
+
+# Transport used to deliver push notifications
+NOTIFICATION_TRANSPORT = config('NOTIFICATION_TRANSPORT', default='literature.push_notifications.FCMTransport')
+
+# Directory of the append-only columnar archive of finished games
+GAME_ARCHIVE_DIR = config('GAME_ARCHIVE_DIR', default=str(BASE_DIR / 'game_archive'))
+if GAME_ARCHIVE_DIR:
+    GAME_ARCHIVE_DIR += SHARD_SUFFIX
+
+# Seconds a player has for each move (0 disables turn clocks) and the move made
+# for them when time runs out: 'random_ask' or 'pass'
+TURN_TIMEOUT_SECONDS = config('TURN_TIMEOUT_SECONDS', default=90, cast=float)
+TURN_TIMEOUT_POLICY = config('TURN_TIMEOUT_POLICY', default='random_ask')
+
+# Admission control: past any of these limits new rooms, players and spectators
+# are refused with a retry-after hint while seated players are still let in
+ADMISSION_MAX_LOOP_LAG_MS = config('ADMISSION_MAX_LOOP_LAG_MS', default=250, cast=int)
+ADMISSION_MAX_ROOMS = config('ADMISSION_MAX_ROOMS', default=100000, cast=int)
+ADMISSION_MAX_SOCKETS = config('ADMISSION_MAX_SOCKETS', default=20000, cast=int)
+ADMISSION_RETRY_AFTER_SECONDS = config('ADMISSION_RETRY_AFTER_SECONDS', default=5, cast=int)
+
+# Seconds between batched writes of player statistics to the database
+STATS_FLUSH_INTERVAL = config('STATS_FLUSH_INTERVAL', default=5, cast=float)
+
+# Bot policy tables written by train_bot_policy, memory-mapped at startup (empty uses
+# the built-in tables), and seconds a bot waits before each move
+BOT_POLICY_FILE = config('BOT_POLICY_FILE', default=str(BASE_DIR / 'bot_policy.bin'))
+BOT_MOVE_DELAY = config('BOT_MOVE_DELAY', default=1.0, cast=float)
+# Bot turns from every room are decided together: a batch is evaluated once it holds
+# BOT_BATCH_SIZE turns or its first turn has waited BOT_BATCH_WAIT seconds
+BOT_BATCH_SIZE = config('BOT_BATCH_SIZE', default=256, cast=int)
+BOT_BATCH_WAIT = config('BOT_BATCH_WAIT', default=0.1, cast=float)
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -154,6 +205,13 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Websocket connections authenticate with the REST API's tokens, see literature.ws_auth.
+# Without WEBSOCKET_REQUIRE_AUTH, connections without a valid token stay anonymous.
+WEBSOCKET_REQUIRE_AUTH = config('WEBSOCKET_REQUIRE_AUTH', default=False, cast=bool)
+WEBSOCKET_AUTH_CACHE_TTL = config('WEBSOCKET_AUTH_CACHE_TTL', default=60, cast=float)
+WEBSOCKET_AUTH_CACHE_SIZE = config('WEBSOCKET_AUTH_CACHE_SIZE', default=10000, cast=int)
+WEBSOCKET_AUTH_DB_POOL_SIZE = config('WEBSOCKET_AUTH_DB_POOL_SIZE', default=4, cast=int)
+
 AUTHENTICATION_BACKENDS = (
     'social_core.backends.google.GoogleOAuth2',
     'django.contrib.auth.backends.ModelBackend',
@@ -164,6 +222,29 @@ SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET = config('SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET')
 
 CORS_ALLOW_ALL_ORIGINS = True
 
-service_account_info = json.loads(config('FIREBASE_SERVICE_ACCOUNT'))
-cred = credentials.Certificate(service_account_info)
-firebase_app = initialize_app(cred)
\ No newline at end of file
+# Parsed and passed to Firebase on first use, see literature.lazy
+FIREBASE_SERVICE_ACCOUNT = config('FIREBASE_SERVICE_ACCOUNT')
+
+# Import-time budget enforced by the cold_start_report command, in milliseconds
+COLD_START_BUDGET_MS = config('COLD_START_BUDGET_MS', default=1500, cast=int)
+
+# Structured logging: the games and literature loggers write JSON lines to stderr from
+# a background thread (see literature.logs). Each warning event is limited to LOG_EVENT_RATE
+# records per second with bursts of LOG_EVENT_BURST; suppressed records are counted.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'events': {
+            '()': 'literature.logs.queue_handler',
+            'queue_size': config('LOG_QUEUE_SIZE', default=10000, cast=int),
+            'event_rate': config('LOG_EVENT_RATE', default=10, cast=float),
+            'event_burst': config('LOG_EVENT_BURST', default=50, cast=int),
+        },
+    },
+    'loggers': {
+        'games': {'handlers': ['events'], 'level': LOG_LEVEL, 'propagate': False},
+        'literature': {'handlers': ['events'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
@@ -0,0 +1,276 @@
+"""
+Token authentication for websocket connections.
+
+Websocket clients present the same DRF tokens the REST API accepts, in an
+"auth_token" query parameter (browsers cannot set headers on a websocket) or
+an "Authorization: Token <key>" header. Validated tokens are cached in
+process for a short while and concurrent lookups of one token share a query,
+so a reconnect storm costs at most one database round trip per distinct
+token, made over a small pool of async connections.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+from .logs import get_logger
+
+log = get_logger(__name__)
+
+# Close code for a handshake refused for lack of valid credentials
+AUTH_FAILED_CLOSE_CODE = 4003
+
+
+class AuthenticatedUser:
+    """The user behind a websocket, as far as the game needs to know them."""
+
+    __slots__ = ('id', 'username')
+
+    def __init__(self, user_id, username):
+        self.id = user_id
+        self.username = username
+
+
+class TokenCache:
+    """
+    LRU cache of token lookups whose entries expire after a fixed time.
+
+    Failed lookups are cached too, so a client retrying a bad token does not
+    reach the database either.
+    """
+
+    def __init__(self, ttl, max_entries):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl (float): Seconds an entry stays valid; bounds how long a revoked
+                token keeps working on open connections' reconnects
+            max_entries (int): Entries kept before the least recently used is dropped
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # token -> (expiry, AuthenticatedUser or None)
+
+    def get(self, token, now=None):
+        """
+        Look up a token.
+
+        Returns:
+            tuple: (found, user) where user is None for a token known to be invalid
+        """
+        now = time.monotonic() if now is None else now
+        entry = self.entries.get(token)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            del self.entries[token]
+            return False, None
+        self.entries.move_to_end(token)
+        return True, entry[1]
+
+    def put(self, token, user, now=None):
+        """Remember the result of a lookup."""
+        now = time.monotonic() if now is None else now
+        self.entries[token] = (now + self.ttl, user)
+        self.entries.move_to_end(token)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class AsyncConnectionPool:
+    """
+    Fixed-size pool of psycopg async connections, opened on first use.
+
+    Connections that fail are discarded and replaced by the next user.
+    """
+
+    def __init__(self, conninfo, size):
+        """
+        Initialize the pool.
+
+        Args:
+            conninfo (str): libpq connection string
+            size (int): Most connections open at once
+        """
+        self.conninfo = conninfo
+        self.size = size
+        self.idle = []
+        self.slots = None  # Semaphore, created on the event loop using the pool
+
+    async def fetchone(self, query, params):
+        """Run a query on a pooled connection and return its first row."""
+        import psycopg
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.size)
+        async with self.slots:
+            conn = self.idle.pop() if self.idle else await psycopg.AsyncConnection.connect(
+                self.conninfo, autocommit=True)
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+                    row = await cursor.fetchone()
+            except Exception:
+                await conn.close()
+                raise
+            self.idle.append(conn)
+            return row
+
+
+class TokenAuthenticator:
+    """Resolves tokens to users through the cache, a pooled connection or the ORM."""
+
+    def __init__(self, cache, pool=None, query=None):
+        """
+        Initialize the authenticator.
+
+        Args:
+            cache (TokenCache): Cache of recent lookups
+            pool (AsyncConnectionPool, optional): Pool used for lookups; without
+                one they go through the Django ORM
+            query: SQL run on the pool, selecting (user ID, username) by token key
+        """
+        self.cache = cache
+        self.pool = pool
+        self.query = query
+        self.inflight = {}  # token -> Future of a lookup in progress
+
+    async def authenticate(self, token):
+        """
+        Get the user owning a token.
+
+        Args:
+            token (str): DRF token key
+
+        Returns:
+            AuthenticatedUser: The user, or None if the token is not valid
+        """
+        found, user = self.cache.get(token)
+        if found:
+            return user
+        lookup = self.inflight.get(token)
+        if lookup is None:
+            lookup = self.inflight[token] = asyncio.ensure_future(self._lookup(token))
+            lookup.add_done_callback(lambda _: self.inflight.pop(token, None))
+        return await asyncio.shield(lookup)
+
+    async def _lookup(self, token):
+        if self.pool is not None:
+            row = await self.pool.fetchone(self.query, (token,))
+        else:
+            row = await _orm_lookup(token)
+        user = AuthenticatedUser(*row) if row else None
+        self.cache.put(token, user)
+        return user
+
+
+def _active_user_filter(user_model):
+    """Whether the user model stores is_active, so inactive users' tokens can be refused."""
+    return any(field.name == 'is_active' for field in user_model._meta.concrete_fields)
+
+
+async def _orm_lookup(token):
+    from channels.db import database_sync_to_async
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+
+    @database_sync_to_async
+    def lookup():
+        user_model = get_user_model()
+        tokens = Token.objects.filter(key=token)
+        if _active_user_filter(user_model):
+            tokens = tokens.filter(user__is_active=True)
+        row = tokens.values_list('user_id', f'user__{user_model.USERNAME_FIELD}').first()
+        return tuple(row) if row else None
+    return await lookup()
+
+
+def token_query():
+    """
+    Build the SQL selecting the user owning a DRF token, as (user ID, username).
+
+    Table and column names come from the models, as the user model is swappable.
+    """
+    from django.contrib.auth import get_user_model
+    from psycopg import sql
+    from rest_framework.authtoken.models import Token
+    user_model = get_user_model()
+    user_meta, token_meta = user_model._meta, Token._meta
+    query = sql.SQL("SELECT u.{pk}, u.{name} FROM {tokens} t JOIN {users} u ON u.{pk} = t.{owner} WHERE t.{key} = %s").format(
+        pk=sql.Identifier(user_meta.pk.column),
+        name=sql.Identifier(user_meta.get_field(user_model.USERNAME_FIELD).column),
+        tokens=sql.Identifier(token_meta.db_table),
+        users=sql.Identifier(user_meta.db_table),
+        owner=sql.Identifier(token_meta.get_field('user').column),
+        key=sql.Identifier(token_meta.get_field('key').column),
+    )
+    if _active_user_filter(user_model):
+        query += sql.SQL(" AND u.{active}").format(active=sql.Identifier(user_meta.get_field('is_active').column))
+    return query
+
+
+def get_token_authenticator():
+    """Build the authenticator from settings, pooling connections when the database is Postgres."""
+    from django.conf import settings
+    database = settings.DATABASES['default']
+    pool = query = None
+    if 'postgresql' in database['ENGINE']:
+        from psycopg.conninfo import make_conninfo
+        conninfo = make_conninfo(
+            dbname=database.get('NAME') or None,
+            user=database.get('USER') or None,
+            password=database.get('PASSWORD') or None,
+            host=database.get('HOST') or None,
+            port=str(database['PORT']) if database.get('PORT') else None,
+        )
+        pool = AsyncConnectionPool(conninfo, settings.WEBSOCKET_AUTH_DB_POOL_SIZE)
+        query = token_query()
+    cache = TokenCache(settings.WEBSOCKET_AUTH_CACHE_TTL, settings.WEBSOCKET_AUTH_CACHE_SIZE)
+    return TokenAuthenticator(cache, pool, query)
+
+
+def token_from_scope(scope):
+    """Get the token a websocket handshake presents, or None."""
+    query = parse_qs(scope.get("query_string", b"").decode())
+    if query.get("auth_token"):
+        return query["auth_token"][0]
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, key = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "token" and key:
+                return key.strip()
+    return None
+
+
+class TokenAuthMiddleware:
+    """
+    ASGI middleware setting scope["auth_user"] for websocket connections.
+
+    With WEBSOCKET_REQUIRE_AUTH, handshakes without a valid token are refused
+    before reaching a consumer; otherwise they continue anonymously.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.authenticator = None
+
+    async def __call__(self, scope, receive, send):
+        from django.conf import settings
+        if scope["type"] != "websocket":
+            return await self.app(scope, receive, send)
+        if self.authenticator is None:
+            self.authenticator = get_token_authenticator()
+        token = token_from_scope(scope)
+        user = None
+        if token:
+            try:
+                user = await self.authenticator.authenticate(token)
+            except Exception as e:
+                log.error("websocket_auth_failed", error=str(e))
+        if user is None and settings.WEBSOCKET_REQUIRE_AUTH:
+            # Closing before accepting rejects the handshake
+            await receive()
+            await send({"type": "websocket.close", "code": AUTH_FAILED_CLOSE_CODE})
+            return
+        scope = dict(scope, auth_user=user)
+        return await self.app(scope, receive, send)
@@ -1,5 +1,5 @@
 // src/components/Room/Card.tsx
-import React from 'react';
+import React, { memo } from 'react';
 import { type Card as CardType } from '../../../types';
 
 interface CardProps {
@@ -72,4 +72,5 @@ const Card = ({
     );
 };
 
-export default Card;
\ No newline at end of file
+// Cards are rendered by the dozen; one whose props are unchanged is not re-rendered
+export default memo(Card);
\ No newline at end of file
@@ -1,23 +1,35 @@
 // src/components/Room/GameBoard.tsx
-import React, { useState } from 'react';
-import { type AskCardMove, type Card as CardType, type ClaimSetMove, type LiteratureInGameAction, type LiteratureRoomState, type PassTurnMove } from '../../../types';
+import React, { useCallback, useState } from 'react';
+import { type AskCardMove, type Card as CardType, type ClaimSetMove, type LiteratureInGameAction, type PassTurnMove } from '../../../types';
+import useRoomState from '../../../hooks/useRoomState';
 import PlayerList from './PlayerList';
 import SetGrid from './SetGrid';
 import Card from './Card';
 import LastAsk from './LastAsk';
+import TurnClock from './TurnClock';
 import { ALL_CARDS, getPlayerName, getPlayerTeam, SET_NAMES } from '../../../utils/cardHelpers';
 
 interface InGameProps {
-    roomState: LiteratureRoomState;
     onLeaveRoom: () => void;
     onGameAction: (action: LiteratureInGameAction) => void;
 }
 
 const InGame: React.FC<InGameProps> = ({
-    roomState,
     onGameAction
 }) => {
-    const userId = roomState.receiverId;
+    // Each selection keeps its identity while that part of the state is unchanged
+    const userId = useRoomState(state => state.receiverId);
+    const hostId = useRoomState(state => state.hostId);
+    const connectedPlayers = useRoomState(state => state.connectedPlayers);
+    const disconnectedPlayers = useRoomState(state => state.disconnectedPlayers);
+    const version = useRoomState(state => state.version);
+    const turnTimeRemaining = useRoomState(state => state.turnTimeRemaining);
+    const players = useRoomState(state => state.game.players);
+    const currentPlayerId = useRoomState(state => state.game.currentPlayerId);
+    const claimedSets = useRoomState(state => state.game.claimedSets);
+    const scores = useRoomState(state => state.game.scores);
+    const lastAsk = useRoomState(state => state.game.lastAsk);
+    const allLegalMoves = useRoomState(state => state.game.legalMoves);
     const [selectedPlayer, setSelectedPlayer] = useState<string | null>(null);
     const [selectedCard, setSelectedCard] = useState<CardType | null>(null);
     const [selectedSet, setSelectedSet] = useState<number | null>(null);
@@ -35,7 +47,7 @@ const InGame: React.FC<InGameProps> = ({
         setSelectedCard(null);
     };
 
-    const onClaimSet = (): void => {
+    const onClaimSet = useCallback((): void => {
         if (!selectedSet) return;
 
         const moveData: ClaimSetMove = {
@@ -44,7 +56,7 @@ const InGame: React.FC<InGameProps> = ({
         };
         onGameAction(moveData);
         setSelectedSet(null);
-    };
+    }, [selectedSet, onGameAction]);
 
     const onPassTurn = (teammateId: string): void => {
         const moveData: PassTurnMove = {
@@ -59,56 +71,63 @@ const InGame: React.FC<InGameProps> = ({
         setSelectedCard(null);
         setSelectedSet(null);
     };
-    const currentPlayer = roomState.game.players.find(p => p.id === userId);
-    const isMyTurn = currentPlayer?.id === roomState.game.currentPlayerId;
+    const currentPlayer = players.find(p => p.id === userId);
+    const isMyTurn = currentPlayer?.id === currentPlayerId;
+    const legalMoves = isMyTurn ? allLegalMoves : null;
+    const canAsk = !!selectedPlayer && !!legalMoves?.askPlayers.includes(selectedPlayer);
     return (
         <div className="game-active">
             <div className="game-status">
                 <div className="turn-indicator">
-                    Current Turn: <strong>{getPlayerName(roomState.game.players, roomState.game.currentPlayerId!)}</strong> (Team {getPlayerTeam(roomState.game.players, roomState.game.currentPlayerId!)})
+                    Current Turn: <strong>{getPlayerName(players, currentPlayerId!)}</strong> (Team {getPlayerTeam(players, currentPlayerId!)})
                     {isMyTurn && <span className="your-turn"> - Your Turn!</span>}
+                    <TurnClock remaining={turnTimeRemaining} version={version} />
                 </div>
 
                 <div className="score">
-                    <div className="team1">Team 1: {roomState.game.scores[1]}</div>
-                    <div className="team2">Team 2: {roomState.game.scores[2]}</div>
+                    <div className="team1">Team 1: {scores[1]}</div>
+                    <div className="team2">Team 2: {scores[2]}</div>
                 </div>
             </div>
 
             <div className="last-action">
                 <LastAsk
-                    lastAsk={roomState.game.lastAsk}
-                    players={roomState.game.players}
+                    lastAsk={lastAsk}
+                    players={players}
                 />
             </div>
             <div className="game-board">
                 <div className="teams-panel">
                     <PlayerList
                         team={1}
-                        players={roomState.game.players}
+                        players={players}
                         userId={userId}
-                        currentPlayerId={roomState.game.currentPlayerId}
+                        currentPlayerId={currentPlayerId}
                         selectedPlayerId={selectedPlayer}
                         isPlaying={true}
                         currentUserTeam={currentPlayer?.team}
                         onSelectPlayer={setSelectedPlayer}
-                        roomState={roomState}
+                        hostId={hostId}
+                        connectedPlayers={connectedPlayers}
+                        disconnectedPlayers={disconnectedPlayers}
                     />
 
                     <PlayerList
                         team={2}
-                        players={roomState.game.players}
+                        players={players}
                         userId={userId}
-                        currentPlayerId={roomState.game.currentPlayerId}
+                        currentPlayerId={currentPlayerId}
                         selectedPlayerId={selectedPlayer}
                         isPlaying={true}
                         currentUserTeam={currentPlayer?.team}
                         onSelectPlayer={setSelectedPlayer}
-                        roomState={roomState}
+                        hostId={hostId}
+                        connectedPlayers={connectedPlayers}
+                        disconnectedPlayers={disconnectedPlayers}
                     />
                 </div>
                 <SetGrid
-                    claimedSets={roomState.game.claimedSets}
+                    claimedSets={claimedSets}
                     canClaimSets={isMyTurn}
                     selectedSet={selectedSet}
                     onSelectSet={setSelectedSet}
@@ -124,8 +143,8 @@ const InGame: React.FC<InGameProps> = ({
                                 <div className="pass-turn">
                                     <h4>Pass your turn to:</h4>
                                     <div className="teammate-options">
-                                        {roomState.game.players
-                                            .filter(p => p.team === currentPlayer?.team && p.id !== userId)
+                                        {players
+                                            .filter(p => legalMoves?.passTo.includes(p.id))
                                             .map(p => (
                                                 <button
                                                     key={p.id}
@@ -156,7 +175,7 @@ const InGame: React.FC<InGameProps> = ({
                 {isMyTurn && selectedPlayer && (
                     <div className="card-selection-overlay">
                         <div className="card-selection-dialog">
-                            <h3>Ask {getPlayerName(roomState.game.players, selectedPlayer)} for a card:</h3>
+                            <h3>Ask {getPlayerName(players, selectedPlayer)} for a card:</h3>
                             <div className="cards-selection-grid">
                                 {SET_NAMES.map((setName, index) => {
                                     const startIndex = index * 6;
@@ -170,7 +189,7 @@ const InGame: React.FC<InGameProps> = ({
                                                         card={card}
                                                         isSelected={selectedCard === card}
                                                         onSelect={setSelectedCard}
-                                                        disabled={currentPlayer?.hand?.includes(card)}
+                                                        disabled={!canAsk || !legalMoves?.askCards.includes(card)}
                                                     />
                                                 </div>
                                             ))}
@@ -182,7 +201,7 @@ const InGame: React.FC<InGameProps> = ({
                             <div className="dialog-actions">
                                 <button
                                     className="ask-button"
-                                    disabled={!selectedCard}
+                                    disabled={!canAsk || !selectedCard || !legalMoves?.askCards.includes(selectedCard)}
                                     onClick={onAskCard}
                                 >
                                     Ask for Card
@@ -1,5 +1,5 @@
 // src/components/Room/LastAction.tsx
-import React from 'react';
+import React, { memo } from 'react';
 import { type Ask, type Player } from '../../../types';
 import Card from './Card';
 import { getPlayerName } from '../../../utils/cardHelpers';
@@ -14,10 +14,10 @@ const LastAsk: React.FC<LastAskProps> = ({ players, lastAsk }) => {
     const askingPlayerName = getPlayerName(players, lastAsk.askingPlayerId);
     const askedPlayerName = getPlayerName(players, lastAsk.askedPlayerId);
     return <div className="action">
-        <strong>{askingPlayerName}</strong> asked <strong>{askedPlayerName}</strong> for {Card({ card: lastAsk.card, isSelected: false, onSelect: () => { } })}
+        <strong>{askingPlayerName}</strong> asked <strong>{askedPlayerName}</strong> for <Card card={lastAsk.card} />
         {lastAsk.success ? ' and got it!' : ' but they didn\'t have it.'}
     </div>
 
 };
 
-export default LastAsk;
\ No newline at end of file
+export default memo(LastAsk);
\ No newline at end of file
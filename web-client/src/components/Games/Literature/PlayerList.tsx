@@ -1,6 +1,6 @@
 // src/components/Room/PlayerList.tsx
-import React from 'react';
-import { type LiteraturePlayer, type RoomState } from '../../../types';
+import React, { memo } from 'react';
+import { type LiteraturePlayer } from '../../../types';
 
 interface PlayerListProps {
     team: 1 | 2;
@@ -14,9 +14,55 @@ interface PlayerListProps {
     isHost?: boolean;
     onMakeHost?: (playerId: string) => void;
     hostId?: string;
-    roomState?: RoomState
+    // Connection state is shown when given
+    connectedPlayers?: string[];
+    disconnectedPlayers?: string[];
 }
 
+interface PlayerRowProps {
+    player: LiteraturePlayer;
+    isCurrentUser: boolean;
+    isCurrentTurn: boolean;
+    isSelected: boolean;
+    isPlayerHost: boolean;
+    disconnected: boolean;
+    canBeSelected: boolean;
+    canMakeHost: boolean;
+    isPlaying: boolean;
+    onSelectPlayer: (playerId: string) => void;
+    onMakeHost?: (playerId: string) => void;
+}
+
+// A player whose object, flags and callbacks are unchanged is not re-rendered
+const PlayerRow = memo(({
+    player: p,
+    isCurrentUser,
+    isCurrentTurn,
+    isSelected,
+    isPlayerHost,
+    disconnected,
+    canBeSelected,
+    canMakeHost,
+    isPlaying,
+    onSelectPlayer,
+    onMakeHost,
+}: PlayerRowProps): React.JSX.Element => (
+    <li
+        className={`player ${isSelected ? 'selected' : ''} ${isCurrentUser ? 'you' : ''} ${isCurrentTurn ? 'current-turn' : ''} ${disconnected ? 'disconnected' : ''}`}
+        onClick={() => canBeSelected ? onSelectPlayer(p.id) : null}
+    >
+        {p.name} {isPlaying && `(${p.card_count} cards)`}
+        {isCurrentUser && <span className="you-badge">You</span>}
+        {isPlayerHost && <span className="host-badge">Host</span>}
+        {isCurrentTurn && <span className="current-turn-badge">← Current Turn</span>}
+        {canMakeHost && (
+            <button className="make-host-btn" onClick={() => onMakeHost?.(p.id)}>
+                Make Host
+            </button>
+        )}
+    </li>
+));
+
 const PlayerList: React.FC<PlayerListProps> = ({
     team,
     players,
@@ -28,10 +74,11 @@ const PlayerList: React.FC<PlayerListProps> = ({
     onSelectPlayer,
     isHost,
     onMakeHost,
-    roomState,
+    hostId = '',
+    connectedPlayers,
+    disconnectedPlayers,
 }) => {
     const teamPlayers = players.filter(p => p.team === team);
-    const hostId = roomState?.hostId || '';
     if (!teamPlayers.length) {
         return (
             <div className={`team-container team${team}`}>
@@ -47,26 +94,21 @@ const PlayerList: React.FC<PlayerListProps> = ({
             <ul>
                 {teamPlayers.map(p => {
                     const isCurrentUser = p.id === userId;
-                    const isCurrentTurn = p.id === currentPlayerId;
-                    const isSelected = p.id === selectedPlayerId;
-                    const canBeSelected = !isCurrentUser && p.team !== currentUserTeam && isPlaying;
-                    const disconnected = roomState && !(roomState?.connectedPlayers.includes(p.id));
                     return (
-                        <li
+                        <PlayerRow
                             key={p.id}
-                            className={`player ${isSelected ? 'selected' : ''} ${isCurrentUser ? 'you' : ''} ${isCurrentTurn ? 'current-turn' : ''} ${disconnected ? 'disconnected' : ''}`}
-                            onClick={() => canBeSelected ? onSelectPlayer(p.id) : null}
-                        >
-                            {p.name} {isPlaying && `(${p.card_count} cards)`}
-                            {isCurrentUser && <span className="you-badge">You</span>}
-                            {p.id === hostId && <span className="host-badge">Host</span>}
-                            {isCurrentTurn && <span className="current-turn-badge">← Current Turn</span>}
-                            {isHost && !isCurrentUser && !isPlaying && (
-                                <button className="make-host-btn" onClick={() => onMakeHost?.(p.id)}>
-                                    Make Host
-                                </button>
-                            )}
-                        </li>
+                            player={p}
+                            isCurrentUser={isCurrentUser}
+                            isCurrentTurn={p.id === currentPlayerId}
+                            isSelected={p.id === selectedPlayerId}
+                            isPlayerHost={p.id === hostId}
+                            disconnected={!!connectedPlayers && (!connectedPlayers.includes(p.id) || !!disconnectedPlayers?.includes(p.id))}
+                            canBeSelected={!isCurrentUser && p.team !== currentUserTeam && isPlaying}
+                            canMakeHost={!!isHost && !isCurrentUser && !isPlaying}
+                            isPlaying={isPlaying}
+                            onSelectPlayer={onSelectPlayer}
+                            onMakeHost={onMakeHost}
+                        />
                     );
                 })}
             </ul>
@@ -74,4 +116,4 @@ const PlayerList: React.FC<PlayerListProps> = ({
     );
 };
 
-export default PlayerList;
\ No newline at end of file
+export default memo(PlayerList);
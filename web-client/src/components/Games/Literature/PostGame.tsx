@@ -1,32 +1,32 @@
 // src/components/Room/GameOver.tsx
 import React from 'react';
-import { type LiteratureRoomState } from '../../../types';
+import useRoomState from '../../../hooks/useRoomState';
 import { SET_NAMES } from '../../../utils/cardHelpers';
 
 interface PostGameProps {
-    roomState: LiteratureRoomState;
     onLeaveRoom: () => void;
 }
 
 const PostGame: React.FC<PostGameProps> = ({
-    roomState,
     onLeaveRoom
 }) => {
+    const roomId = useRoomState(state => state.room_id);
+    const game = useRoomState(state => state.game);
     return (
         <div className="game-ended">
-            <h2>Game Over - Room: {roomState.room_id}</h2>
+            <h2>Game Over - Room: {roomId}</h2>
 
             <div className="game-result">
                 <h3>Final Score</h3>
                 <div className="score">
-                    <div className="team1">Team 1: {roomState.game.scores[1]}</div>
-                    <div className="team2">Team 2: {roomState.game.scores[2]}</div>
+                    <div className="team1">Team 1: {game.scores[1]}</div>
+                    <div className="team2">Team 2: {game.scores[2]}</div>
                 </div>
 
                 <h3>Winner</h3>
                 <div className="winner">
-                    {roomState.game.winningTeam ?
-                        `Team ${roomState.game.winningTeam} wins!` :
+                    {game.winningTeam ?
+                        `Team ${game.winningTeam} wins!` :
                         "It's a tie!"}
                 </div>
             </div>
@@ -36,7 +36,7 @@ const PostGame: React.FC<PostGameProps> = ({
                 <div className="sets-grid">
                     {SET_NAMES.map((name, index) => {
                         const setNumber = index + 1;
-                        const team = roomState.game.claimedSets[setNumber];
+                        const team = game.claimedSets[setNumber];
                         return (
                             <div
                                 key={setNumber}
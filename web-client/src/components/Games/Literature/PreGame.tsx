@@ -1,29 +1,35 @@
 import React from 'react';
-import type { ChangeTeamAction, LiteraturePreGameAction, LiteratureRoomState } from '../../../types';
+import type { ChangeTeamAction, LiteraturePreGameAction } from '../../../types';
+import useRoomState from '../../../hooks/useRoomState';
 import PlayerList from './PlayerList';
 
 interface PreGameProps {
-    roomState: LiteratureRoomState;
     onGameAction: (action: LiteraturePreGameAction) => void;
     onChangeHost: (hostId: string) => void;
     onStartGame: () => void;
+    onAddBot: () => void;
 }
 
+// Players cannot be selected before the game
+const noSelection = (): void => { };
+
 const PreGame: React.FC<PreGameProps> = ({
-    roomState,
     onGameAction,
     onChangeHost,
     onStartGame,
+    onAddBot,
 }) => {
-    const userId = roomState.receiverId;
-    const hostId = roomState.hostId;
+    const userId = useRoomState(state => state.receiverId);
+    const hostId = useRoomState(state => state.hostId);
+    const players = useRoomState(state => state.game.players);
     const isHost = userId === hostId;
-    const currentPlayer = roomState.game.players.find(p => p.id === userId);
+    const currentPlayer = players.find(p => p.id === userId);
     const currentTeam = currentPlayer ? currentPlayer.team : undefined;
-    const team1PlayerCount = roomState.game.players.filter(p => p.team === 1).length;
-    const team2PlayerCount = roomState.game.players.filter(p => p.team === 2).length;
+    const team1PlayerCount = players.filter(p => p.team === 1).length;
+    const team2PlayerCount = players.filter(p => p.team === 2).length;
 
     const canStartGame = team1PlayerCount === 3 && team2PlayerCount === 3;
+    const canAddBot = players.length < 6;
 
     const onChangeTeam = (team: 1 | 2): void => {
         const action: ChangeTeamAction = {
@@ -61,6 +67,15 @@ const PreGame: React.FC<PreGameProps> = ({
                         Start Game
                     </button>
                 )}
+                {isHost && (
+                    <button
+                        onClick={onAddBot}
+                        disabled={!canAddBot}
+                        className="add-bot-btn"
+                    >
+                        Add Bot
+                    </button>
+                )}
             </div>
             <div className="team-selection">
                 {currentTeam !== 1 && (
@@ -78,13 +93,13 @@ const PreGame: React.FC<PreGameProps> = ({
             <div className="teams-container">
                 <PlayerList
                     team={1}
-                    players={roomState.game.players}
+                    players={players}
                     userId={userId}
                     currentPlayerId={null}
                     selectedPlayerId={null}
                     isPlaying={false}
                     currentUserTeam={currentTeam}
-                    onSelectPlayer={() => { }}
+                    onSelectPlayer={noSelection}
                     isHost={isHost}
                     onMakeHost={onChangeHost}
                     hostId={hostId}
@@ -92,13 +107,13 @@ const PreGame: React.FC<PreGameProps> = ({
 
                 <PlayerList
                     team={2}
-                    players={roomState.game.players}
+                    players={players}
                     userId={userId}
                     currentPlayerId={null}
                     selectedPlayerId={null}
                     isPlaying={false}
                     currentUserTeam={currentTeam}
-                    onSelectPlayer={() => { }}
+                    onSelectPlayer={noSelection}
                     isHost={isHost}
                     onMakeHost={onChangeHost}
                     hostId={hostId}
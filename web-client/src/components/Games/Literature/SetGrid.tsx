@@ -1,5 +1,5 @@
 // src/components/Room/SetGrid.tsx
-import React from 'react';
+import React, { memo } from 'react';
 import { SET_NAMES } from '../../../utils/cardHelpers';
 
 interface SetGridProps {
@@ -52,4 +52,4 @@ const SetGrid: React.FC<SetGridProps> = ({
     );
 };
 
-export default SetGrid;
\ No newline at end of file
+export default memo(SetGrid);
\ No newline at end of file
@@ -0,0 +1,29 @@
+import React, { memo, useEffect, useState } from 'react';
+
+interface TurnClockProps {
+    remaining: number | null;
+    version: number;
+}
+
+/**
+ * Counts down the time left for the current move.
+ * The server sends the remaining time with every state; the clock restarts from it.
+ */
+const TurnClock: React.FC<TurnClockProps> = ({ remaining, version }) => {
+    const [seconds, setSeconds] = useState(remaining);
+
+    useEffect(() => {
+        setSeconds(remaining);
+        if (remaining === null) return;
+        const deadline = Date.now() + remaining * 1000;
+        const timer = setInterval(() => {
+            setSeconds(Math.max((deadline - Date.now()) / 1000, 0));
+        }, 250);
+        return () => clearInterval(timer);
+    }, [remaining, version]);
+
+    if (seconds === null) return null;
+    return <span className="turn-clock"> ({Math.ceil(seconds)}s left)</span>;
+};
+
+export default memo(TurnClock);
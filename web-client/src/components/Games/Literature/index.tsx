@@ -2,23 +2,23 @@ import { type JSX } from 'react';
 import PreGame from './PreGame';
 import PostGame from './PostGame';
 import InGame from './InGame';
-import type { LiteratureRoomState, RoomActions } from '../../../types';
+import useRoomState from '../../../hooks/useRoomState';
+import type { RoomActions } from '../../../types';
 interface LiteratureProps {
-    roomState: LiteratureRoomState;
     roomActions: RoomActions;
 }
 
 const Game = (props: LiteratureProps): JSX.Element => {
-    const userId = props.roomState.receiverId;
-    const gameStarted = props.roomState.game.state === 'in_progress';
-    const gameEnded = props.roomState.game.state === 'ended';
+    const userId = useRoomState(state => state.receiverId);
+    const gameState = useRoomState(state => state.game.state);
+    const gameStarted = gameState === 'in_progress';
+    const gameEnded = gameState === 'ended';
     if (!userId) {
         return <div className="error">Error: User ID not found in room state.</div>;
     }
     if (gameEnded) {
         return (
             <PostGame
-                roomState={props.roomState}
                 onLeaveRoom={props.roomActions.onLeaveRoom}
             />
         );
@@ -26,7 +26,6 @@ const Game = (props: LiteratureProps): JSX.Element => {
     if (gameStarted) {
         return (
             <InGame
-                roomState={props.roomState}
                 onLeaveRoom={props.roomActions.onLeaveRoom}
                 onGameAction={props.roomActions.onInGameAction}
             />
@@ -34,10 +33,10 @@ const Game = (props: LiteratureProps): JSX.Element => {
     }
     return (
         <PreGame
-            roomState={props.roomState}
             onGameAction={props.roomActions.onPreGameAction}
             onChangeHost={props.roomActions.onChangeHost}
             onStartGame={props.roomActions.onStartGame}
+            onAddBot={props.roomActions.onAddBot}
         />
     );
 
@@ -1,19 +1,18 @@
-import { type JSX } from 'react';
+import { memo, type JSX } from 'react';
 import LiteratureGame from './Literature';
-import type { RoomActions, RoomState } from '../../types';
+import useRoomState from '../../hooks/useRoomState';
+import type { RoomActions } from '../../types';
 
 export interface GameProps {
-    roomState: RoomState;
     roomActions: RoomActions;
 }
 
 const Game = (props: GameProps): JSX.Element => {
-    const gameType = props.roomState.type;
+    const gameType = useRoomState(state => state.type);
     switch (gameType) {
         case 'literature':
             return (
                 <LiteratureGame
-                    roomState={props.roomState}
                     roomActions={props.roomActions}
                 />
             );
@@ -22,4 +21,5 @@ const Game = (props: GameProps): JSX.Element => {
     }
 }
 
-export default Game;
\ No newline at end of file
+// Re-rendered only through its room state selections, not with the rest of the room
+export default memo(Game);
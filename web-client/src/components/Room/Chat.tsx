@@ -0,0 +1,55 @@
+// src/components/Room/Chat.tsx
+import React, { memo, useState } from 'react';
+import type { ChatMessage } from '../../types';
+
+// Longest message the server accepts
+export const CHAT_MAX_LENGTH = 200;
+// Sent as a message with one click
+const EMOTES = ['👍', '😂', '😮', '😢', '🎉', '🤔'];
+
+interface ChatProps {
+    messages: ChatMessage[];
+    userId: string | undefined;
+    onSend: (text: string) => void;
+}
+
+const Chat: React.FC<ChatProps> = ({ messages, userId, onSend }) => {
+    const [draft, setDraft] = useState('');
+
+    const onSubmit = (event: React.FormEvent): void => {
+        event.preventDefault();
+        const text = draft.trim();
+        if (!text) return;
+        onSend(text);
+        setDraft('');
+    };
+
+    return (
+        <div className="chat">
+            <h3>Chat</h3>
+            <ul className="chat-messages">
+                {messages.map(m => (
+                    <li key={m.id} className={m.playerId === userId ? 'you' : ''}>
+                        <strong>{m.name}:</strong> {m.text}
+                    </li>
+                ))}
+            </ul>
+            <div className="chat-emotes">
+                {EMOTES.map(emote => (
+                    <button key={emote} onClick={() => onSend(emote)}>{emote}</button>
+                ))}
+            </div>
+            <form className="chat-input" onSubmit={onSubmit}>
+                <input
+                    value={draft}
+                    maxLength={CHAT_MAX_LENGTH}
+                    placeholder="Say something..."
+                    onChange={event => setDraft(event.target.value)}
+                />
+                <button type="submit" disabled={!draft.trim()}>Send</button>
+            </form>
+        </div>
+    );
+};
+
+export default memo(Chat);
@@ -1,21 +1,29 @@
 // src/components/Room/index.tsx
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef, useSyncExternalStore } from 'react';
 import useWebSocket from '../../hooks/useWebSocket';
+import { applyRoomEvents, createRoomStore, RoomStoreContext } from '../../store/roomStore';
 import type {
-    RoomState,
+    ChatActionPayload,
+    ChatMessage,
     WebSocketMessage,
     RoomActions,
     StartGameActionPayload,
+    AddBotActionPayload,
     RemovePlayerActionPayload,
     ChangeHostActionPayload,
     InGameAction,
     InGameActionPayload,
     PreGameAction,
     PreGameActionPayload,
+    RoomActionPayload,
 } from '../../types';
 import ErrorMessage from '../ErrorMessage';
+import Chat from './Chat';
 import './Room.css';
 import Game from '../Games';
+// Chat messages kept on screen, as many as the server keeps for late joiners
+const CHAT_HISTORY_SIZE = 50;
+
 interface RoomProps {
     roomId: string;
     userToken: number;
@@ -24,12 +32,36 @@ interface RoomProps {
 }
 
 const Room: React.FC<RoomProps> = ({ roomId, userToken, username, onLeaveRoom }) => {
-    const [roomState, setRoomState] = useState<RoomState | null>(null);
+    // Components select the parts of the state they show from the store
+    const [store] = useState(createRoomStore);
+    const hasState = useSyncExternalStore(store.subscribe, () => store.getState() !== null);
     const [errorMessage, setErrorMessage] = useState<string | null>(null);
+    // Kept apart from the room store so chat never re-renders the game
+    const [chatMessages, setChatMessages] = useState<ChatMessage[]>([]);
 
     const handleMessage = useCallback((data: WebSocketMessage): void => {
         if (data.success) {
-            setRoomState(data.currentState);
+            if ('ack' in data) {
+                // Applied; the resulting state arrives with the room broadcast
+            } else if ('chat' in data) {
+                // The history sent after a join can repeat messages already received
+                const received = data.chat;
+                setChatMessages((messages) => {
+                    const seen = new Set(messages.map(m => m.id));
+                    const added = received.filter(m => !seen.has(m.id));
+                    return added.length ? [...messages, ...added].slice(-CHAT_HISTORY_SIZE) : messages;
+                });
+            } else if ('resumed' in data) {
+                // Missed events apply only to the state they follow; anything else needs a full state
+                const held = store.getState();
+                if (held && held.publicHash === data.baseHash) {
+                    store.setState(applyRoomEvents(held, data));
+                } else {
+                    sendMessageRef.current?.({ type: 'sync' });
+                }
+            } else {
+                store.setState(data.currentState);
+            }
         }
         else {
             setErrorMessage(data.error);
@@ -37,18 +69,19 @@ const Room: React.FC<RoomProps> = ({ roomId, userToken, username, onLeaveRoom })
                 onLeaveRoom();
             }
         }
-    }, [onLeaveRoom]);
+    }, [onLeaveRoom, store]);
+
+    const sendMessageRef = useRef<((data: RoomActionPayload) => void) | null>(null);
 
     const { status, error, sendMessage, closeConnection } = useWebSocket(
         roomId,
         { userToken, username },
         handleMessage
     );
+    sendMessageRef.current = sendMessage;
 
     const displayError = error || errorMessage;
 
-    const userId = roomState?.receiverId;
-
     useEffect(() => {
         if (errorMessage) {
             const timer = setTimeout(() => setErrorMessage(null), 5000);
@@ -56,57 +89,74 @@ const Room: React.FC<RoomProps> = ({ roomId, userToken, username, onLeaveRoom })
         }
     }, [errorMessage]);
 
-    const handleStartGame = (): void => {
+    // Stable actions let memoized components skip re-rendering
+    const handleStartGame = useCallback((): void => {
         const payload: StartGameActionPayload = {
             type: 'start_game',
         };
         sendMessage(payload);
-    };
+    }, [sendMessage]);
+
+    const handleAddBot = useCallback((): void => {
+        const payload: AddBotActionPayload = {
+            type: 'add_bot',
+        };
+        sendMessage(payload);
+    }, [sendMessage]);
 
-    const handleLeaveRoom = (): void => {
+    const handleLeaveRoom = useCallback((): void => {
         const payload: RemovePlayerActionPayload = {
             type: 'remove_player',
-            player_id: userId!,
+            player_id: store.getState()!.receiverId,
         };
         sendMessage(payload);
 
         closeConnection();
         onLeaveRoom();
-    };
+    }, [sendMessage, closeConnection, onLeaveRoom, store]);
 
-    const handleChangeHost = (newHostId: string): void => {
+    const handleChangeHost = useCallback((newHostId: string): void => {
         const payload: ChangeHostActionPayload = {
             type: 'change_host',
             new_host_id: newHostId,
         };
         sendMessage(payload);
-    };
+    }, [sendMessage]);
 
-    const handleInGameAction = (action: InGameAction): void => {
+    const handleInGameAction = useCallback((action: InGameAction): void => {
         const payload: InGameActionPayload = {
             type: 'in_game_action',
             in_game_action: action
         };
         sendMessage(payload);
-    }
+    }, [sendMessage]);
 
-    const handlePreGameAction = (action: PreGameAction): void => {
+    const handlePreGameAction = useCallback((action: PreGameAction): void => {
         const payload: PreGameActionPayload = {
             type: 'pre_game_action',
             pre_game_action: action
         }
         sendMessage(payload);
-    }
+    }, [sendMessage]);
+
+    const handleSendChat = useCallback((text: string): void => {
+        const payload: ChatActionPayload = {
+            type: 'chat',
+            text,
+        };
+        sendMessage(payload);
+    }, [sendMessage]);
 
-    const roomActions: RoomActions = {
+    const roomActions: RoomActions = useMemo(() => ({
         onStartGame: handleStartGame,
+        onAddBot: handleAddBot,
         onLeaveRoom: handleLeaveRoom,
         onChangeHost: handleChangeHost,
         onInGameAction: handleInGameAction,
         onPreGameAction: handlePreGameAction
-    };
+    }), [handleStartGame, handleAddBot, handleLeaveRoom, handleChangeHost, handleInGameAction, handlePreGameAction]);
 
-    if (status === 'connecting' || !roomState) {
+    if (status === 'connecting' || !hasState) {
 
         return <>
             {errorMessage && <ErrorMessage message={displayError} />}<div className="loading">Connecting to room {roomId}...</div>        <div><button onClick={onLeaveRoom} className="leave-btn">Leave Room</button></div></>;
@@ -119,7 +169,10 @@ const Room: React.FC<RoomProps> = ({ roomId, userToken, username, onLeaveRoom })
             <div><button onClick={onLeaveRoom} className="leave-btn">Leave Room</button></div>
         </div>
 
-        <Game roomActions={roomActions} roomState={roomState} />
+        <RoomStoreContext.Provider value={store}>
+            <Game roomActions={roomActions} />
+        </RoomStoreContext.Provider>
+        <Chat messages={chatMessages} userId={store.getState()?.receiverId} onSend={handleSendChat} />
     </div>
 };
 
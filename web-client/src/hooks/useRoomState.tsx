@@ -0,0 +1,34 @@
+// src/hooks/useRoomState.tsx
+import { useContext, useSyncExternalStore } from 'react';
+import { RoomStoreContext, type RoomStore } from '../store/roomStore';
+import type { RoomState } from '../types';
+
+/**
+ * Returns the store of the room being rendered
+ *
+ * @returns The store provided by Room
+ */
+export const useRoomStore = (): RoomStore => {
+    const store = useContext(RoomStoreContext);
+    if (!store) throw new Error('useRoomStore must be used inside a room');
+    return store;
+};
+
+/**
+ * Subscribes to part of the room state
+ *
+ * The component re-renders only when the selected value changes identity.
+ * Parts of the state that did not change keep their identity between updates,
+ * so a selector should return a part of the state or a primitive rather than
+ * build a new object.
+ *
+ * @param selector - Picks the value the component needs from the state
+ * @returns The selected value
+ */
+const useRoomState = <T,>(selector: (state: RoomState) => T): T => {
+    const store = useRoomStore();
+    // Components using the state are only rendered once Room has received one
+    return useSyncExternalStore(store.subscribe, () => selector(store.getState()!));
+};
+
+export default useRoomState;
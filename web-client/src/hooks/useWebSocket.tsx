@@ -4,6 +4,19 @@ import type { WebSocketMessage, RoomActionPayload } from '../types';
 
 type WebSocketStatus = 'connecting' | 'open' | 'closed' | 'error';
 
+// Delay before reconnecting after the connection drops unexpectedly
+const RECONNECT_DELAY_MS = 1000;
+// Server the client connects to until a room moves elsewhere
+const DEFAULT_HOST = 'localhost:8000';
+// Close code sent by the server when the room moved to another server
+const ROOM_MOVED_CLOSE_CODE = 4001;
+// Close code sent by an overloaded server; the client retries after the advertised delay
+const TRY_AGAIN_LATER_CLOSE_CODE = 1013;
+// Close code telling the server the player left, so their seat is freed at once
+const LEAVE_CLOSE_CODE = 1000;
+// localStorage key of the REST API token sent with the websocket handshake
+const AUTH_TOKEN_KEY = 'authToken';
+
 interface UseWebSocketResult {
     status: WebSocketStatus;
     error: string | null;
@@ -27,6 +40,14 @@ const useWebSocket = (
     const [status, setStatus] = useState<WebSocketStatus>('closed');
     const [error, setError] = useState<string | null>(null);
     const wsRef = useRef<WebSocket | null>(null);
+    const lastVersionRef = useRef<number | null>(null);
+    const hostRef = useRef(DEFAULT_HOST);
+    const retryAfterRef = useRef(0);
+    // Actions are numbered from the clock so numbers keep increasing across page reloads
+    const seqRef = useRef(Date.now());
+    // Actions sent but not yet acknowledged, resent in order after a reconnect
+    const pendingRef = useRef(new Map<number, string>());
+    const [reconnectCount, setReconnectCount] = useState(0);
     const { userToken, username } = userInfo;
     // Connect to WebSocket
     useEffect(() => {
@@ -38,17 +59,27 @@ const useWebSocket = (
             wsRef.current = null;
         }
 
-        const url = `ws://localhost:8000/ws/room/${roomId}/${userToken}/${encodeURIComponent(username)}/`;
+        const params = new URLSearchParams();
+        const lastVersion = lastVersionRef.current;
+        if (lastVersion !== null) params.set('last_version', String(lastVersion));
+        // REST API token of a signed-in user; the server then seats them by account
+        const authToken = localStorage.getItem(AUTH_TOKEN_KEY);
+        if (authToken) params.set('auth_token', authToken);
+        const query = params.size ? `?${params}` : '';
+        const url = `ws://${hostRef.current}/ws/room/${roomId}/${userToken}/${encodeURIComponent(username)}/${query}`;
         setStatus('connecting');
         console.log(`Opening WebSocket connection to room ${roomId} as user ${userToken}`);
 
         const ws = new WebSocket(url);
         wsRef.current = ws;
+        let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
 
         ws.onopen = () => {
             console.log(`Connected to room ${roomId}`);
             setStatus('open');
             setError(null);
+            // The server answers retransmissions it already applied without applying them again
+            pendingRef.current.forEach((message) => ws.send(message));
         };
 
         ws.onmessage = (event) => {
@@ -60,6 +91,24 @@ const useWebSocket = (
                 parsedData = event.data;
             }
 
+            if (!parsedData.success && parsedData.moved) {
+                // Follow the room to its new server; the seat is held there
+                hostRef.current = parsedData.moved;
+                return;
+            }
+
+            if (!parsedData.success && parsedData.retryAfter) {
+                retryAfterRef.current = parsedData.retryAfter;
+            }
+
+            if ('ack' in parsedData || 'nack' in parsedData) {
+                pendingRef.current.delete(parsedData.success ? parsedData.ack : parsedData.nack!);
+            }
+
+            if (parsedData.success && !('ack' in parsedData) && !('chat' in parsedData)) {
+                lastVersionRef.current = 'resumed' in parsedData ? parsedData.version : parsedData.currentState.version;
+            }
+
             if (onMessage) onMessage(parsedData);
         };
 
@@ -72,34 +121,53 @@ const useWebSocket = (
         ws.onclose = (event) => {
             console.log(`WebSocket for room ${roomId} closed:`, event);
             setStatus('closed');
-            if (!event.wasClean) {
+            if (event.code === ROOM_MOVED_CLOSE_CODE) {
+                setReconnectCount((count) => count + 1);
+            } else if (event.code === TRY_AGAIN_LATER_CLOSE_CODE) {
+                reconnectTimer = setTimeout(() => setReconnectCount((count) => count + 1),
+                    (retryAfterRef.current || 1) * 1000);
+            } else if (!event.wasClean) {
                 setError('Connection closed unexpectedly');
+                // Resume the seat while the server still holds it
+                reconnectTimer = setTimeout(() => setReconnectCount((count) => count + 1), RECONNECT_DELAY_MS);
             }
         };
 
         // Cleanup on unmount or room/user change
         return () => {
             console.log(`Cleaning up WebSocket for room ${roomId}`);
-            ws.close();
+            clearTimeout(reconnectTimer);
+            ws.onclose = null;
+            ws.close(LEAVE_CLOSE_CODE);
             wsRef.current = null;
         };
-    }, [roomId, userToken, username, onMessage]);
+    }, [roomId, userToken, username, onMessage, reconnectCount]);
+
+    // A different room or user starts from a full snapshot
+    useEffect(() => {
+        lastVersionRef.current = null;
+        hostRef.current = DEFAULT_HOST;
+        pendingRef.current.clear();
+    }, [roomId, userToken]);
 
     // Send message method
     const sendMessage = useCallback((data: RoomActionPayload) => {
-        if (!wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) {
+        if (!wsRef.current) {
             setError('WebSocket is not connected');
             return;
         }
 
-        const message = typeof data === 'string' ? data : JSON.stringify(data);
-        wsRef.current.send(message);
+        const seq = ++seqRef.current;
+        const message = JSON.stringify({ ...data, seq });
+        pendingRef.current.set(seq, message);
+        // While reconnecting the action waits in pendingRef and is sent once the socket opens
+        if (wsRef.current.readyState === WebSocket.OPEN) wsRef.current.send(message);
     }, []);
 
     // Close connection method
     const closeConnection = useCallback(() => {
         if (wsRef.current) {
-            wsRef.current.close();
+            wsRef.current.close(LEAVE_CLOSE_CODE);
             wsRef.current = null;
             setStatus('closed');
         }
@@ -21,9 +21,9 @@ export const generateRandomUserId = (): number => {
 };
 
 export const listRooms = async (): Promise<string[]> => {
+    // A simple GET (no preflight); the browser revalidates its cached copy with the ETag
     const response = await fetch(`${API_BASE_URL}/games/list-rooms`, {
         method: "GET",
-        headers: { "Content-Type": "application/json" },
     });
 
     if (!response.ok) {
@@ -0,0 +1,120 @@
+// src/store/roomStore.ts
+import { createContext } from 'react';
+import type { RoomState, WebSocketMessageResumed } from '../types';
+
+type Listener = () => void;
+
+export interface RoomStore {
+    getState: () => RoomState | null;
+    setState: (next: RoomState) => void;
+    subscribe: (listener: Listener) => () => void;
+}
+
+const isPlainObject = (value: unknown): value is Record<string, unknown> =>
+    typeof value === 'object' && value !== null && Object.getPrototypeOf(value) === Object.prototype;
+
+/**
+ * Returns `next`, reusing every part of `prev` that is deeply equal to it.
+ *
+ * Unchanged players, hands, sets and so on keep their referential identity
+ * across states, so memoized components and selectors can compare them with ===.
+ * If nothing changed at all, `prev` itself is returned.
+ *
+ * @param prev - The value currently held
+ * @param next - The freshly parsed value
+ * @returns A value equal to `next` sharing as much as possible with `prev`
+ */
+export const replaceEqualDeep = <T,>(prev: unknown, next: T): T => {
+    if (prev === next) return next;
+    if (Array.isArray(prev) && Array.isArray(next)) {
+        const merged = next.map((item, i) => replaceEqualDeep(prev[i], item));
+        const unchanged = merged.length === prev.length && merged.every((item, i) => item === prev[i]);
+        return (unchanged ? prev : merged) as T;
+    }
+    if (isPlainObject(prev) && isPlainObject(next)) {
+        const merged: Record<string, unknown> = {};
+        let unchanged = Object.keys(prev).length === Object.keys(next).length;
+        for (const key of Object.keys(next)) {
+            merged[key] = replaceEqualDeep(prev[key], next[key]);
+            if (merged[key] !== prev[key] || !(key in prev)) unchanged = false;
+        }
+        return (unchanged ? prev : merged) as T;
+    }
+    return next;
+};
+
+/**
+ * Applies the events of a resume message to the state it was sent for.
+ *
+ * Events carry only public fields; the receiver's own hand and legal moves
+ * come with the message. The caller checks that the held state's publicHash
+ * is the message's baseHash first, otherwise the result would be wrong.
+ *
+ * @param prev - The state held when the connection dropped
+ * @param resumed - The resume message
+ * @returns The state at the message's version
+ */
+export const applyRoomEvents = (prev: RoomState, resumed: WebSocketMessageResumed): RoomState => {
+    const room = { ...prev };
+    const game = { ...prev.game };
+    for (const event of resumed.events) {
+        if (event.hostId !== undefined) room.hostId = event.hostId;
+        if (event.connectedPlayers) room.connectedPlayers = event.connectedPlayers;
+        if (event.disconnectedPlayers) room.disconnectedPlayers = event.disconnectedPlayers;
+        const { removed, joined, teams, counts } = event;
+        if (removed) game.players = game.players.filter(p => !removed.includes(p.id));
+        if (joined) {
+            game.players = [...game.players, ...joined.map(([id, name, team]) => ({ id, name, team, hand: [], card_count: 0 }))];
+        }
+        if (teams || counts) {
+            game.players = game.players.map(p => ({
+                ...p,
+                team: teams?.[p.id] ?? p.team,
+                card_count: counts?.[p.id] ?? p.card_count,
+            }));
+        }
+        if (event.state !== undefined) game.state = event.state;
+        if (event.currentPlayerId !== undefined) game.currentPlayerId = event.currentPlayerId;
+        if (event.lastAsk !== undefined) game.lastAsk = event.lastAsk;
+        if (event.claimedSets !== undefined) game.claimedSets = event.claimedSets;
+        if (event.scores !== undefined) game.scores = event.scores;
+        if (event.winningTeam !== undefined) game.winningTeam = event.winningTeam;
+    }
+    game.players = game.players.map(p => ({ ...p, hand: p.id === room.receiverId ? resumed.hand : [] }));
+    game.legalMoves = resumed.legalMoves;
+    return {
+        ...room,
+        game,
+        version: resumed.version,
+        stateHash: resumed.stateHash,
+        publicHash: resumed.publicHash,
+        turnTimeRemaining: resumed.turnTimeRemaining,
+    };
+};
+
+/**
+ * Holds the state of one room and notifies subscribers when it changes.
+ *
+ * Incoming states are merged into the held one with replaceEqualDeep, so a
+ * state that only changed one hand count changes only that player and the
+ * arrays and objects containing it.
+ */
+export const createRoomStore = (): RoomStore => {
+    let state: RoomState | null = null;
+    const listeners = new Set<Listener>();
+    return {
+        getState: () => state,
+        setState: (next) => {
+            const merged = replaceEqualDeep(state, next);
+            if (merged === state) return;
+            state = merged;
+            listeners.forEach((listener) => listener());
+        },
+        subscribe: (listener) => {
+            listeners.add(listener);
+            return () => { listeners.delete(listener); };
+        },
+    };
+};
+
+export const RoomStoreContext = createContext<RoomStore | null>(null);
@@ -8,6 +8,10 @@ export type StartGameActionPayload = {
     type: "start_game";
 };
 
+export type AddBotActionPayload = {
+    type: "add_bot";
+};
+
 export type RemovePlayerActionPayload = {
     type: "remove_player";
     player_id: string;
@@ -58,16 +62,29 @@ export type PassTurnMove = {
     teammate_id: string;
 };
 
+export type SyncActionPayload = {
+    type: "sync";
+};
+
+export type ChatActionPayload = {
+    type: "chat";
+    text: string;
+};
+
 export type RoomActionPayload =
     | AddPlayerActionPayload
     | StartGameActionPayload
+    | AddBotActionPayload
     | RemovePlayerActionPayload
     | ChangeHostActionPayload
     | InGameActionPayload
-    | PreGameActionPayload;
+    | PreGameActionPayload
+    | SyncActionPayload
+    | ChatActionPayload;
 
 export type RoomActions = {
     onStartGame: () => void;
+    onAddBot: () => void;
     onLeaveRoom: () => void;
     onChangeHost: (newHostId: string) => void;
     onInGameAction: (action: InGameAction) => void;
@@ -19,6 +19,14 @@ export type Ask = {
     success: boolean;
 };
 
+// Moves open to the receiver on their turn; any askPlayers/askCards pair is a legal ask
+export type LegalMoves = {
+    askPlayers: string[];
+    askCards: Card[];
+    claimSets: number[];
+    passTo: string[];
+};
+
 export interface GameState {
     gameId: string;
     state: "not_started" | "in_progress" | "ended";
@@ -31,6 +39,7 @@ export interface LiteratureGameState extends GameState {
     scores: Record<number, number>;
     winningTeam: 1 | 2 | null;
     lastAsk: Ask | null;
+    legalMoves: LegalMoves | null;
 }
 
 export type GameType = "literature";
@@ -39,7 +48,13 @@ export interface BaseRoomState {
     room_id: string;
     hostId: string;
     connectedPlayers: string[];
+    disconnectedPlayers: string[];
     receiverId: string;
+    version: number;
+    stateHash: string;
+    // Hash of the parts every client sees alike, checked before applying resume events
+    publicHash: string;
+    turnTimeRemaining: number | null;
 }
 
 export interface LiteratureRoomState extends BaseRoomState {
@@ -54,10 +69,68 @@ export type WebSocketMessageSuccess = {
     success: true;
 };
 
+// An applied action: who acted and the public fields it changed, under their room state names
+export type RoomEvent = {
+    version: number;
+    type: string;
+    actorId: string;
+    hostId?: string;
+    connectedPlayers?: string[];
+    disconnectedPlayers?: string[];
+    joined?: [string, string, 1 | 2][];
+    removed?: string[];
+    teams?: Record<string, 1 | 2>;
+    counts?: Record<string, number>;
+    state?: LiteratureGameState["state"];
+    currentPlayerId?: string | null;
+    lastAsk?: Ask | null;
+    claimedSets?: Record<number, 1 | 2>;
+    scores?: Record<number, number>;
+    winningTeam?: 1 | 2 | null;
+};
+
+// Events missed since the held version; they apply only to a state whose publicHash is baseHash
+export type WebSocketMessageResumed = {
+    resumed: true;
+    version: number;
+    baseHash: string;
+    publicHash: string;
+    stateHash: string;
+    turnTimeRemaining: number | null;
+    hand: Card[];
+    legalMoves: LegalMoves | null;
+    events: RoomEvent[];
+    success: true;
+};
+
+// Answer to an action sent with a sequence number; the new state follows as a broadcast
+export type WebSocketMessageAck = {
+    success: true;
+    ack: number;
+    version: number | null;
+};
+
+export type ChatMessage = {
+    id: number;
+    playerId: string;
+    name: string;
+    text: string;
+    time: number;
+};
+
+// Chat messages, batched; sent apart from room states and repeated after a join, so keyed by id
+export type WebSocketMessageChat = {
+    success: true;
+    chat: ChatMessage[];
+};
+
 export type WebSocketMessageError = {
     error: string;
     success: false;
+    nack?: number;
     disconnect?: boolean;
+    moved?: string;
+    retryAfter?: number;
 };
 
-export type WebSocketMessage = WebSocketMessageSuccess | WebSocketMessageError;
+export type WebSocketMessage = WebSocketMessageSuccess | WebSocketMessageResumed | WebSocketMessageAck | WebSocketMessageChat | WebSocketMessageError;